@@ -0,0 +1,387 @@
+import json
+import os
+import queue
+import sys
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from datetime import datetime
+
+import pytz
+import requests
+
+from wait_data import DATA_DIR, is_ride_name, latest_today_file, load_day, minutes_to_time
+
+EASTERN = pytz.timezone('US/Eastern')
+ALERT_WEBHOOK_URL = os.environ.get('ALERT_WEBHOOK_URL')
+CONDITIONS = ('below', 'above', 'reopens', 'closes')
+HYSTERESIS_MINUTES = 5     # a below/above rule re-arms only once the wait is this far back past its threshold
+STATUS_COOLDOWN_MINUTES = 15   # a reopens/closes rule stays quiet this long after firing (flapping rides)
+QUEUE_SIZE = 10000         # events kept for polling clients
+WEBHOOK_TIMEOUT = 5
+WEBHOOK_BACKLOG = 1000     # batches waiting for the webhook worker before new ones are dropped
+COMPACT_RECORDS = 1000     # journal records appended before it is rewritten as one snapshot (at least 2x the rules)
+NEVER = float('inf')
+
+
+def rules_path(data_dir=DATA_DIR):
+    return os.path.join(data_dir, 'alert_rules.jsonl')
+
+
+def write_journal(path, mode, records):
+    """Append records to the rule journal ('a'), or replace it with them atomically ('w')"""
+    lines = ''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records)
+    if mode == 'a':
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(lines)
+    os.replace(tmp_path, path)
+
+
+class QueueSink:
+    """In-process event queue that clients poll with the last sequence number they saw"""
+
+    def __init__(self, size=QUEUE_SIZE):
+        self.events = deque(maxlen=size)
+
+    def emit(self, events):
+        self.events.extend(events)
+
+    def since(self, seq=0, watcher=None):
+        return [event for event in self.events
+                if event['seq'] > seq and (watcher is None or event['watcher'] == watcher)]
+
+
+class WebhookSink:
+    """POSTs each batch of events as {"events": [...]} from one background worker, so evaluation never waits on it
+
+    Batches wait in a bounded queue; if the receiver falls that far behind, new batches are dropped
+    and counted. Receivers can de-duplicate retries on event["key"].
+    """
+
+    def __init__(self, url, timeout=WEBHOOK_TIMEOUT, backlog=WEBHOOK_BACKLOG):
+        self.url = url
+        self.timeout = timeout
+        self.failures = 0
+        self.dropped = 0
+        self.batches = queue.Queue(maxsize=backlog)
+        self.worker = threading.Thread(target=self.run, name='alert-webhook', daemon=True)
+        self.worker.start()
+
+    def emit(self, events):
+        try:
+            self.batches.put_nowait(events)
+        except queue.Full:
+            self.dropped += len(events)
+            print(f"❌ Alert webhook backlog full, dropped {len(events)} events")
+
+    def run(self):
+        while True:
+            events = self.batches.get()
+            if events is None:
+                return
+            self.post(events)
+
+    def post(self, events):
+        try:
+            requests.post(self.url, json={'events': events}, timeout=self.timeout).raise_for_status()
+        except requests.RequestException as e:
+            self.failures += 1
+            print(f"❌ Alert webhook failed: {e}")
+
+    def close(self, timeout=None):
+        """Deliver the batches already queued, then stop the worker"""
+        self.batches.put(None)
+        self.worker.join(timeout)
+
+
+class RideRules:
+    """One ride's rules by condition plus the last wait/status the engine saw for it
+
+    Threshold rules sit in sorted (threshold, rule id) lists split by state. An armed "below"
+    rule always has its threshold at or under the last wait, so a new wait fires exactly the
+    armed rules above it: one bisect and a slice. Fired rules re-arm the same way once the wait
+    is HYSTERESIS_MINUTES clear of their threshold. Work per update is O(log n + rules flipped).
+    """
+
+    __slots__ = ('wait', 'status', 'below_armed', 'below_fired', 'above_armed', 'above_fired', 'reopens', 'closes')
+
+    def __init__(self):
+        self.wait = None
+        self.status = None
+        self.below_armed = []
+        self.below_fired = []
+        self.above_armed = []
+        self.above_fired = []
+        self.reopens = set()
+        self.closes = set()
+
+
+class AlertEngine:
+    """Wait-time alert rules indexed by ride, evaluated only for rides whose wait or status changed
+
+    Every rule added, removed, armed or fired is also recorded in `journal`. The owner hands those
+    records to write_journal() through take_journal(), so saving costs as much as the change
+    did; the journal is rewritten as a single snapshot only once it outgrows the rules.
+    """
+
+    def __init__(self, sinks=(), hysteresis=HYSTERESIS_MINUTES):
+        self.sinks = list(sinks)
+        self.hysteresis = hysteresis
+        self.rules = {}            # rule id -> rule dict
+        self.rides = {}            # ride -> RideRules
+        self.last_fired = {}       # rule id -> (date, minute) of its last status event
+        self.next_id = 1
+        self.seq = 0
+        self.date = None
+        self.journal = []          # rule changes not yet written
+        self.logged = 0            # records in the journal file since its last snapshot
+        self.stats = {'updates': 0, 'rides_changed': 0, 'rules_flipped': 0, 'events': 0}
+
+    def ride(self, name):
+        rides = self.rides.get(name)
+        if rides is None:
+            rides = self.rides[name] = RideRules()
+        return rides
+
+    def add_rule(self, watcher, ride, condition, threshold=None, minute=None, armed=True, rule_id=None):
+        """Register a rule; a threshold rule already satisfied by the current wait fires straight away"""
+        if condition not in CONDITIONS:
+            raise ValueError(f'condition must be one of {", ".join(CONDITIONS)}')
+        if condition in ('below', 'above'):
+            if threshold is None:
+                raise ValueError(f'a {condition} rule needs a threshold')
+            threshold = int(threshold)
+        else:
+            threshold = None
+        if not watcher or not ride:
+            raise ValueError('watcher and ride are required')
+        rule_id = rule_id or self.next_id
+        self.next_id = max(self.next_id, rule_id + 1)
+        rule = {'id': rule_id, 'watcher': str(watcher), 'ride': ride, 'condition': condition, 'threshold': threshold}
+        self.rules[rule_id] = rule
+        rides = self.ride(ride)
+        if condition in ('reopens', 'closes'):
+            getattr(rides, condition).add(rule_id)
+            self.journal.append({'op': 'add', 'rule': rule})
+            return rule, []
+        entry = (threshold, rule_id)
+        satisfied = rides.wait is not None and (rides.wait < threshold if condition == 'below' else rides.wait > threshold)
+        if armed and not satisfied:
+            insort(getattr(rides, f'{condition}_armed'), entry)
+            self.journal.append({'op': 'add', 'rule': dict(rule, armed=True)})
+            return rule, []
+        insort(getattr(rides, f'{condition}_fired'), entry)
+        self.journal.append({'op': 'add', 'rule': dict(rule, armed=False)})
+        return rule, self.emit([self.event(rule, rides, minute)]) if armed else []
+
+    def remove_rule(self, rule_id):
+        rule = self.rules.pop(rule_id, None)
+        if rule is None:
+            return None
+        rides = self.rides[rule['ride']]
+        self.last_fired.pop(rule_id, None)
+        self.journal.append({'op': 'remove', 'id': rule_id})
+        if rule['condition'] in ('reopens', 'closes'):
+            getattr(rides, rule['condition']).discard(rule_id)
+            return rule
+        entry = (rule['threshold'], rule_id)
+        for state in ('armed', 'fired'):
+            rules = getattr(rides, f"{rule['condition']}_{state}")
+            position = bisect_left(rules, entry)
+            if position < len(rules) and rules[position] == entry:
+                del rules[position]
+        return rule
+
+    def event(self, rule, rides, minute):
+        self.seq += 1
+        minute = minute if minute is not None else -1
+        return {
+            'seq': self.seq,
+            'key': f"{rule['id']}:{self.date}:{minute}",
+            'ruleId': rule['id'],
+            'watcher': rule['watcher'],
+            'ride': rule['ride'],
+            'condition': rule['condition'],
+            'threshold': rule['threshold'],
+            'wait': rides.wait,
+            'status': rides.status,
+            'date': self.date,
+            'time': minutes_to_time(minute) if minute >= 0 else None
+        }
+
+    def emit(self, events):
+        if events:
+            self.stats['events'] += len(events)
+            for sink in self.sinks:
+                sink.emit(events)
+        return events
+
+    def update(self, ride, wait, status, minute=None):
+        """Feed one ride's latest wait/status; returns the events it triggered (nothing if unchanged)"""
+        rides = self.ride(ride)
+        if (rides.wait, rides.status) == (wait, status):
+            return []
+        self.stats['rides_changed'] += 1
+        previous = rides.status
+        rides.wait, rides.status = wait, status
+        fired = []
+        if wait is not None:
+            # Below: re-arm fired rules the wait has climbed clear of, fire armed rules now above it
+            start = bisect_right(rides.below_fired, (wait - self.hysteresis, NEVER))
+            self._move(rides.below_fired, 0, start, rides.below_armed, armed=True)
+            start = bisect_right(rides.below_armed, (wait, NEVER))
+            fired += self._move(rides.below_armed, start, len(rides.below_armed), rides.below_fired, armed=False)
+            # Above: the mirror image
+            end = bisect_left(rides.above_fired, (wait + self.hysteresis, 0))
+            self._move(rides.above_fired, end, len(rides.above_fired), rides.above_armed, armed=True)
+            end = bisect_left(rides.above_armed, (wait, 0))
+            fired += self._move(rides.above_armed, 0, end, rides.above_fired, armed=False)
+        if previous is not None and (previous == 'Open') != (status == 'Open'):
+            for rule_id in rides.reopens if status == 'Open' else rides.closes:
+                last = self.last_fired.get(rule_id)
+                if last and last[0] == self.date and minute is not None and minute - last[1] < STATUS_COOLDOWN_MINUTES:
+                    continue
+                self.last_fired[rule_id] = (self.date, minute if minute is not None else -1)
+                self.stats['rules_flipped'] += 1
+                fired.append(rule_id)
+        return [self.event(self.rules[rule_id], rides, minute) for rule_id in fired]
+
+    def _move(self, source, start, end, target, armed):
+        """Move source[start:end] into the sorted target list (the armed or the fired one); returns the moved rule ids"""
+        if start >= end:
+            return []
+        chunk = source[start:end]
+        del source[start:end]
+        if len(chunk) > 8:
+            # Two sorted runs: timsort merges them in linear time
+            target += chunk
+            target.sort()
+        else:
+            for entry in chunk:
+                insort(target, entry)
+        self.stats['rules_flipped'] += len(chunk)
+        self.journal.extend({'op': 'armed', 'id': rule_id, 'armed': armed} for _, rule_id in chunk)
+        return [rule_id for _, rule_id in chunk]
+
+    def _set_armed(self, rule_id, armed):
+        """Put a threshold rule in its armed or fired list (replaying the journal)"""
+        rule = self.rules.get(rule_id)
+        if rule is None or rule['condition'] not in ('below', 'above'):
+            return
+        rides = self.rides[rule['ride']]
+        entry = (rule['threshold'], rule_id)
+        source = getattr(rides, f"{rule['condition']}_{'fired' if armed else 'armed'}")
+        position = bisect_left(source, entry)
+        if position < len(source) and source[position] == entry:
+            del source[position]
+            insort(getattr(rides, f"{rule['condition']}_{'armed' if armed else 'fired'}"), entry)
+
+    def apply_day(self, day, minute=None):
+        """Evaluate a day dict's current waits; only rides whose wait or status moved touch any rules"""
+        if day.get('date') != self.date:
+            # A new park day: statuses start unknown again so the first reading is not a "reopen"
+            self.date = day.get('date')
+            for rides in self.rides.values():
+                rides.status = None
+        self.stats['updates'] += 1
+        events = []
+        for ride in day.get('rides', []):
+            name = ride.get('name')
+            if is_ride_name(name):
+                events += self.update(name, ride.get('waitTime'), ride.get('status'), minute)
+        return self.emit(events)
+
+    def close(self, timeout=WEBHOOK_TIMEOUT):
+        for sink in self.sinks:
+            if hasattr(sink, 'close'):
+                sink.close(timeout)
+
+    def watcher_rules(self, watcher):
+        return [rule for rule in self.rules.values() if rule['watcher'] == watcher]
+
+    def to_dict(self):
+        fired = {rule_id for rides in self.rides.values()
+                 for _, rule_id in rides.below_fired + rides.above_fired}
+        return {
+            'nextId': self.next_id,
+            'rules': [dict(rule, armed=rule['id'] not in fired) for rule in self.rules.values()]
+        }
+
+    def take_journal(self):
+        """(mode, records) for write_journal(): the pending changes, or a snapshot once the file outgrows the rules"""
+        records, self.journal = self.journal, []
+        if self.logged + len(records) > max(COMPACT_RECORDS, 2 * len(self.rules)):
+            self.logged = 1
+            return 'w', [self.to_dict()]
+        self.logged += len(records)
+        return 'a', records
+
+    def save(self, path):
+        """Rewrite the journal as one snapshot"""
+        self.journal = []
+        self.logged = 1
+        write_journal(path, 'w', [self.to_dict()])
+
+    @classmethod
+    def load(cls, path, sinks=()):
+        """Replay a rule journal: a snapshot line followed by add/remove/armed records"""
+        engine = cls(sinks)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break   # a torn last line from a crash mid-append
+                    if 'rules' in record:
+                        for rule in record['rules']:
+                            engine.add_rule(rule['watcher'], rule['ride'], rule['condition'], rule.get('threshold'),
+                                            armed=rule.get('armed', True), rule_id=rule['id'])
+                        engine.next_id = max(engine.next_id, record.get('nextId', 1))
+                    elif record['op'] == 'add':
+                        rule = record['rule']
+                        engine.add_rule(rule['watcher'], rule['ride'], rule['condition'], rule.get('threshold'),
+                                        armed=rule.get('armed', True), rule_id=rule['id'])
+                    elif record['op'] == 'remove':
+                        engine.remove_rule(record['id'])
+                    elif record['op'] == 'armed':
+                        engine._set_armed(record['id'], record['armed'])
+                    engine.logged += 1
+        engine.journal = []
+        return engine
+
+
+def default_sinks():
+    """The polling queue, plus a webhook when ALERT_WEBHOOK_URL is set"""
+    sinks = [QueueSink()]
+    if ALERT_WEBHOOK_URL:
+        sinks.append(WebhookSink(ALERT_WEBHOOK_URL))
+    return sinks
+
+
+def current_minute():
+    now = datetime.now(EASTERN)
+    return now.hour * 60 + now.minute
+
+
+if __name__ == "__main__":
+    # Usage: python alerts.py RIDE CONDITION [THRESHOLD]   evaluate one rule against the latest today file
+    #        python alerts.py                              evaluate the saved rules (data/alert_rules.jsonl)
+    path = latest_today_file()
+    if not path:
+        print("❌ No today_waits file found")
+        sys.exit(1)
+    day = load_day(path)
+    if len(sys.argv) > 2:
+        engine = AlertEngine([QueueSink()])
+        engine.add_rule('cli', sys.argv[1], sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+    else:
+        engine = AlertEngine.load(rules_path(), [QueueSink()])
+    events = engine.apply_day(day, current_minute())
+    print(f"🔔 {len(engine.rules)} rules on {len(engine.rides)} rides, {len(events)} events for {day['date']}")
+    for event in events:
+        print(f"  {json.dumps(event)}")
@@ -0,0 +1,385 @@
+import json
+import os
+import struct
+import sys
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from park_day import ParkDay
+from wait_data import DATA_DIR, list_day_files, load_day
+
+ARCHIVE_MAGIC = b'WPA1'
+FOOTER = struct.Struct('<QI4s')       # index offset, index length, footer magic
+FOOTER_MAGIC = b'WPAX'
+PARTITION_EXTENSION = '.wpa'
+COMPACT_RATIO = 1.0                   # rewrite a partition once dead bytes exceed its live bytes
+DEFAULT_KEEP_DAYS = 60                # JSON day files newer than this stay in data/ for the server
+
+
+def archive_dir(data_dir=DATA_DIR):
+    return os.path.join(data_dir, 'archive')
+
+
+def partition_path(date, data_dir=DATA_DIR):
+    """Monthly partition holding a YYYY-MM-DD date"""
+    return os.path.join(archive_dir(data_dir), f'waits_{date[:7]}{PARTITION_EXTENSION}')
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_series(values):
+    """One ride-day as varints: run count, then (zigzag delta from the previous run's value, run length) per run
+
+    Waits repeat for long stretches and move in small steps, so a day of 60+ slots is
+    usually a few dozen bytes. The NULL_WAIT/NO_SLOT sentinels encode like any other value.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    out = bytearray()
+    if not len(values):
+        write_varint(out, 0)
+        return bytes(out)
+    starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    lengths = np.diff(np.r_[starts, len(values)])
+    deltas = np.diff(np.r_[0, values[starts]])
+    zigzag = (deltas << 1) ^ (deltas >> 63)
+    write_varint(out, len(starts))
+    for delta, length in zip(zigzag.tolist(), lengths.tolist()):
+        write_varint(out, delta)
+        write_varint(out, length)
+    return bytes(out)
+
+
+def decode_varints(data):
+    """Every varint in a byte string as an int64 array, decoded in one vectorized pass"""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if not len(raw):
+        return np.zeros(0, dtype=np.int64)
+    ends = np.flatnonzero(raw < 0x80)
+    starts = np.r_[0, ends[:-1] + 1]
+    if len(ends) == len(raw):
+        return raw.astype(np.int64)
+    shifts = 7 * (np.arange(len(raw)) - np.repeat(starts, ends - starts + 1))
+    return np.add.reduceat((raw & 0x7f).astype(np.int64) << shifts, starts)
+
+
+def decode_runs(fields, series_count):
+    """Concatenated values of `series_count` consecutive encoded series from their varint fields"""
+    deltas = []
+    lengths = []
+    pos = 0
+    for _ in range(series_count):
+        count = int(fields[pos])
+        deltas.append(fields[pos + 1:pos + 1 + 2 * count:2])
+        lengths.append(fields[pos + 2:pos + 2 + 2 * count:2])
+        pos += 1 + 2 * count
+    zigzag = np.concatenate(deltas) if deltas else np.zeros(0, dtype=np.int64)
+    values = np.cumsum((zigzag >> 1) ^ -(zigzag & 1))
+    # Each series' deltas restart from zero, so subtract the running total at every series start
+    run_counts = [len(part) for part in deltas]
+    firsts = np.cumsum([0] + run_counts[:-1])
+    base = np.repeat(np.r_[0, values][firsts], run_counts)
+    return np.repeat(values - base, np.concatenate(lengths) if lengths else []).astype(np.int16)
+
+
+def decode_series(data):
+    """Inverse of encode_series for one blob: an int16 array"""
+    return decode_runs(decode_varints(data), 1)
+
+
+def day_digest(day):
+    return zlib.crc32(day.encode())
+
+
+class Partition:
+    """One month of ride-days in an append-only file with an offset index at the end
+
+    Layout: magic, then per day a zlib'd JSON meta blob (labels and ride headers) followed by
+    one encoded series per ride, then the zlib'd JSON index and a fixed footer pointing at it.
+    Writes append new blobs and a new index after the old footer, so a crash mid-write leaves
+    the previous index intact; replaced days and old indexes are dead bytes until compact().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index = None
+        self.end = 0
+        self.index_bytes = 0
+        self.signature = None
+
+    def _read_footer(self, f):
+        """(index offset, index length, end of valid data); scans back past a torn tail"""
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size >= len(ARCHIVE_MAGIC) + FOOTER.size:
+            f.seek(size - FOOTER.size)
+            offset, length, magic = FOOTER.unpack(f.read(FOOTER.size))
+            if magic == FOOTER_MAGIC and offset + length + FOOTER.size == size:
+                return offset, length, size
+        f.seek(0)
+        data = f.read()
+        end = len(data)
+        while True:
+            pos = data.rfind(FOOTER_MAGIC, 0, end)
+            if pos < FOOTER.size - len(FOOTER_MAGIC):
+                raise ValueError(f'{self.path}: no valid index')
+            start = pos + len(FOOTER_MAGIC) - FOOTER.size
+            offset, length, _ = FOOTER.unpack_from(data, start)
+            if offset + length == start:
+                return offset, length, pos + len(FOOTER_MAGIC)
+            end = pos
+
+    def load(self):
+        """Parse the index (cached until the file changes); an absent file is an empty partition"""
+        if not os.path.exists(self.path):
+            self.index, self.end, self.index_bytes, self.signature = {'rides': [], 'days': {}}, 0, 0, None
+            return self.index
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature != self.signature:
+            with open(self.path, 'rb') as f:
+                offset, length, self.end = self._read_footer(f)
+                f.seek(offset)
+                self.index = json.loads(zlib.decompress(f.read(length)))
+            self.index_bytes = length + FOOTER.size
+            self.signature = signature
+        return self.index
+
+    def dates(self):
+        return sorted(self.load()['days'])
+
+    def live_bytes(self):
+        return sum(entry['meta'] + sum(entry['lengths']) for entry in self.load()['days'].values())
+
+    def dead_bytes(self):
+        self.load()
+        return max(self.end - len(ARCHIVE_MAGIC) - self.index_bytes - self.live_bytes(), 0)
+
+    def read_series(self, date, ride):
+        """int16 slots of one ride on one date (NULL_WAIT/NO_SLOT gaps), read without touching other rides"""
+        index = self.load()
+        entry = index['days'].get(date)
+        if entry is None or ride not in index['rides']:
+            return None
+        ride_id = index['rides'].index(ride)
+        if ride_id not in entry['rows']:
+            return None
+        row = entry['rows'].index(ride_id)
+        offset = entry['at'] + entry['meta'] + sum(entry['lengths'][:row])
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return decode_series(f.read(entry['lengths'][row]))
+
+    def read_day(self, date):
+        """The archived ParkDay for a date, or None"""
+        entry = self.load()['days'].get(date)
+        if entry is None:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(entry['at'])
+            data = f.read(entry['meta'] + sum(entry['lengths']))
+        meta = json.loads(zlib.decompress(data[:entry['meta']]))
+        fields = decode_varints(data[entry['meta']:])
+        waits = decode_runs(fields, len(entry['rows'])).reshape(len(entry['rows']), len(meta['times']))
+        return ParkDay(date, meta['park'], meta['times'], waits, meta['rides'], meta['extra'])
+
+    def write_days(self, days):
+        """Append new or changed days (unchanged digests are skipped); returns the dates written"""
+        index = self.load()
+        pending = []
+        for day in days:
+            digest = day_digest(day)
+            entry = index['days'].get(day.date)
+            if entry is None or entry['digest'] != digest:
+                pending.append((day, digest))
+        if not pending:
+            return []
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'r+b' if os.path.exists(self.path) else 'w+b') as f:
+            if not self.end:
+                f.write(ARCHIVE_MAGIC)
+                self.end = f.tell()
+            f.seek(self.end)
+            f.truncate()
+            ride_ids = {ride: i for i, ride in enumerate(index['rides'])}
+            for day, digest in pending:
+                meta = zlib.compress(json.dumps({
+                    'park': day.park, 'times': day.times,
+                    'rides': [dict(ride.header(), name=ride.name) for ride in day], 'extra': day.extra
+                }, separators=(',', ':')).encode('utf-8'))
+                series = [encode_series(ride.waits) for ride in day]
+                for ride in day:
+                    if ride.name not in ride_ids:
+                        ride_ids[ride.name] = len(index['rides'])
+                        index['rides'].append(ride.name)
+                index['days'][day.date] = {
+                    'at': f.tell(), 'meta': len(meta), 'lengths': [len(blob) for blob in series],
+                    'rows': [ride_ids[ride.name] for ride in day], 'digest': digest
+                }
+                f.write(meta)
+                f.write(b''.join(series))
+            self._write_index(f)
+        return [day.date for day, _ in pending]
+
+    def _write_index(self, f):
+        index = zlib.compress(json.dumps(self.index, separators=(',', ':')).encode('utf-8'))
+        offset = f.tell()
+        f.write(index)
+        f.write(FOOTER.pack(offset, len(index), FOOTER_MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+        self.end = f.tell()
+        self.index_bytes = len(index) + FOOTER.size
+        self.signature = None
+
+    def drop_days(self, dates):
+        """Remove dates from the index (their bytes go at the next compaction)"""
+        index = self.load()
+        dropped = [date for date in dates if index['days'].pop(date, None) is not None]
+        if dropped:
+            with open(self.path, 'r+b') as f:
+                f.seek(self.end)
+                f.truncate()
+                self._write_index(f)
+        return dropped
+
+    def compact(self):
+        """Rewrite only the live days into a fresh file and swap it in; returns bytes reclaimed"""
+        before = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        days = [self.read_day(date) for date in self.dates()]
+        fresh = Partition(f'{self.path}.tmp')
+        if os.path.exists(fresh.path):
+            os.remove(fresh.path)
+        fresh.write_days(days)
+        if not days:
+            with open(fresh.path, 'wb') as f:
+                f.write(ARCHIVE_MAGIC)
+                fresh.index, fresh.end = {'rides': [], 'days': {}}, f.tell()
+                fresh._write_index(f)
+        os.replace(fresh.path, self.path)
+        self.signature = None
+        return before - os.path.getsize(self.path)
+
+
+def archive_days(days, data_dir=DATA_DIR, compact_ratio=COMPACT_RATIO):
+    """Fold legacy day dicts (or ParkDays) into their monthly partitions; returns the dates written
+
+    The live poller re-ingests today every slot, so its partition compacts itself once the
+    superseded copies outweigh the live data.
+    """
+    by_month = {}
+    for day in days:
+        day = day if isinstance(day, ParkDay) else ParkDay.from_legacy(day)
+        by_month.setdefault(day.date[:7], []).append(day)
+    written = []
+    for month, month_days in sorted(by_month.items()):
+        partition = Partition(partition_path(month, data_dir))
+        written.extend(partition.write_days(month_days))
+        if partition.dead_bytes() > compact_ratio * partition.live_bytes():
+            partition.compact()
+    return written
+
+
+def load_archived_day(date, data_dir=DATA_DIR):
+    """ParkDay for a date from the archive, or None"""
+    path = partition_path(date, data_dir)
+    return Partition(path).read_day(date) if os.path.exists(path) else None
+
+
+def list_partitions(data_dir=DATA_DIR):
+    """{YYYY-MM: path} for every partition file"""
+    directory = archive_dir(data_dir)
+    if not os.path.isdir(directory):
+        return {}
+    return {name[6:13]: os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.startswith('waits_') and name.endswith(PARTITION_EXTENSION)}
+
+
+def prune_json(data_dir=DATA_DIR, keep_days=DEFAULT_KEEP_DAYS):
+    """Delete day JSON files older than keep_days before the newest date, once the archive holds them
+
+    A date is only pruned when its archived copy has the same digest as the file
+    list_day_files would pick; both the today_waits and last_week_waits copies then go.
+    """
+    files = list_day_files(data_dir)
+    if not files:
+        return []
+    cutoff = (datetime.strptime(max(files), '%Y-%m-%d') - timedelta(days=keep_days)).strftime('%Y-%m-%d')
+    removed = []
+    partitions = {}
+    for date, path in files.items():
+        if date >= cutoff:
+            continue
+        partition = partitions.setdefault(date[:7], Partition(partition_path(date, data_dir)))
+        entry = partition.load()['days'].get(date)
+        if entry is None or entry['digest'] != day_digest(ParkDay.load(path)):
+            continue
+        for prefix in ('today_waits', 'last_week_waits'):
+            candidate = os.path.join(data_dir, f'{prefix}_{date}.json')
+            if os.path.exists(candidate):
+                os.remove(candidate)
+                removed.append(candidate)
+    return removed
+
+
+def expire_partitions(data_dir=DATA_DIR, keep_months=None):
+    """Delete whole partitions older than keep_months before the newest one (None keeps everything)"""
+    partitions = list_partitions(data_dir)
+    if keep_months is None or not partitions:
+        return []
+    newest = datetime.strptime(max(partitions), '%Y-%m')
+    months = newest.year * 12 + newest.month - keep_months
+    cutoff = f'{(months - 1) // 12:04d}-{(months - 1) % 12 + 1:02d}'
+    expired = [path for month, path in partitions.items() if month <= cutoff]
+    for path in expired:
+        os.remove(path)
+    return expired
+
+
+def compact_partitions(data_dir=DATA_DIR):
+    """Compact every partition; returns {path: bytes reclaimed}"""
+    return {path: Partition(path).compact() for path in list_partitions(data_dir).values()}
+
+
+if __name__ == "__main__":
+    # Usage: python archive.py [--compact] [--prune DAYS] [--expire MONTHS]
+    #        python archive.py DATE [RIDE]     (read back one day or one ride-day)
+    args = sys.argv[1:]
+    if args and not args[0].startswith('--'):
+        if len(args) > 1:
+            series = Partition(partition_path(args[0])).read_series(args[0], args[1]) \
+                if os.path.exists(partition_path(args[0])) else None
+            if series is None:
+                print(f"❌ {args[1]} not archived for {args[0]}")
+                sys.exit(1)
+            print(f"🎢 {args[1]} {args[0]}: {series.tolist()}")
+        else:
+            day = load_archived_day(args[0])
+            if day is None:
+                print(f"❌ {args[0]} not archived")
+                sys.exit(1)
+            print(json.dumps(day.to_legacy(), indent=2))
+        sys.exit(0)
+
+    written = archive_days(load_day(path) for path in list_day_files().values())
+    print(f"🗄️  Archived {len(written)} new or changed days")
+    if '--compact' in args:
+        for path, reclaimed in compact_partitions().items():
+            print(f"  🧹 {path}: {reclaimed} bytes reclaimed")
+    if '--prune' in args:
+        removed = prune_json(keep_days=int(args[args.index('--prune') + 1]))
+        print(f"  🗑️  Removed {len(removed)} archived day files")
+    if '--expire' in args:
+        expired = expire_partitions(keep_months=int(args[args.index('--expire') + 1]))
+        print(f"  🗑️  Expired {len(expired)} partitions")
+    for month, path in list_partitions().items():
+        partition = Partition(path)
+        print(f"  📦 {month}: {len(partition.dates())} days, {os.path.getsize(path)} bytes "
+              f"({partition.dead_bytes()} dead)")
@@ -0,0 +1,105 @@
+import sys
+from datetime import datetime
+
+from rolling_stats import WEEKDAYS, RunningStats, WaitStatsStore
+from wait_data import DATA_DIR, SLOT_MINUTES, derived_path, minutes_to_time, write_json
+
+BEST_TIMES_FILE = derived_path(DATA_DIR, 'best_times.json')
+WINDOW_MINUTES = 60
+TOP_WINDOWS = 3
+THRESHOLDS = [15, 30, 45, 60]
+
+
+def slot_profiles(store):
+    """Group the stats buckets into {ride: {weekday: {minute: mean}}}, with an 'all days' profile per ride"""
+    profiles = {}
+    combined = {}
+    for (ride, weekday, minute), stats in store.history.items():
+        profiles.setdefault(ride, {}).setdefault(weekday, {})[minute] = stats.mean
+        combined.setdefault(ride, {}).setdefault(minute, RunningStats()).merge(stats)
+    all_days = {
+        ride: {minute: stats.mean for minute, stats in slots.items()}
+        for ride, slots in combined.items()
+    }
+    return profiles, all_days
+
+
+def low_wait_windows(profile, window_minutes=WINDOW_MINUTES, top=TOP_WINDOWS):
+    """Rank non-overlapping windows of contiguous slots by their average expected wait"""
+    minutes = sorted(profile)
+    size = max(window_minutes // SLOT_MINUTES, 1)
+    candidates = []
+    for i in range(len(minutes) - size + 1):
+        span = minutes[i:i + size]
+        if span[-1] - span[0] != (size - 1) * SLOT_MINUTES:
+            continue
+        average = sum(profile[m] for m in span) / size
+        candidates.append((average, span[0], span[-1] + SLOT_MINUTES))
+
+    windows = []
+    for average, start, end in sorted(candidates):
+        if all(end <= other_start or start >= other_end for _, other_start, other_end in windows):
+            windows.append((average, start, end))
+            if len(windows) == top:
+                break
+    return [
+        {'start': minutes_to_time(start), 'end': minutes_to_time(end), 'expectedWait': round(average)}
+        for average, start, end in windows
+    ]
+
+
+def below_threshold_runs(profile, threshold):
+    """Contiguous [start, end) runs of slots whose expected wait is at or below threshold"""
+    runs = []
+    for minute in sorted(profile):
+        if profile[minute] > threshold:
+            continue
+        if runs and runs[-1][1] == minute:
+            runs[-1][1] = minute + SLOT_MINUTES
+        else:
+            runs.append([minute, minute + SLOT_MINUTES])
+    return [[minutes_to_time(start), minutes_to_time(end)] for start, end in runs]
+
+
+def build_best_times(store):
+    """Precompute ranked low-wait windows and below-threshold runs per ride and weekday"""
+    profiles, all_days = slot_profiles(store)
+    rides = {}
+    for ride in sorted(profiles):
+        rides[ride] = {}
+        for weekday, label in enumerate(WEEKDAYS):
+            profile = profiles[ride].get(weekday)
+            source = label
+            if not profile:
+                profile = all_days[ride]
+                source = 'All days'
+            rides[ride][label] = {
+                'source': source,
+                'windows': low_wait_windows(profile),
+                'below': {str(threshold): below_threshold_runs(profile, threshold) for threshold in THRESHOLDS}
+            }
+    return {
+        'updated': datetime.now().isoformat(timespec='seconds'),
+        'windowMinutes': WINDOW_MINUTES,
+        'thresholds': THRESHOLDS,
+        'rides': rides
+    }
+
+
+def update_best_times(data_dir=DATA_DIR, store=None, output_file=None):
+    """Rebuild the best-times table from the rolling stats (bounded by rides x slots, not history length)"""
+    output_file = output_file or derived_path(data_dir, 'best_times.json')
+    store = store or WaitStatsStore.load(derived_path(data_dir, 'rolling_stats.json'))
+    table = build_best_times(store)
+    write_json(output_file, table)
+    return table
+
+
+if __name__ == "__main__":
+    table = update_best_times()
+    print(f"⏱️  Best times saved to {BEST_TIMES_FILE} for {len(table['rides'])} rides")
+    weekday = datetime.strptime(sys.argv[1], '%Y-%m-%d').weekday() if len(sys.argv) > 1 else datetime.now().weekday()
+    for ride, days in table['rides'].items():
+        entry = days[WEEKDAYS[weekday]]
+        windows = ', '.join(f"{w['start']}-{w['end']} (~{w['expectedWait']} min)" for w in entry['windows'])
+        print(f"  {ride:30} {windows}")
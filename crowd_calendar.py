@@ -0,0 +1,217 @@
+import math
+import os
+import sys
+from datetime import datetime, timedelta
+
+from rolling_stats import WEEKDAYS, WaitStatsStore
+from wait_data import (
+    DATA_DIR, PARK_NAME, SLOT_MINUTES, derived_path, iter_ride_slots, list_day_files, load_day, write_json
+)
+
+CALENDAR_FILE = derived_path(DATA_DIR, 'crowd_calendar.json')
+FORECAST_WEEKS = 6
+RECENT_DAYS = 14           # observed days repeated in the served table for context
+MIN_SLOT_RIDES = 3         # a slot needs this many rides reporting to count towards the index
+MIN_PROFILE_SLOTS = 24     # days with fewer indexed slots (e.g. today so far) are shown but not learned from
+LEVEL_STEP = 20            # index points per crowd level: 100 (a typical slot) is level 5
+PRIOR_DAYS = 2.0           # shrinks sparse weekday/month profiles towards the overall level
+RECENT_HALF_LIFE = 7.0     # days; how quickly the recent-level estimate forgets older days
+HORIZON_HALF_LIFE = 14.0   # days ahead after which the recent level's pull has halved
+
+
+def crowd_level(index):
+    """1-10 crowd level for an index (100 = as busy as the park usually is)"""
+    return min(max(math.ceil(index / LEVEL_STEP), 1), 10)
+
+
+def ride_baselines(store):
+    """{ride: mean wait over all history}; each ride's weight in the index and its normal level"""
+    return {ride: round(store.ride_summary(ride).mean, 2) for ride in store.rides()}
+
+
+def day_slot_index(day, baselines):
+    """{minute: index} for one day: 100 x total observed wait / total usual wait of the rides reporting
+
+    Normalizing by the same rides' usual waits keeps the index comparable when rides are down,
+    and weighting by usual wait lets the headliners dominate, as they do for visitors.
+    """
+    totals = {}
+    for ride, minute, wait in iter_ride_slots(day):
+        baseline = baselines.get(ride)
+        if baseline:
+            slot = totals.setdefault(minute, [0.0, 0.0, 0])
+            slot[0] += wait
+            slot[1] += baseline
+            slot[2] += 1
+    return {minute: 100 * observed / usual for minute, (observed, usual, rides) in totals.items()
+            if rides >= MIN_SLOT_RIDES}
+
+
+class CrowdIndex:
+    """Per-day crowd index state: the frozen ride baselines plus each ingested day's slot indices
+
+    Baselines are fixed the first time a ride is seen so that re-ingesting one day never shifts
+    the others; `rebuild` re-derives them from the full history.
+    """
+
+    def __init__(self, baselines=None, days=None):
+        self.baselines = baselines or {}
+        self.days = days or {}       # date -> {'start': minute, 'slots': [index or None per slot]}
+
+    def ingest_day(self, day, store):
+        new_rides = {ride for ride, _, _ in iter_ride_slots(day)} - set(self.baselines)
+        if new_rides:
+            baselines = ride_baselines(store)
+            self.baselines.update({ride: baselines[ride] for ride in new_rides if baselines.get(ride)})
+        slots = day_slot_index(day, self.baselines)
+        if not slots:
+            self.days.pop(day['date'], None)
+            return False
+        start, end = min(slots), max(slots)
+        self.days[day['date']] = {
+            'start': start,
+            'slots': [round(slots[minute], 1) if minute in slots else None
+                      for minute in range(start, end + SLOT_MINUTES, SLOT_MINUTES)]
+        }
+        return True
+
+    def daily(self):
+        """{date: (mean slot index, indexed slot count)} over every ingested day"""
+        result = {}
+        for date, entry in sorted(self.days.items()):
+            values = [value for value in entry['slots'] if value is not None]
+            result[date] = (sum(values) / len(values), len(values))
+        return result
+
+    def hourly_shape(self, daily):
+        """{weekday: {hour: mean ratio of the hour's index to its day's}} across the (full) days in `daily`"""
+        sums = {}
+        for date, level in daily.items():
+            entry = self.days[date]
+            weekday = datetime.strptime(date, '%Y-%m-%d').weekday()
+            for offset, value in enumerate(entry['slots']):
+                if value is not None and level:
+                    hour = (entry['start'] + offset * SLOT_MINUTES) // 60
+                    bucket = sums.setdefault(weekday, {}).setdefault(hour, [0.0, 0])
+                    bucket[0] += value / level
+                    bucket[1] += 1
+        overall = {}
+        for hours in sums.values():
+            for hour, (total, count) in hours.items():
+                bucket = overall.setdefault(hour, [0.0, 0])
+                bucket[0] += total
+                bucket[1] += count
+        return {weekday: {hour: total / count for hour, (total, count) in (sums.get(weekday) or overall).items()}
+                for weekday in range(7)}
+
+    def hours(self, date):
+        """{"HH": mean index} for one ingested day"""
+        entry = self.days[date]
+        sums = {}
+        for offset, value in enumerate(entry['slots']):
+            if value is not None:
+                sums.setdefault((entry['start'] + offset * SLOT_MINUTES) // 60, []).append(value)
+        return {f'{hour:02d}': round(sum(values) / len(values)) for hour, values in sorted(sums.items())}
+
+    def to_dict(self):
+        return {'baselines': self.baselines, 'days': self.days}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('baselines'), data.get('days'))
+
+
+def shrunk_means(groups, overall):
+    """Mean per group, pulled towards `overall` by PRIOR_DAYS pseudo-observations"""
+    return {key: (sum(values) + PRIOR_DAYS * overall) / (len(values) + PRIOR_DAYS) for key, values in groups.items()}
+
+
+def forecast_calendar(index, weeks=FORECAST_WEEKS):
+    """Served table: recent observed days plus a daily and hourly forecast for the next `weeks` weeks
+
+    A forecast day is its weekday profile x its month's seasonal factor x the recent level. The
+    recent level is how far the last few weeks ran above or below those profiles, and it fades
+    back to 1 further out.
+    """
+    observed = index.daily()
+    daily = {date: value for date, (value, slots) in observed.items() if slots >= MIN_PROFILE_SLOTS}
+    if not daily:
+        return {'park': PARK_NAME, 'updated': datetime.now().isoformat(timespec='seconds'), 'days': []}
+    overall = sum(daily.values()) / len(daily)
+    by_weekday, by_month = {}, {}
+    for date, value in daily.items():
+        by_weekday.setdefault(datetime.strptime(date, '%Y-%m-%d').weekday(), []).append(value)
+    weekday_level = {weekday: overall for weekday in range(7)} | shrunk_means(by_weekday, overall)
+    for date, value in daily.items():
+        expected = weekday_level[datetime.strptime(date, '%Y-%m-%d').weekday()]
+        by_month.setdefault(date[5:7], []).append(value / expected)
+    season = shrunk_means(by_month, 1.0)
+
+    last = max(daily)
+    weight_sum, ratio_sum = 0.0, 0.0
+    for date, value in daily.items():
+        weekday = datetime.strptime(date, '%Y-%m-%d').weekday()
+        age = (datetime.strptime(last, '%Y-%m-%d') - datetime.strptime(date, '%Y-%m-%d')).days
+        weight = 0.5 ** (age / RECENT_HALF_LIFE)
+        weight_sum += weight
+        ratio_sum += weight * value / (weekday_level[weekday] * season.get(date[5:7], 1.0))
+    recent = (ratio_sum + PRIOR_DAYS) / (weight_sum + PRIOR_DAYS)
+    shape = index.hourly_shape(daily)
+
+    def entry(date, value, kind):
+        weekday = datetime.strptime(date, '%Y-%m-%d').weekday()
+        return {
+            'date': date,
+            'weekday': WEEKDAYS[weekday],
+            'index': round(value),
+            'level': crowd_level(value),
+            'kind': kind,
+            'hours': index.hours(date) if kind != 'forecast' else
+            {f'{hour:02d}': round(value * ratio) for hour, ratio in sorted(shape[weekday].items())}
+        }
+
+    # Days still in progress are shown as observed so far; the forecast starts after the last full day
+    days = [entry(date, value, 'observed' if date in daily else 'partial')
+            for date, (value, _) in sorted(observed.items())[-RECENT_DAYS:]]
+    start = datetime.strptime(last, '%Y-%m-%d')
+    for ahead in range(1, weeks * 7 + 1):
+        date = (start + timedelta(days=ahead)).strftime('%Y-%m-%d')
+        if date in observed:
+            continue
+        pull = recent ** (0.5 ** (ahead / HORIZON_HALF_LIFE))
+        days.append(entry(date, weekday_level[(start.weekday() + ahead) % 7] * season.get(date[5:7], 1.0) * pull, 'forecast'))
+    return {
+        'park': PARK_NAME,
+        'updated': datetime.now().isoformat(timespec='seconds'),
+        'lastObserved': last,
+        'levelStep': LEVEL_STEP,
+        'weekdays': {WEEKDAYS[weekday]: round(value) for weekday, value in sorted(weekday_level.items())},
+        'recentLevel': round(recent, 3),
+        'days': days
+    }
+
+
+def update_crowd_calendar(data_dir=DATA_DIR, days=None, store=None, rebuild=False, weeks=FORECAST_WEEKS):
+    """Fold the given day dicts (or every day file) into the crowd index and rewrite the calendar table"""
+    state_file = derived_path(data_dir, 'crowd_index.json')
+    store = store or WaitStatsStore.load(derived_path(data_dir, 'rolling_stats.json'))
+    if rebuild or not os.path.exists(state_file):
+        index = CrowdIndex(ride_baselines(store))
+    else:
+        index = CrowdIndex.from_dict(load_day(state_file))
+    if days is None:
+        days = (load_day(path) for path in list_day_files(data_dir).values())
+    ingested = sum(index.ingest_day(day, store) for day in days)
+    write_json(state_file, index.to_dict())
+    write_json(derived_path(data_dir, 'crowd_calendar.json'), forecast_calendar(index, weeks))
+    return ingested
+
+
+if __name__ == "__main__":
+    # Usage: python crowd_calendar.py [--rebuild]
+    rebuild = '--rebuild' in sys.argv
+    ingested = update_crowd_calendar(rebuild=rebuild)
+    calendar = load_day(CALENDAR_FILE)
+    print(f"📅 Crowd calendar: {ingested} days ingested, {len(calendar['days'])} days in {CALENDAR_FILE}")
+    for day in calendar['days']:
+        print(f"  {day['date']} {day['weekday']}  index {day['index']:4d}  level {day['level']:2d}  ({day['kind']})")
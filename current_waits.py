@@ -0,0 +1,135 @@
+import re
+import sys
+from datetime import datetime
+
+import numpy as np
+import pytz
+import requests
+from lxml import etree
+
+from park_day import ParkDay
+from wait_data import PARK_NAME, SLOT_MINUTES, UPSTREAM_URL, minutes_to_time, slot_index
+
+EASTERN = pytz.timezone('US/Eastern')
+CURRENT_WAITS_URL = f'{UPSTREAM_URL}/waits/park/uor/epic-universe/'
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Attractions table columns on the park page: name, height requirement, (unused), current wait
+NAME_COLUMN = 0
+HEIGHT_COLUMN = 1
+WAIT_COLUMN = 3
+WAIT_PATTERN = re.compile(r'\d+')
+HEATMAP_NAME_LIMIT = 26        # the heatmap shortens longer names to 13 chars + "..." + last 10
+
+
+class TableRows:
+    """lxml parser target collecting the text of every row's td cells in one streaming pass (no tree is built)"""
+
+    def __init__(self):
+        self.rows = []
+        self.row = None
+        self.cell = None
+
+    def start(self, tag, attrib):
+        if tag == 'tr':
+            self.row = []
+        elif tag == 'td' and self.row is not None:
+            self.cell = []
+
+    def data(self, text):
+        if self.cell is not None:
+            self.cell.append(text)
+
+    def end(self, tag):
+        if tag == 'td' and self.cell is not None:
+            self.row.append(' '.join(''.join(self.cell).split()))
+            self.cell = None
+        elif tag == 'tr' and self.row is not None:
+            self.rows.append(self.row)
+            self.row = None
+
+    def close(self):
+        return self.rows
+
+
+def parse_wait(text):
+    """(wait, status) from a wait cell: a number means Open, otherwise the cell's word (Closed, Down, ...)"""
+    match = WAIT_PATTERN.search(text)
+    if match:
+        return int(match.group()), 'Open'
+    return None, text.title() if text else 'Down'
+
+
+def parse_current_waits(html):
+    """[{name, waitTime, status, heightReq}] for every row of the attractions table"""
+    parser = etree.HTMLParser(target=TableRows())
+    rows = etree.fromstring(html, parser) if html else []
+    rides = []
+    for row in rows or []:
+        if len(row) <= WAIT_COLUMN or not row[NAME_COLUMN]:
+            continue
+        wait, status = parse_wait(row[WAIT_COLUMN])
+        rides.append({
+            'name': row[NAME_COLUMN],
+            'waitTime': wait,
+            'status': status,
+            'heightReq': row[HEIGHT_COLUMN]
+        })
+    return rides
+
+
+def fetch_current_waits():
+    response = requests.get(CURRENT_WAITS_URL, headers=HEADERS, timeout=30)
+    response.raise_for_status()
+    return response.text
+
+
+def heatmap_name(name):
+    """The name the heatmap would show for a park-page ride name"""
+    return f'{name[:13]}...{name[-10:]}' if len(name) > HEATMAP_NAME_LIMIT else name
+
+
+def apply_current_waits(day, rides, minute=None, published=-1):
+    """Fold live waits into a ParkDay as a single-slot update at the slot containing `minute`
+
+    Rides are matched by name or by their shortened heatmap name. waitTime, status and heightReq
+    always take the live value. The wait also goes into the current slot unless the heatmap has
+    already published it (slot index at or before `published`); the next heatmap replaces it, and
+    the rolling stats re-fold the corrected value. Returns the names whose slot or current wait changed.
+    """
+    slot = slot_index(minute) if minute is not None else -1
+    label = minutes_to_time(slot * SLOT_MINUTES)
+    changed = []
+    for ride in rides:
+        name = ride['name'] if ride['name'] in day.ride_index else heatmap_name(ride['name'])
+        series = day[name] if name in day.ride_index else day.add_ride(name)
+        slot_changed = slot > published and ride['waitTime'] is not None and \
+            day.set_wait(name, label, ride['waitTime'])
+        height = (series.extra or {}).get('heightReq')
+        if slot_changed or (series.waitTime, series.status, height) != (ride['waitTime'], ride['status'], ride['heightReq']):
+            series.waitTime, series.status = ride['waitTime'], ride['status']
+            series.extra = {**(series.extra or {}), 'heightReq': ride['heightReq']}
+            changed.append(name)
+    return changed
+
+
+def empty_day(date):
+    """A ParkDay with no rides or slots yet, for live updates that land before the first heatmap"""
+    return ParkDay(date, PARK_NAME, [], np.zeros((0, 0), dtype=np.int16))
+
+
+if __name__ == "__main__":
+    # Usage: python current_waits.py [SAVED_PAGE.html]   (fetches the live page when no file is given)
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            html = f.read()
+    else:
+        html = fetch_current_waits()
+    rides = parse_current_waits(html)
+    now = datetime.now(EASTERN)
+    print(f"🎢 {len(rides)} rides at {now.strftime('%H:%M')}")
+    for ride in sorted(rides, key=lambda ride: (ride['waitTime'] is None, ride['waitTime'] or 0)):
+        wait = f"{ride['waitTime']} min" if ride['waitTime'] is not None else ride['status']
+        print(f"  {ride['name']:45} {wait:>10}  {ride['heightReq']}")
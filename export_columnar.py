@@ -0,0 +1,125 @@
+import csv
+import io
+import os
+import re
+import sys
+from itertools import groupby
+
+from stream_aggregate import iter_archive
+from wait_data import DATA_DIR, PARK_NAME
+
+COLUMNS = ['park', 'date', 'ride_id', 'minute', 'wait']
+EXPORT_DIR = os.path.join('exports', 'waits')
+
+
+def ride_id(name):
+    """Stable identifier for a ride name (the upstream heatmaps only give names)"""
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def iter_rows(data_dir=DATA_DIR, start=None, end=None):
+    """Yield flat (park, date, ride_id, minute, wait) rows, one day at a time, archived days included"""
+    for date, ride, minute, wait in iter_archive(data_dir, start, end):
+        yield PARK_NAME, date, ride_id(ride), minute, wait
+
+
+def iter_csv(rows, header=True):
+    """Generator of CSV text lines; never holds more than one row in memory"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if header:
+        writer.writerow(COLUMNS)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_partitions(rows):
+    """Yield ((park, month), one day's rows) from a date-ordered row stream, so memory stays at one day"""
+    for (park, date), day_rows in groupby(rows, key=lambda row: (row[0], row[1])):
+        yield (park, date[:7]), list(day_rows)
+
+
+def export_columnar(output_dir=EXPORT_DIR, fmt='parquet', data_dir=DATA_DIR, start=None, end=None):
+    """Write Hive-style partitions park=<park>/month=<YYYY-MM>/ as Parquet or Arrow IPC files
+
+    Requires pyarrow (pip install pyarrow); the CSV stream has no extra dependencies.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc as ipc
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('pyarrow is required for Parquet/Arrow export: pip install pyarrow')
+
+    schema = pa.schema([
+        ('park', pa.string()),
+        ('date', pa.date32()),
+        ('ride_id', pa.string()),
+        ('minute', pa.int16()),
+        ('wait', pa.int16())
+    ])
+    extension = 'parquet' if fmt == 'parquet' else 'arrow'
+    written = {}
+    current_key = None
+    writer = None
+
+    def close(writer):
+        if writer is not None:
+            writer.close()
+
+    for key, batch in iter_partitions(iter_rows(data_dir, start, end)):
+        if key != current_key:
+            close(writer)
+            park, month = key
+            directory = os.path.join(output_dir, f'park={park}', f'month={month}')
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f'part-0.{extension}')
+            writer = pq.ParquetWriter(path, schema) if fmt == 'parquet' else ipc.new_file(path, schema)
+            current_key = key
+            written[path] = 0
+        columns = list(zip(*batch))
+        record_batch = pa.record_batch([
+            pa.array(columns[0], pa.string()),
+            pa.array(columns[1], pa.string()).cast(pa.date32()),
+            pa.array(columns[2], pa.string()),
+            pa.array(columns[3], pa.int16()),
+            pa.array(columns[4], pa.int16())
+        ], schema=schema)
+        if fmt == 'parquet':
+            writer.write_batch(record_batch)
+        else:
+            writer.write(record_batch)
+        written[path] += len(batch)
+    close(writer)
+    return written
+
+
+if __name__ == "__main__":
+    # Usage: python export_columnar.py parquet|arrow [OUTPUT_DIR]
+    #        python export_columnar.py csv [OUTPUT_FILE]   (stdout when no file is given)
+    fmt = sys.argv[1] if len(sys.argv) > 1 else 'parquet'
+    if fmt == 'csv':
+        rows = iter_csv(iter_rows())
+        if len(sys.argv) > 2:
+            with open(sys.argv[2], 'w', encoding='utf-8', newline='') as f:
+                f.writelines(rows)
+            print(f"✅ CSV written to {sys.argv[2]}")
+        else:
+            sys.stdout.writelines(rows)
+    elif fmt in ('parquet', 'arrow'):
+        output_dir = sys.argv[2] if len(sys.argv) > 2 else EXPORT_DIR
+        try:
+            written = export_columnar(output_dir, fmt)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        for path, count in written.items():
+            print(f"📦 {path}: {count} rows")
+    else:
+        print("Usage: python export_columnar.py parquet|arrow|csv [OUTPUT]")
+        sys.exit(1)
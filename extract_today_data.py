@@ -7,6 +7,9 @@ import sys
 from bs4 import BeautifulSoup
 import pytz
 
+from park_day import ParkDay
+from wait_data import UPSTREAM_URL
+
 def extract_today_data(target_date=None):
     """Extract wait time data for a specific date and save it in the same format as last week's data"""
     
@@ -31,7 +34,7 @@ def extract_today_data(target_date=None):
         
         # First, get the main page to extract SVG time labels
         main_page_response = requests.get(
-            'https://www.thrill-data.com/waits/graph/quick/parkheat',
+            f'{UPSTREAM_URL}/waits/graph/quick/parkheat',
             params={
                 'id': 243,  # Epic Universe park ID
                 'dateStart': today,
@@ -165,63 +168,11 @@ def extract_today_data(target_date=None):
         print(f"Rides: {len(y_data)}")
         print(f"Wait time data rows: {len(z_data)}")
         
-        # Process the data into the same format as last week's data
-        rides = []
-        
-        # Filter out the "Average" time point and get its index
-        average_index = -1
-        if "Average" in time_labels:
-            average_index = time_labels.index("Average")
-        
-        filtered_time_labels = [time for time in time_labels if time != "Average"]
-        
-        for i, ride_name in enumerate(y_data):
-            if i < len(z_data) and z_data[i]:
-                wait_times = z_data[i]
-                
-                # If average existed, slice the array to match filtered time points
-                if average_index != -1 and len(wait_times) > average_index:
-                    wait_times = wait_times[:average_index]
-                
-                # Convert empty strings to null and process wait times
-                processed_times = []
-                for wt in wait_times:
-                    if wt == '' or wt is None:
-                        processed_times.append(None)
-                    else:
-                        try:
-                            processed_times.append(int(wt))
-                        except:
-                            processed_times.append(None)
-                
-                # Get the latest non-null wait time for current status
-                current_wait = None
-                for wt in reversed(processed_times):
-                    if wt is not None:
-                        current_wait = wt
-                        break
-                
-                # Create wait_times array in the expected format (without Average)
-                wait_times_formatted = []
-                for j, time_label in enumerate(filtered_time_labels):
-                    wait_times_formatted.append({
-                        "time": time_label,
-                        "wait": processed_times[j] if j < len(processed_times) else None
-                    })
-                
-                rides.append({
-                    "name": ride_name,
-                    "waitTime": current_wait,
-                    "status": "Open" if current_wait is not None else "Down",
-                    "wait_times": wait_times_formatted
-                })
-        
-        # Create the final data structure
-        today_data = {
-            "date": today,
-            "park": "Epic Universe",
-            "rides": rides
-        }
+        # Process the data into the same format as last week's data (the "Average" column is dropped)
+        rows = [(ride_name, z_data[i]) for i, ride_name in enumerate(y_data) if i < len(z_data) and z_data[i]]
+        today_data = ParkDay.from_grid(today, "Epic Universe", [name for name, _ in rows], time_labels,
+                                       [row for _, row in rows]).to_legacy()
+        rides = today_data["rides"]
         
         # Save to file - use different naming for historical vs today's data
         if target_date:
@@ -254,6 +205,8 @@ def extract_today_data(target_date=None):
         else:
             print("Data refresh completed successfully")
         
+        return today_data
+        
     except Exception as e:
         print(f"Unexpected error: {e}")
         raise
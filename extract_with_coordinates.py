@@ -4,6 +4,8 @@ import json
 import os
 from datetime import datetime, timedelta
 
+from park_day import ParkDay
+
 def extract_with_coordinates():
     """Extract wait time data with proper time coordinates from Plotly heatmap"""
     
@@ -120,42 +122,10 @@ def extract_with_coordinates():
         for i, array in enumerate(wait_time_arrays[:3]):
             print(f"  Array {i}: {array[:10]}... (length: {len(array)})")
         
-        # Create the JSON structure
-        rides_data = []
-        
-        for i, ride_name in enumerate(ride_names):
-            if i < len(wait_time_arrays):
-                wait_times = wait_time_arrays[i]
-                # Convert wait times to int or None
-                clean_wait_times = []
-                for v in wait_times[:len(time_coordinates)]:
-                    if v == '' or v is None:
-                        clean_wait_times.append(None)
-                    else:
-                        try:
-                            clean_wait_times.append(int(v))
-                        except:
-                            clean_wait_times.append(None)
-                # Create time-wait mapping for this ride
-                time_wait_mapping = []
-                for j, time in enumerate(time_coordinates):
-                    if j < len(clean_wait_times):
-                        wait_time = clean_wait_times[j]
-                        time_wait_mapping.append({
-                            "time": time,
-                            "wait": wait_time
-                        })
-                rides_data.append({
-                    "name": ride_name,
-                    "wait_times": time_wait_mapping
-                })
-        
-        # Create the final JSON structure
-        json_data = {
-            "date": week_ago.strftime('%Y-%m-%d'),
-            "park": "Epic Universe",
-            "rides": rides_data
-        }
+        # Create the JSON structure: one row per ride, slots only as far as its array goes
+        json_data = ParkDay.from_grid(week_ago.strftime('%Y-%m-%d'), "Epic Universe", ride_names[:len(wait_time_arrays)],
+                                      time_coordinates, wait_time_arrays, pad=False, summary=False).to_legacy()
+        rides_data = json_data["rides"]
         
         # Create data directory if it doesn't exist
         os.makedirs('data', exist_ok=True)
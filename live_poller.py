@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import os
+import sys
+from datetime import datetime
+from statistics import median
+
+import pytz
+
+from current_waits import apply_current_waits, empty_day, fetch_current_waits, parse_current_waits
+from extract_today_data import extract_today_data
+from park_day import ParkDay
+from pipeline import refresh_derived
+from weather_collector import WeatherCache, collect_weather
+from wait_data import (
+    DATA_DIR, SLOT_MINUTES, list_day_files, load_day, iter_ride_slots,
+    minutes_to_time, slot_index, weekday_of
+)
+
+EASTERN = pytz.timezone('US/Eastern')
+
+OPEN_POLL_SECONDS = 120         # light current-waits poll while the park is open
+CLOSED_POLL_SECONDS = 60 * 60   # trickle while closed
+HOURS_MARGIN_MINUTES = 30       # start polling a bit before the learned open and after close
+SLOT_SETTLE_MINUTES = 3         # upstream publishes a slot a few minutes after it starts
+DEFAULT_HOURS = (8 * 60 + 45, 22 * 60)
+
+
+def learn_operating_hours(data_dir=DATA_DIR):
+    """Learn {weekday: (open_minute, close_minute)} from the first/last non-null slot of each day file"""
+    per_weekday = {}
+    for date, path in list_day_files(data_dir).items():
+        minutes = [minute for _, minute, _ in iter_ride_slots(load_day(path))]
+        if minutes:
+            per_weekday.setdefault(weekday_of(date), []).append((min(minutes), max(minutes)))
+
+    all_days = [span for spans in per_weekday.values() for span in spans]
+    fallback = (
+        (int(median(o for o, _ in all_days)), int(median(c for _, c in all_days)))
+        if all_days else DEFAULT_HOURS
+    )
+    hours = {}
+    for weekday in range(7):
+        spans = per_weekday.get(weekday)
+        hours[weekday] = (
+            (int(median(o for o, _ in spans)), int(median(c for _, c in spans)))
+            if spans else fallback
+        )
+    return hours
+
+
+def last_observed_slot(day):
+    """Slot index of the latest non-null wait in a day dict, or -1"""
+    minutes = [minute for _, minute, _ in iter_ride_slots(day)]
+    return slot_index(max(minutes)) if minutes else -1
+
+
+class LivePoller:
+    """Polls the light current-waits page on a park-hours-aware schedule and the heatmap only when the slot grid advances"""
+
+    def __init__(self, data_dir=DATA_DIR, fetch_page=None, fetch_heatmap=None, clock=None):
+        self.data_dir = data_dir
+        self.fetch_page = fetch_page or fetch_current_waits
+        self.fetch_heatmap = fetch_heatmap or extract_today_data
+        self.clock = clock or (lambda: datetime.now(EASTERN))
+        self.hours = learn_operating_hours(data_dir)
+        self.page_fingerprint = None
+        self.live_fingerprint = None
+        self.today = None
+        self.last_slot = -1
+        self.attempted_slot = -1
+        self.date = None
+        self.requests_made = {'current': 0, 'heatmap': 0}
+        self.weather = WeatherCache(data_dir) if os.environ.get('WEATHER_API_KEY') else None
+
+    def is_open(self, now):
+        open_minute, close_minute = self.hours[now.weekday()]
+        minute = now.hour * 60 + now.minute
+        return open_minute - HOURS_MARGIN_MINUTES <= minute <= close_minute + HOURS_MARGIN_MINUTES
+
+    def next_delay(self, now):
+        """Seconds until the next light poll: frequent while open, otherwise a trickle until opening"""
+        if self.is_open(now):
+            return OPEN_POLL_SECONDS
+        open_minute, _ = self.hours[now.weekday()]
+        until_open = (open_minute - HOURS_MARGIN_MINUTES - (now.hour * 60 + now.minute)) * 60 - now.second
+        if 0 < until_open < CLOSED_POLL_SECONDS:
+            return until_open
+        return CLOSED_POLL_SECONDS
+
+    def expected_slot(self, now):
+        """Latest slot the upstream should have published by now"""
+        return slot_index(now.hour * 60 + now.minute - SLOT_SETTLE_MINUTES)
+
+    async def poll_once(self):
+        now = self.clock()
+        date = now.strftime('%Y-%m-%d')
+        if date != self.date:
+            self.date = date
+            self.last_slot = -1
+            self.attempted_slot = -1
+            self.today = None
+            self.hours = await asyncio.to_thread(learn_operating_hours, self.data_dir)
+
+        if not self.is_open(now):
+            return None
+
+        page = await asyncio.to_thread(self.fetch_page)
+        self.requests_made['current'] += 1
+        fingerprint = hashlib.sha1(page.encode('utf-8')).hexdigest()
+        day = await self.poll_heatmap(now, fingerprint)
+        if day is not None or fingerprint != self.live_fingerprint:
+            self.live_fingerprint = fingerprint
+            await asyncio.to_thread(self.ingest, page, now, day is not None)
+        return day
+
+    async def poll_heatmap(self, now, fingerprint):
+        """Fetch the full-day heatmap only when the slot grid has moved; returns the new day dict or None"""
+        # Only pull the full-day heatmap once the slot grid has moved past what we already hold;
+        # if that attempt came back short, retry within the slot only when the live page changes
+        expected = self.expected_slot(now)
+        if expected <= self.last_slot:
+            return None
+        if expected <= self.attempted_slot and fingerprint == self.page_fingerprint:
+            return None
+
+        day = await asyncio.to_thread(self.fetch_heatmap)
+        self.requests_made['heatmap'] += 1
+        self.attempted_slot = expected
+        self.page_fingerprint = fingerprint
+        if not day:
+            return None
+        slot = last_observed_slot(day)
+        if slot <= self.last_slot:
+            return None
+        self.last_slot = slot
+        self.today = ParkDay.from_legacy(day)
+        print(f"🕒 {now.strftime('%H:%M')} ingested slots up to {minutes_to_time(slot * SLOT_MINUTES)}")
+        return day
+
+    def today_day(self, date):
+        if self.today is None or self.today.date != date:
+            path = os.path.join(self.data_dir, f'today_waits_{date}.json')
+            self.today = ParkDay.load(path) if os.path.exists(path) else empty_day(date)
+        return self.today
+
+    def ingest(self, page, now, new_heatmap):
+        """Apply the live page as a single-slot update on today's day; derived data is refreshed only for a new heatmap
+
+        A live reading changes at most the current slot, so between heatmaps today's file is just
+        saved; the next pipeline run picks the slot up along with the heatmap's.
+        """
+        date = now.strftime('%Y-%m-%d')
+        day = self.today_day(date)
+        changed = apply_current_waits(day, parse_current_waits(page), now.hour * 60 + now.minute, self.last_slot)
+        if changed or new_heatmap:
+            day.save(os.path.join(self.data_dir, f'today_waits_{date}.json'))
+        if changed:
+            print(f"🕒 {now.strftime('%H:%M')} live waits updated for {len(changed)} rides")
+        if not new_heatmap:
+            return
+        refresh_derived([day.to_legacy()], self.data_dir)
+        if self.weather:
+            try:
+                collect_weather(self.data_dir, self.weather)
+            except Exception as e:
+                print(f"❌ Weather snapshot failed: {e}")
+
+    async def run(self):
+        print("🎢 Live poller started")
+        for weekday, (open_minute, close_minute) in sorted(self.hours.items()):
+            print(f"  {weekday}: {minutes_to_time(open_minute)} - {minutes_to_time(close_minute)}")
+        while True:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                print(f"❌ Poll failed: {e}")
+            await asyncio.sleep(self.next_delay(self.clock()))
+
+
+if __name__ == "__main__":
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else DATA_DIR
+    try:
+        asyncio.run(LivePoller(data_dir).run())
+    except KeyboardInterrupt:
+        print("\n👋 Live poller stopped")
@@ -0,0 +1,223 @@
+import asyncio
+import json
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+DEFAULT_RPS = 50
+DEFAULT_DURATION = 10          # seconds
+MAX_CONNECTIONS = 256          # beyond this, requests queue (and the queueing counts as latency)
+REQUEST_TIMEOUT = 30
+PERCENTILES = (50, 90, 99, 99.9)
+
+# Weighted request mixes: (weight, method, path, JSON body or None)
+SCENARIOS = {
+    # python read_api.py (default http://localhost:5001)
+    'read': [
+        (6, 'GET', '/api/wait-times/today', None),
+        (2, 'GET', '/api/wait-times/today?rides=stardust-racers&from=12:00&fields=waitTime,wait_times', None),
+        (2, 'GET', '/api/wait-times/last-week', None),
+        (1, 'GET', '/health', None),
+    ],
+    # node server.js (default http://localhost:5000)
+    'server': [
+        (4, 'GET', '/api/wait-times/today', None),
+        (2, 'GET', '/api/wait-times/last-week', None),
+        (1, 'GET', '/api/wait-stats', None),
+        (1, 'GET', '/api/best-times', None),
+        (1, 'GET', '/api/wait-rollups?from=2025-06-13&to=2025-06-19', None),   # a week of the bundled data/ days
+    ],
+    # server.js ingest path; run it with THRILL_DATA_URL pointing at upstream_stub.py
+    'ingest': [
+        (1, 'POST', '/api/refresh-data', {}),
+    ],
+    # upstream_stub.py itself, to calibrate the harness and injected faults
+    'upstream': [
+        (4, 'GET', '/waits/park/uor/epic-universe/', None),
+        (1, 'GET', '/waits/graph/quick/parkheat?id=243&tag=min', None),
+    ],
+}
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection (Content-Length and chunked responses)"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def request(self, method, host, path, body):
+        payload = json.dumps(body).encode('utf-8') if body is not None else b''
+        headers = f'{method} {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n'
+        if body is not None:
+            headers += f'Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n'
+        self.writer.write(headers.encode('latin-1') + b'\r\n' + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError('connection closed')
+        status = int(status_line.split()[1])
+        length = None
+        chunked = False
+        keep_alive = True
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name = name.strip().lower()
+            value = value.strip().lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'transfer-encoding' and 'chunked' in value:
+                chunked = True
+            elif name == 'connection' and value == 'close':
+                keep_alive = False
+        size = 0
+        if chunked:
+            while True:
+                chunk = int((await self.reader.readline()).split(b';')[0], 16)
+                await self.reader.readexactly(chunk + 2)
+                size += chunk
+                if chunk == 0:
+                    break
+        elif length is not None:
+            size = len(await self.reader.readexactly(length))
+        else:
+            size = len(await self.reader.read())
+            keep_alive = False
+        return status, size, keep_alive
+
+    def close(self):
+        self.writer.close()
+
+
+class LoadTest:
+    """Open-loop load generator: requests start on a fixed schedule whatever the responses do
+
+    Latency is measured from each request's scheduled start, so a stalled server shows up as
+    queueing delay instead of silently lowering the offered rate (no coordinated omission).
+    """
+
+    def __init__(self, base_url, mix, rps=DEFAULT_RPS, duration=DEFAULT_DURATION, max_connections=MAX_CONNECTIONS):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.mix = mix
+        self.rps = rps
+        self.duration = duration
+        self.idle = []
+        self.slots = asyncio.Semaphore(max_connections)
+        self.results = []          # (name, scheduled offset, latency seconds, status or None, bytes)
+
+    async def connect(self):
+        if self.idle:
+            return self.idle.pop()
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        return Connection(reader, writer)
+
+    async def one(self, scheduled, offset, method, path, body):
+        name = f'{method} {path}'
+        async with self.slots:
+            connection = None
+            try:
+                connection = await self.connect()
+                status, size, keep_alive = await asyncio.wait_for(
+                    connection.request(method, f'{self.host}:{self.port}', path, body), REQUEST_TIMEOUT)
+                if keep_alive:
+                    self.idle.append(connection)
+                else:
+                    connection.close()
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError):
+                if connection:
+                    connection.close()
+                status, size = None, 0
+        self.results.append((name, offset, time.perf_counter() - scheduled, status, size))
+
+    async def run(self):
+        weights = np.array([weight for weight, _, _, _ in self.mix], dtype=float)
+        picks = np.random.default_rng(0).choice(len(self.mix), size=int(self.rps * self.duration), p=weights / weights.sum())
+        started = time.perf_counter()
+        tasks = []
+        for i, pick in enumerate(picks):
+            scheduled = started + i / self.rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            _, method, path, body = self.mix[pick]
+            tasks.append(asyncio.create_task(self.one(scheduled, scheduled - started, method, path, body)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        for connection in self.idle:
+            connection.close()
+        return elapsed
+
+
+def summarize(results, elapsed):
+    """Throughput, status counts and latency percentiles (ms), overall and per endpoint"""
+    def block(rows):
+        latencies = np.array([latency for _, _, latency, _, _ in rows]) * 1000
+        statuses = {}
+        for _, _, _, status, _ in rows:
+            key = str(status) if status is not None else 'error'
+            statuses[key] = statuses.get(key, 0) + 1
+        ok = sum(1 for _, _, _, status, _ in rows if status is not None and status < 400)
+        return {
+            'requests': len(rows),
+            'ok': ok,
+            'statuses': statuses,
+            'latencyMs': {f'p{p:g}': round(float(np.percentile(latencies, p)), 2) for p in PERCENTILES}
+            | {'max': round(float(latencies.max()), 2), 'mean': round(float(latencies.mean()), 2)}
+        }
+
+    summary = block(results) if results else {'requests': 0}
+    summary['elapsedSeconds'] = round(elapsed, 3)
+    summary['throughputRps'] = round(summary.get('ok', 0) / elapsed, 1) if elapsed else 0
+    endpoints = {}
+    for row in results:
+        endpoints.setdefault(row[0], []).append(row)
+    summary['endpoints'] = {name: block(rows) for name, rows in sorted(endpoints.items())}
+    return summary
+
+
+def run_load_test(base_url, scenario='read', rps=DEFAULT_RPS, duration=DEFAULT_DURATION, max_connections=MAX_CONNECTIONS):
+    mix = SCENARIOS[scenario] if isinstance(scenario, str) else scenario
+    test = LoadTest(base_url, mix, rps, duration, max_connections)
+    elapsed = asyncio.run(test.run())
+    return summarize(test.results, elapsed)
+
+
+def print_summary(summary, offered_rps):
+    print(f"📊 {summary['requests']} requests offered at {offered_rps:g} rps, "
+          f"{summary['throughputRps']} rps succeeded over {summary['elapsedSeconds']} s")
+    rows = [('all', summary)] + list(summary['endpoints'].items())
+    for name, block in rows:
+        if not block.get('requests'):
+            continue
+        latency = block['latencyMs']
+        statuses = ' '.join(f'{status}:{count}' for status, count in sorted(block['statuses'].items()))
+        print(f"  {name[:60]:60} p50 {latency['p50']:8.2f}  p90 {latency['p90']:8.2f}  "
+              f"p99 {latency['p99']:8.2f}  max {latency['max']:8.2f} ms  [{statuses}]")
+
+
+if __name__ == "__main__":
+    # Usage: python load_test.py BASE_URL [read|server|ingest|upstream] [--rps N] [--duration S] [--connections N] [--json]
+    args = sys.argv[1:]
+    if not args or args[0].startswith('--'):
+        print("Usage: python load_test.py BASE_URL [read|server|ingest|upstream] [--rps N] [--duration S] [--json]")
+        sys.exit(1)
+    scenario = args[1] if len(args) > 1 and not args[1].startswith('--') else 'read'
+    if scenario not in SCENARIOS:
+        print(f"❌ Unknown scenario {scenario}; choose from {', '.join(SCENARIOS)}")
+        sys.exit(1)
+    rps = float(args[args.index('--rps') + 1]) if '--rps' in args else DEFAULT_RPS
+    duration = float(args[args.index('--duration') + 1]) if '--duration' in args else DEFAULT_DURATION
+    connections = int(args[args.index('--connections') + 1]) if '--connections' in args else MAX_CONNECTIONS
+    summary = run_load_test(args[0], scenario, rps, duration, connections)
+    if '--json' in args:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary, rps)
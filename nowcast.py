@@ -0,0 +1,219 @@
+import os
+import sys
+from datetime import datetime
+
+from best_times import THRESHOLDS, below_threshold_runs
+from rolling_stats import RunningStats, WaitStatsStore
+from wait_data import (
+    DATA_DIR, SLOT_MINUTES, derived_path, is_ride_name, latest_today_file, load_day,
+    minutes_to_time, time_to_minutes, weekday_of, write_json
+)
+
+NOWCAST_FILE = derived_path(DATA_DIR, 'nowcast.json')
+SCALE_DECAY = 0.85        # per-slot decay of older observations in the scale estimate
+PRIOR_MINUTES = 60.0      # shrinks the scale towards 1.0 until enough of today has been seen
+LEVEL_DECAY = 0.7         # per-slot decay of the gap between the last observation and the scaled curve
+SCALE_LIMITS = (0.25, 4.0)
+
+
+class RideNowcast:
+    """Running state for one ride: decayed observed/historical sums, the latest observation,
+    and today's folded slots {minute: (wait, expected)} so a corrected slot can be re-folded
+    """
+
+    __slots__ = ('last_minute', 'observed', 'expected', 'last_wait', 'last_expected', 'slots')
+
+    def __init__(self, last_minute=-1, observed=0.0, expected=0.0, last_wait=None, last_expected=None, slots=()):
+        self.last_minute = last_minute
+        self.observed = observed
+        self.expected = expected
+        self.last_wait = last_wait
+        self.last_expected = last_expected
+        self.slots = {minute: (wait, slot_expected) for minute, wait, slot_expected in slots}
+
+    def update(self, minute, wait, expected):
+        self.observed = self.observed * SCALE_DECAY + wait
+        self.expected = self.expected * SCALE_DECAY + expected
+        self.last_minute = minute
+        self.last_wait = wait
+        self.last_expected = expected
+
+    def refold(self):
+        """Rebuild the decayed sums from today's slots after one of them changed"""
+        self.observed = self.expected = 0.0
+        for minute, (wait, expected) in sorted(self.slots.items()):
+            self.update(minute, wait, expected)
+
+    @property
+    def scale(self):
+        low, high = SCALE_LIMITS
+        return min(max((self.observed + PRIOR_MINUTES) / (self.expected + PRIOR_MINUTES), low), high)
+
+    def to_list(self):
+        return [self.last_minute, round(self.observed, 3), round(self.expected, 3), self.last_wait, self.last_expected,
+                [[minute, wait, expected] for minute, (wait, expected) in sorted(self.slots.items())]]
+
+
+class Nowcaster:
+    """Blends today's observed slots with the historical curve, one new slot at a time"""
+
+    def __init__(self, store, date):
+        self.store = store
+        self.date = date
+        self.weekday = weekday_of(date)
+        self.rides = {}
+
+    def historical(self, ride, minute, exclude=None):
+        """Historical mean wait for the slot on this weekday (all weekdays as fallback).
+
+        `exclude` removes today's own observation, which the rolling stats have already folded in;
+        a weekday bucket holding nothing but today falls back like an empty one.
+        """
+        stats = self.store.slot_stats(ride, self.weekday, minute)
+        own = 1 if exclude is not None and stats is not None and stats.count else 0
+        if stats is None or stats.count <= own:
+            stats = RunningStats()
+            for weekday in range(7):
+                other = self.store.slot_stats(ride, weekday, minute)
+                if other is not None:
+                    stats.merge(other)
+        if stats.count <= own:
+            return None
+        if own:
+            return (stats.mean * stats.count - exclude) / (stats.count - 1)
+        return stats.mean
+
+    def observe(self, ride, minute, wait):
+        """Fold in one observed slot; returns False if we already have it with this wait.
+
+        A new slot extends the running sums; a corrected or backfilled earlier slot re-folds the day.
+        """
+        state = self.rides.setdefault(ride, RideNowcast())
+        previous = state.slots.get(minute)
+        if previous is not None and previous[0] == wait:
+            return False
+        expected = self.historical(ride, minute, exclude=wait)
+        if expected is None:
+            expected = wait
+        state.slots[minute] = (wait, expected)
+        if minute > state.last_minute:
+            state.update(minute, wait, expected)
+        else:
+            state.refold()
+        return True
+
+    def forecast(self, ride, minute):
+        """Forecast wait for a later slot: scaled historical curve plus a decaying level correction"""
+        state = self.rides.get(ride)
+        expected = self.historical(ride, minute)
+        if state is None or state.last_wait is None:
+            return None if expected is None else round(expected)
+        if expected is None:
+            return state.last_wait
+        steps = max((minute - state.last_minute) // SLOT_MINUTES, 1)
+        gap = state.last_wait - state.last_expected * state.scale
+        return max(round(expected * state.scale + gap * LEVEL_DECAY ** steps), 0)
+
+    def ingest_day(self, day):
+        added = 0
+        for ride in day.get('rides', []):
+            if not is_ride_name(ride.get('name')):
+                continue
+            for entry in ride.get('wait_times', []):
+                minute = time_to_minutes(entry.get('time'))
+                if minute is not None and entry.get('wait') is not None:
+                    added += self.observe(ride['name'], minute, entry['wait'])
+        return added
+
+    def historical_minutes(self):
+        """{ride: set of slot minutes} with history for this weekday (any weekday as fallback)"""
+        same_day, any_day = {}, {}
+        for ride, weekday, minute in self.store.history:
+            any_day.setdefault(ride, set()).add(minute)
+            if weekday == self.weekday:
+                same_day.setdefault(ride, set()).add(minute)
+        return {ride: same_day.get(ride) or minutes for ride, minutes in any_day.items()}
+
+    def annotate(self, day):
+        """Copy of the day with a 'forecast' next to every slot after each ride's last observation,
+        extended to the historical closing slot when the day file stops early
+
+        Each ride also gets its runs of slots at or under every threshold, observed or forecast,
+        so "when does it next drop below N" is a lookup rather than a scan of the curve.
+        """
+        history_minutes = self.historical_minutes()
+        rides = []
+        for ride in day.get('rides', []):
+            if not is_ride_name(ride.get('name')):
+                continue
+            state = self.rides.get(ride['name'])
+            last_minute = state.last_minute if state else -1
+            observed = {}
+            for entry in ride.get('wait_times', []):
+                minute = time_to_minutes(entry.get('time'))
+                if minute is not None:
+                    observed[minute] = entry.get('wait')
+            wait_times = []
+            curve = {}
+            for minute in sorted(set(observed) | history_minutes.get(ride['name'], set())):
+                slot = {'time': minutes_to_time(minute), 'wait': observed.get(minute)}
+                if minute > last_minute:
+                    slot['forecast'] = self.forecast(ride['name'], minute)
+                wait_times.append(slot)
+                value = slot['forecast'] if 'forecast' in slot else slot['wait']
+                if value is not None:
+                    curve[minute] = value
+            rides.append({
+                'name': ride['name'],
+                'waitTime': ride.get('waitTime'),
+                'status': ride.get('status'),
+                'scale': round(state.scale, 3) if state else 1.0,
+                'below': {str(threshold): below_threshold_runs(curve, threshold) for threshold in THRESHOLDS},
+                'wait_times': wait_times
+            })
+        return {
+            'date': day['date'],
+            'park': day.get('park'),
+            'updated': datetime.now().isoformat(timespec='seconds'),
+            'thresholds': THRESHOLDS,
+            'rides': rides
+        }
+
+    def to_dict(self):
+        return {'date': self.date, 'rides': {ride: state.to_list() for ride, state in self.rides.items()}}
+
+    @classmethod
+    def from_dict(cls, store, data):
+        nowcaster = cls(store, data['date'])
+        nowcaster.rides = {ride: RideNowcast(*values) for ride, values in data.get('rides', {}).items()}
+        return nowcaster
+
+
+def update_nowcast(day, data_dir=DATA_DIR, store=None):
+    """Fold the new slots of today's day dict into the nowcast state and rewrite the forecast file"""
+    store = store or WaitStatsStore.load(derived_path(data_dir, 'rolling_stats.json'))
+    state_file = derived_path(data_dir, 'nowcast_state.json')
+    nowcaster = None
+    if os.path.exists(state_file):
+        state = load_day(state_file)
+        if state.get('date') == day['date']:
+            nowcaster = Nowcaster.from_dict(store, state)
+        elif state.get('date', '') > day['date']:
+            # Backfilled history never replaces the nowcast for a later day
+            return Nowcaster.from_dict(store, state), 0
+    nowcaster = nowcaster or Nowcaster(store, day['date'])
+    added = nowcaster.ingest_day(day)
+    write_json(state_file, nowcaster.to_dict())
+    write_json(derived_path(data_dir, 'nowcast.json'), nowcaster.annotate(day))
+    return nowcaster, added
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else latest_today_file()
+    if not path:
+        print("❌ No today_waits file found")
+        sys.exit(1)
+    nowcaster, added = update_nowcast(load_day(path))
+    print(f"🔮 Nowcast for {nowcaster.date}: {added} new slots folded in, saved to {NOWCAST_FILE}")
+    for ride, state in sorted(nowcaster.rides.items()):
+        print(f"  {ride:30} scale {state.scale:4.2f} | last {state.last_wait} min")
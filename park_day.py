@@ -0,0 +1,320 @@
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+from wait_data import (
+    DATA_DIR, SLOT_MINUTES, SLOTS_PER_DAY, is_ride_name, list_day_files, load_day, time_to_minutes, weekday_of,
+    write_json
+)
+
+NULL_WAIT = -1            # slot is listed for the ride but its wait is null
+NO_SLOT = -2              # ride has no entry for this time label at all (short rows)
+COMPACT_MAGIC = b'PKD1'
+COMPACT_EXTENSION = '.pkd'
+LEGACY_RIDE_KEYS = ('name', 'waitTime', 'status', 'wait_times')
+LEGACY_DAY_KEYS = ('date', 'park', 'rides')
+
+_label_sets = {}          # every day of a season shares one copy of its time labels and minute array
+
+
+def shared_labels(times):
+    """Interned (labels tuple, read-only int16 minutes array) for a list of time labels"""
+    key = tuple(times)
+    if key not in _label_sets:
+        minutes = [time_to_minutes(label) for label in key]
+        array = np.array([-1 if minute is None else minute for minute in minutes], dtype=np.int16)
+        array.flags.writeable = False
+        _label_sets[key] = (key, array)
+    return _label_sets[key]
+
+
+class RideSeries:
+    """One ride of a ParkDay: its metadata plus a zero-copy view of its row in the day's wait matrix
+
+    waitTime/status stay None when the legacy row did not carry them (the last-week extractor
+    writes only name and wait_times); `fields` remembers which keys to write back.
+    """
+
+    __slots__ = ('day', 'row', 'name', 'waitTime', 'status', 'fields', 'extra')
+
+    def __init__(self, day, row, name, waitTime=None, status=None, fields=LEGACY_RIDE_KEYS, extra=None):
+        self.day = day
+        self.row = row
+        self.name = name
+        self.waitTime = waitTime
+        self.status = status
+        self.fields = fields
+        self.extra = extra
+
+    @property
+    def waits(self):
+        """int16 view of this ride's slots (NULL_WAIT / NO_SLOT for gaps); writes go straight to the day"""
+        return self.day.waits[self.row]
+
+    def observed(self):
+        """(minutes, waits) int arrays of the slots with a real wait at a real time label"""
+        waits = self.waits
+        mask = (waits >= 0) & (self.day.minutes >= 0)
+        return self.day.minutes[mask], waits[mask]
+
+    def latest(self):
+        """Most recent observed wait, or None"""
+        _, waits = self.observed()
+        return int(waits[-1]) if len(waits) else None
+
+    def to_legacy(self):
+        ride = {}
+        for key in self.fields:
+            if key == 'wait_times':
+                times = self.day.times
+                ride[key] = [{'time': times[j], 'wait': None if wait == NULL_WAIT else wait}
+                             for j, wait in enumerate(self.waits.tolist()) if wait != NO_SLOT]
+            elif key in LEGACY_RIDE_KEYS:
+                ride[key] = getattr(self, key)
+        if self.extra:
+            ride.update(self.extra)
+        return ride
+
+    def header(self):
+        """Legacy ride dict without wait_times, as stored in the compact header"""
+        ride = {key: getattr(self, key) for key in self.fields if key != 'wait_times'}
+        ride['fields'] = list(self.fields)
+        if self.extra:
+            ride['extra'] = self.extra
+        return ride
+
+
+class ParkDay:
+    """A park-day as one (rides, time labels) int16 matrix instead of a dict per slot
+
+    Time labels are shared by every ride, so a season of days costs a few kilobytes each.
+    Converts losslessly to and from the legacy today_waits/last_week_waits JSON, including
+    the "Average" row and any junk rows the extractors let through.
+    """
+
+    __slots__ = ('date', 'park', 'times', 'minutes', 'waits', 'rides', 'ride_index', 'extra')
+
+    def __init__(self, date, park, times, waits, rides=(), extra=None):
+        self.date = date
+        self.park = park
+        self.times, self.minutes = shared_labels(times)
+        self.waits = waits
+        self.rides = []
+        self.ride_index = {}
+        self.extra = extra
+        for ride in rides:
+            self._append(ride)
+
+    def _append(self, ride):
+        series = RideSeries(self, len(self.rides), ride['name'], ride.get('waitTime'), ride.get('status'),
+                            tuple(ride.get('fields', LEGACY_RIDE_KEYS)), ride.get('extra'))
+        self.rides.append(series)
+        self.ride_index.setdefault(series.name, series)
+        return series
+
+    def __len__(self):
+        return len(self.rides)
+
+    def __iter__(self):
+        return iter(self.rides)
+
+    def __getitem__(self, name):
+        return self.ride_index[name]
+
+    def column(self, label):
+        """Column of a time label, inserting it in time order (null for every ride) if the day lacks it"""
+        if label in self.times:
+            return self.times.index(label)
+        minute = time_to_minutes(label)
+        if minute is None:
+            raise ValueError(f'invalid time label: {label}')
+        position = int(np.searchsorted(self.minutes, minute))
+        times = list(self.times)
+        times.insert(position, label)
+        self.times, self.minutes = shared_labels(times)
+        self.waits = np.insert(self.waits, position, NULL_WAIT, axis=1)
+        return position
+
+    def add_ride(self, name):
+        """Append a ride with every slot null (today_waits style) and return its series"""
+        self.waits = np.vstack([self.waits, np.full((1, len(self.times)), NULL_WAIT, dtype=np.int16)])
+        return self._append({'name': name, 'waitTime': None, 'status': 'Down'})
+
+    def set_wait(self, name, label, wait, overwrite=True):
+        """Single-slot update: one ride's wait at one time label; returns whether the cell changed"""
+        series = self.ride_index.get(name) or self.add_ride(name)
+        column = self.column(label)
+        value = NULL_WAIT if wait is None else wait
+        current = int(self.waits[series.row, column])
+        if current == value or (not overwrite and current >= 0):
+            return False
+        if not self.waits.flags.writeable:
+            self.waits = self.waits.copy()
+        self.waits[series.row, column] = value
+        return True
+
+    @classmethod
+    def from_legacy(cls, body):
+        """Build from a legacy day dict; rows whose labels match the first ride's are filled in one step"""
+        times = []
+        columns = {}
+        rows = []
+        headers = []
+        for ride in body.get('rides', []):
+            entries = ride.get('wait_times', [])
+            labels = [entry.get('time') for entry in entries]
+            waits = [NULL_WAIT if entry.get('wait') is None else entry['wait'] for entry in entries]
+            if labels != times:
+                for label in labels:
+                    if label not in columns:
+                        columns[label] = len(times)
+                        times.append(label)
+            rows.append((labels, waits))
+            header = {'name': ride.get('name'), 'waitTime': ride.get('waitTime'), 'status': ride.get('status'),
+                      'fields': [key for key in ride if key in LEGACY_RIDE_KEYS]}
+            extra = {key: value for key, value in ride.items() if key not in LEGACY_RIDE_KEYS}
+            if extra:
+                header['extra'] = extra
+            headers.append(header)
+
+        matrix = np.full((len(rows), len(times)), NO_SLOT, dtype=np.int16)
+        for r, (labels, waits) in enumerate(rows):
+            if len(labels) <= len(times) and labels == times[:len(labels)]:
+                matrix[r, :len(waits)] = waits
+            else:
+                matrix[r, [columns[label] for label in labels]] = waits
+        extra = {key: value for key, value in body.items() if key not in LEGACY_DAY_KEYS}
+        return cls(body.get('date'), body.get('park'), times, matrix, headers, extra or None)
+
+    @classmethod
+    def from_grid(cls, date, park, names, labels, rows, pad=True, summary=True):
+        """Build from the heatmap's ride names, x labels and raw z/text rows ('' or junk become null)
+
+        The "Average" column is dropped. With pad, short rows get null slots up to the last label
+        (today_waits style); without it they simply end. With summary, each ride gets the
+        latest wait as waitTime and an Open/Down status.
+        """
+        labels = list(labels)
+        if 'Average' in labels:
+            cut = labels.index('Average')
+            labels = [label for label in labels if label != 'Average']
+            rows = [row[:cut] for row in rows]
+        matrix = np.full((len(names), len(labels)), NULL_WAIT if pad else NO_SLOT, dtype=np.int16)
+        headers = []
+        for r, (name, row) in enumerate(zip(names, rows)):
+            waits = []
+            for value in row[:len(labels)]:
+                try:
+                    waits.append(NULL_WAIT if value == '' or value is None else int(value))
+                except (TypeError, ValueError):
+                    waits.append(NULL_WAIT)
+            matrix[r, :len(waits)] = waits
+            header = {'name': name, 'fields': ['name', 'wait_times']}
+            if summary:
+                current = next((wait for wait in reversed(waits) if wait != NULL_WAIT), None)
+                header.update(waitTime=current, status='Open' if current is not None else 'Down',
+                              fields=list(LEGACY_RIDE_KEYS))
+            headers.append(header)
+        return cls(date, park, labels, matrix, headers)
+
+    def to_legacy(self):
+        body = {'date': self.date, 'park': self.park, 'rides': [ride.to_legacy() for ride in self.rides]}
+        if self.extra:
+            body.update(self.extra)
+        return body
+
+    def encode(self):
+        """Compact form: magic, header length, JSON header (labels and ride metadata), raw int16 matrix"""
+        header = json.dumps({
+            'date': self.date, 'park': self.park, 'times': self.times, 'shape': list(self.waits.shape),
+            'rides': [ride.header() for ride in self.rides], 'extra': self.extra
+        }, separators=(',', ':')).encode('utf-8')
+        return COMPACT_MAGIC + struct.pack('<I', len(header)) + header + self.waits.astype('<i2').tobytes()
+
+    @classmethod
+    def decode(cls, data):
+        """Inverse of encode; the wait matrix is a read-only view over `data`, not a copy"""
+        if data[:4] != COMPACT_MAGIC:
+            raise ValueError('not a compact park-day file')
+        (length,) = struct.unpack_from('<I', data, 4)
+        header = json.loads(bytes(data[8:8 + length]))
+        waits = np.frombuffer(data, dtype='<i2', offset=8 + length).reshape(header['shape'])
+        return cls(header['date'], header['park'], header['times'], waits, header['rides'], header['extra'])
+
+    @classmethod
+    def load(cls, path):
+        """Read a .pkd compact file or a legacy JSON day file"""
+        if path.endswith(COMPACT_EXTENSION):
+            with open(path, 'rb') as f:
+                return cls.decode(f.read())
+        return cls.from_legacy(load_day(path))
+
+    def save(self, path):
+        """Write atomically, compact for .pkd paths and legacy JSON otherwise"""
+        if not path.endswith(COMPACT_EXTENSION):
+            write_json(path, self.to_legacy())
+            return
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.encode())
+        os.replace(tmp_path, path)
+
+    def iter_slots(self):
+        """Yield (ride, minute, wait) like wait_data.iter_ride_slots, without walking slot dicts"""
+        for ride in self.rides:
+            if is_ride_name(ride.name):
+                minutes, waits = ride.observed()
+                for minute, wait in zip(minutes.tolist(), waits.tolist()):
+                    yield ride.name, minute, wait
+
+    def slot_matrix(self, rides):
+        """(len(rides), SLOTS_PER_DAY) float array of observed waits for the given names, NaN elsewhere"""
+        matrix = np.full((len(rides), SLOTS_PER_DAY), np.nan)
+        for r, name in enumerate(rides):
+            series = self.ride_index.get(name)
+            if series is not None:
+                minutes, waits = series.observed()
+                matrix[r, minutes // SLOT_MINUTES] = waits
+        return matrix
+
+
+def season_sources(data_dir=DATA_DIR, start=None, end=None, weekday=None):
+    """{date: day file path or archive Partition} for every day in [start, end], without loading any
+
+    Day files win; dates whose JSON has been pruned come from the monthly archive.
+    """
+    from archive import Partition, list_partitions
+
+    def wanted(date):
+        return (not start or date >= start) and (not end or date <= end) and \
+            (weekday is None or weekday_of(date) == weekday)
+
+    sources = {date: path for date, path in list_day_files(data_dir).items() if wanted(date)}
+    for month, path in list_partitions(data_dir).items():
+        if (start and month < start[:7]) or (end and month > end[:7]):
+            continue
+        partition = Partition(path)
+        for date in partition.dates():
+            if date not in sources and wanted(date):
+                sources[date] = partition
+    return dict(sorted(sources.items()))
+
+
+def load_season(data_dir=DATA_DIR, start=None, end=None, weekday=None):
+    """{date: ParkDay} for every day in [start, end] (optionally one weekday, Monday=0), archived days included"""
+    return {date: ParkDay.load(source) if isinstance(source, str) else source.read_day(date)
+            for date, source in season_sources(data_dir, start, end, weekday).items()}
+
+if __name__ == "__main__":
+    # Usage: python park_day.py INPUT OUTPUT   (converts between legacy .json and compact .pkd)
+    if len(sys.argv) != 3:
+        print("Usage: python park_day.py INPUT OUTPUT")
+        sys.exit(1)
+    day = ParkDay.load(sys.argv[1])
+    day.save(sys.argv[2])
+    print(f"✅ {day.date}: {len(day)} rides x {len(day.times)} slots -> {sys.argv[2]} "
+          f"({os.path.getsize(sys.argv[2])} bytes, from {os.path.getsize(sys.argv[1])})")
@@ -0,0 +1,54 @@
+import sys
+import time
+
+from archive import archive_days
+from best_times import update_best_times
+from crowd_calendar import update_crowd_calendar
+from nowcast import update_nowcast
+from rolling_stats import update_rolling_stats
+from rollups import update_rollups
+from similar_days import update_similar_days
+from wait_data import DATA_DIR, latest_today_file, load_day
+
+# Derived-data stages run after new wait data lands, in order.
+# Each stage takes (data_dir, days, results): days is the list of day dicts that changed and
+# results holds the return values of the stages that already ran, keyed by stage name.
+STAGES = [
+    ('rolling_stats', lambda data_dir, days, results: update_rolling_stats(data_dir=data_dir, days=days)[0]),
+    ('nowcast', lambda data_dir, days, results: update_nowcast(latest_day(days), data_dir, store=results['rolling_stats'])[0]),
+    ('best_times', lambda data_dir, days, results: update_best_times(data_dir, store=results['rolling_stats'])),
+    ('rollups', lambda data_dir, days, results: update_rollups(data_dir, days)),
+    ('similar_days', lambda data_dir, days, results: update_similar_days(data_dir, days)),
+    ('crowd_calendar', lambda data_dir, days, results: update_crowd_calendar(data_dir, days, store=results['rolling_stats'])),
+    ('archive', lambda data_dir, days, results: archive_days(days, data_dir)),
+]
+
+
+def latest_day(days):
+    """The most recent day among the ingested ones (the one still being observed)"""
+    return max(days, key=lambda day: day['date'])
+
+
+def refresh_derived(days, data_dir=DATA_DIR, verbose=True):
+    """Run every derived-data stage for the given (new or updated) day dicts"""
+    timings = {}
+    results = {}
+    for name, stage in STAGES:
+        started = time.perf_counter()
+        results[name] = stage(data_dir, days, results)
+        timings[name] = time.perf_counter() - started
+        if verbose:
+            print(f"  ⚙️  {name}: {timings[name] * 1000:.1f} ms")
+    return timings
+
+
+if __name__ == "__main__":
+    # Refresh derived data from the given day files, or from the latest today_waits file
+    paths = sys.argv[1:] or [latest_today_file()]
+    paths = [path for path in paths if path]
+    if not paths:
+        print("❌ No day files found to ingest")
+        sys.exit(1)
+    print(f"🔄 Refreshing derived data from {', '.join(paths)}")
+    refresh_derived([load_day(path) for path in paths])
+    print("✅ Derived data refreshed")
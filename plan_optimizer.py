@@ -0,0 +1,613 @@
+import json
+import os
+import sys
+import time
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+from park_day import season_sources
+from plan_risk import RIDE_MINUTES, WaitSampler
+from wait_data import DATA_DIR, SLOT_MINUTES, SLOTS_PER_DAY, minutes_to_time, parse_time, weekday_of
+
+DEFAULT_BUDGET_MS = 200
+REPLAN_BUDGET_MS = 10
+MAX_BUDGET_MS = 1000       # longest search a caller may ask the shared read API for
+REPLAN_BATCH_SIZE = 512    # smaller batches so a re-plan stops close to its budget
+SOLUTION_CACHE_SIZE = 256  # plans whose last re-planned order is kept for warm starts
+PLAN_CACHE_SIZE = 1024     # optimized plans kept per forecast version
+PARTIAL_OVERLAP = 0.6      # Jaccard overlap with a cached ride set needed to warm-start from it
+PARTIAL_BUDGET_SHARE = 0.25  # share of the search budget a warm-started optimization gets
+FORECAST_CHECK_SECONDS = 5   # how often to look for a newly published forecast
+BEAM_WIDTH = 64
+BATCH_SIZE = 2048         # neighbour orders evaluated per NumPy pass
+LATE_PENALTY = 10         # cost per minute an item starts after its window closes / its fixed time
+OVERRUN_PENALTY = 3       # cost per minute the plan runs past planEndTime
+DEFAULT_WAIT = 30         # same default the client uses when a ride has no data
+BREAK_TYPES = ('spacer', 'break')
+
+
+def expected_waits(data_dir=DATA_DIR, date=None, end=None):
+    """({ride: row}, (rides, slots) mean historical wait) used to cost each item at its start slot"""
+    sampler = WaitSampler.from_history(data_dir, date, end=end, jitter_sigma=0)
+    if sampler.day_count == 0:
+        return {}, np.zeros((0, SLOTS_PER_DAY))
+    return sampler.ride_index, sampler.waits.mean(axis=1)
+
+
+def history_sources(data_dir=DATA_DIR):
+    """{date: day file path or archive Partition} for the finished days: every day before the newest one
+
+    The newest day is the one the live poller keeps rewriting, so it stays out of the tables.
+    """
+    sources = season_sources(data_dir)
+    newest = max(sources, default=None)
+    return {date: source for date, source in sources.items() if date != newest}
+
+
+def forecast_version(data_dir=DATA_DIR):
+    """(short digest, last date) of the finished days the expected-wait tables are built from
+
+    Day files are stamped by mtime and size, archived days by their digest in the partition
+    index, so appending today to the archive does not change the version.
+    """
+    stamps = []
+    for date, source in history_sources(data_dir).items():
+        if isinstance(source, str):
+            stat = os.stat(source)
+            stamps.append((date, stat.st_mtime_ns, stat.st_size))
+        else:
+            stamps.append((date, source.load()['days'][date]['digest']))
+    end = stamps[-1][0] if stamps else None
+    return f'{zlib.crc32(repr(stamps).encode()):08x}', end
+
+
+def clamp_budget(budget_ms):
+    """A client-supplied budgetMs limited to [0, MAX_BUDGET_MS]"""
+    budget_ms = float(budget_ms)
+    if np.isnan(budget_ms):
+        raise ValueError('budgetMs must be a number')
+    return min(max(budget_ms, 0.0), MAX_BUDGET_MS)
+
+
+def day_type(date):
+    """Which expected-wait table a date uses: its weekday, or None for the all-days table"""
+    return weekday_of(date) if date else None
+
+
+def item_window(item):
+    """(earliest, latest) start minutes from an item's fixedTime or windowStart/windowEnd ("HH:MM")"""
+    if item.get('fixedTime'):
+        fixed = parse_time(item['fixedTime'])
+        return fixed, fixed
+    earliest = parse_time(item['windowStart']) if item.get('windowStart') else -np.inf
+    latest = parse_time(item['windowEnd']) if item.get('windowEnd') else np.inf
+    return earliest, latest
+
+
+def item_key(item):
+    """Identity of a plan item across re-plans (the client rewrites waitTime/estimated times each time)"""
+    return item.get('type'), item.get('name'), item.get('duration'), item.get('rideTime')
+
+
+def item_signature(item, ride_index):
+    """Everything that changes how an item is costed, as a string so plans can be compared as sorted tuples"""
+    window = item.get('fixedTime'), item.get('windowStart'), item.get('windowEnd')
+    fallback = None if item.get('name') in ride_index else item.get('waitTime')
+    return repr(item_key(item) + window + (fallback,))
+
+
+class PlanProblem:
+    """Plan items as arrays: per-item duration by start slot plus start windows, evaluated in batches"""
+
+    def __init__(self, items, start_minutes, end_minutes, ride_index, waits, row_cache=None):
+        self.items = items
+        self.start = float(start_minutes)
+        self.end = float(end_minutes)
+        self.size = len(items)
+        self.durations = np.zeros((self.size, SLOTS_PER_DAY))
+        self.earliest = np.empty(self.size)
+        self.latest = np.empty(self.size)
+        for i, item in enumerate(items):
+            # Rides without history fall back to the client's waitTime, so it is part of their row's key
+            key = item_key(item) + (None if item.get('name') in ride_index else item.get('waitTime'),)
+            if row_cache is not None and key in row_cache:
+                self.durations[i] = row_cache[key]
+            else:
+                self.durations[i] = self.duration_row(item, ride_index, waits)
+                if row_cache is not None:
+                    row_cache[key] = self.durations[i].copy()
+            self.earliest[i], self.latest[i] = item_window(item)
+
+    @staticmethod
+    def duration_row(item, ride_index, waits):
+        if item.get('type') in BREAK_TYPES:
+            return np.full(SLOTS_PER_DAY, float(item.get('duration', 0)))
+        row = ride_index.get(item.get('name'))
+        ride_time = item.get('rideTime', RIDE_MINUTES)
+        if row is not None:
+            return waits[row] + ride_time
+        return np.full(SLOTS_PER_DAY, float(item.get('waitTime') or DEFAULT_WAIT) + ride_time)
+
+    def advance(self, clock, late, item):
+        """Start `item` (array) at `clock`: wait for its window, charge lateness, add its duration"""
+        clock = np.maximum(clock, self.earliest[item])
+        late = late + np.maximum(clock - self.latest[item], 0)
+        slots = np.minimum(clock // SLOT_MINUTES, SLOTS_PER_DAY - 1).astype(np.int64)
+        return clock + self.durations[item, slots], late
+
+    def cost(self, finish, late):
+        return finish + LATE_PENALTY * late + OVERRUN_PENALTY * np.maximum(finish - self.end, 0)
+
+    def evaluate(self, orders, start=None):
+        """Costs for a (B, n) batch of item orders, one vectorized step per plan position"""
+        clock = np.full(len(orders), self.start if start is None else float(start))
+        late = np.zeros(len(orders))
+        for position in range(orders.shape[1]):
+            clock, late = self.advance(clock, late, orders[:, position])
+        return self.cost(clock, late)
+
+    def timeline(self, order, start=None):
+        """[(start, end, late)] minutes for one order"""
+        clock = self.start if start is None else float(start)
+        rows = []
+        for item in order:
+            begin = max(clock, self.earliest[item])
+            late = max(begin - self.latest[item], 0)
+            slot = min(max(int(begin // SLOT_MINUTES), 0), SLOTS_PER_DAY - 1)
+            clock = begin + self.durations[item, slot]
+            rows.append((begin, clock, late))
+        return rows
+
+
+def beam_search(problem, width=BEAM_WIDTH, start=None):
+    """Build orders position by position keeping the `width` best partial plans; returns them best first"""
+    n = problem.size
+    orders = np.zeros((1, 0), dtype=np.int64)
+    used = np.zeros((1, n), dtype=bool)
+    clock = np.array([problem.start if start is None else float(start)])
+    late = np.zeros(1)
+    items = np.arange(n)
+    windowed = np.flatnonzero(np.isfinite(problem.latest))
+    for _ in range(n):
+        parents = np.repeat(np.arange(len(orders)), n)
+        candidates = np.tile(items, len(orders))
+        next_clock, next_late = problem.advance(clock[parents], late[parents], candidates)
+        next_used = used[parents]
+        next_used[np.arange(len(candidates)), candidates] = True
+        # Items still to place whose window has already closed will be late by at least this much
+        missed = np.where(next_used[:, windowed], 0,
+                          np.maximum(next_clock[:, None] - problem.latest[windowed], 0)).sum(axis=1)
+        score = problem.cost(next_clock, next_late + missed)
+        score[used[parents, candidates]] = np.inf
+        keep = np.argsort(score, kind='stable')[:width]
+        keep = keep[np.isfinite(score[keep])]
+        orders = np.hstack([orders[parents[keep]], candidates[keep, None]])
+        used, clock, late = next_used[keep], next_clock[keep], next_late[keep]
+    return orders
+
+
+@lru_cache(maxsize=64)
+def neighbourhood(n, max_segment=3):
+    """Index permutations for every 2-opt (segment reversal) and or-opt (segment move) on n positions"""
+    positions = np.arange(n)
+    i, j = np.triu_indices(n, 1)
+    i, j = i[:, None], j[:, None]
+    reversals = np.where((positions >= i) & (positions <= j), i + j - positions, positions)
+
+    # Moving segment [s, s+L) to start at t rotates the window between them. Moving a segment
+    # past a shorter neighbour is the same as moving that neighbour the other way, so each
+    # rotation is generated once; a single item moved one place is already a reversal.
+    moves = []
+    for length in range(1, max_segment + 1):
+        s, t = np.meshgrid(np.arange(n - length + 1), np.arange(n - length + 1), indexing='ij')
+        distance = np.abs(s - t)
+        keep = (distance > length) | ((distance == length) & (t > s) & (length > 1))
+        s, t = s[keep][:, None], t[keep][:, None]
+        low = np.minimum(s, t)
+        width = np.abs(s - t) + length
+        shift = np.where(t > s, length, width - length)
+        inside = (positions >= low) & (positions < low + width)
+        moves.append(np.where(inside, low + (positions - low + shift) % width, positions))
+    return np.vstack([reversals] + moves)
+
+
+class PlanOptimizer:
+    """Anytime optimizer: beam search seeds, then batched 2-opt/or-opt local search with random restarts
+
+    Call improve() as often as there is time for; `best_order`/`best_cost` always hold the best
+    plan found so far and each call continues from where the previous one stopped.
+    """
+
+    def __init__(self, problem, seed=None, start=None, initial_order=None, beam=True):
+        self.problem = problem
+        self.start = start
+        self.rng = np.random.default_rng(seed)
+        self.best_order = None
+        self.best_cost = np.inf
+        self.current = None
+        self.current_cost = np.inf
+        self.evaluations = 0
+        self.iterations = 0
+        self.seeded = not beam
+        self.history = []      # (search ms, cost) for every improvement
+        self.elapsed = 0.0     # search time spent in earlier improve() calls
+        self.call_started = time.perf_counter()
+        if initial_order is not None:
+            # One starting order, or several stacked as rows
+            orders = np.atleast_2d(np.asarray(initial_order, dtype=np.int64))
+            if orders.shape[1] == problem.size:
+                self._offer(orders)
+
+    def _offer(self, orders):
+        costs = self.problem.evaluate(orders, self.start)
+        self.evaluations += len(orders)
+        best = int(np.argmin(costs))
+        if costs[best] < self.current_cost - 1e-9:
+            self.current, self.current_cost = orders[best].copy(), float(costs[best])
+        if costs[best] < self.best_cost - 1e-9:
+            self.best_order, self.best_cost = orders[best].copy(), float(costs[best])
+            search_ms = (self.elapsed + time.perf_counter() - self.call_started) * 1000
+            self.history.append((round(search_ms, 2), round(self.best_cost, 1)))
+
+    def _perturb(self):
+        """Double-bridge kick on the best order to leave a local optimum"""
+        n = self.problem.size
+        cuts = np.sort(self.rng.choice(np.arange(1, n), size=3, replace=False))
+        a, b, c = cuts
+        order = self.best_order
+        self.current = np.concatenate([order[:a], order[c:], order[b:c], order[a:b]])
+        self.current_cost = float(self.problem.evaluate(self.current[None, :], self.start)[0])
+        self.evaluations += 1
+
+    def improve(self, budget_ms=DEFAULT_BUDGET_MS, batch_size=BATCH_SIZE):
+        """Search for up to budget_ms of wall-clock time; returns (best_order, best_cost)"""
+        started = self.call_started = time.perf_counter()
+        deadline = started + budget_ms / 1000
+        n = self.problem.size
+        if n == 0:
+            self._offer(np.zeros((1, 0), dtype=np.int64))
+            return self.best_order, self.best_cost
+
+        if not self.seeded:
+            self._offer(beam_search(self.problem, start=self.start))
+            self.seeded = True
+        moves = neighbourhood(n) if n > 1 else np.zeros((0, n), dtype=np.int64)
+
+        while time.perf_counter() < deadline and len(moves):
+            self.iterations += 1
+            improved = False
+            for offset in range(0, len(moves), batch_size):
+                before = self.current_cost
+                self._offer(self.current[moves[offset:offset + batch_size]])
+                if self.current_cost < before - 1e-9:
+                    improved = True
+                    break
+                if time.perf_counter() >= deadline:
+                    break
+            if not improved:
+                if n < 4:
+                    break
+                self._perturb()
+        self.elapsed += time.perf_counter() - started
+        return self.best_order, self.best_cost
+
+
+def schedule(problem, order, start=None):
+    """Plan items in `order` with the client's estimated time fields filled in"""
+    plan = []
+    for item_index, (begin, end, late) in zip(order, problem.timeline(order, start)):
+        item = dict(problem.items[item_index])
+        item['estimatedStartTime'] = minutes_to_time(round(begin))
+        item['estimatedEndTime'] = minutes_to_time(round(end))
+        if item.get('type') not in BREAK_TYPES:
+            item['totalTime'] = round(end - begin)
+            item['waitTime'] = item['totalTime'] - item.get('rideTime', RIDE_MINUTES)
+        if late:
+            item['lateMinutes'] = round(late)
+        plan.append(item)
+    return plan
+
+
+def plan_result(problem, order, cost, original_cost, started, **extra):
+    """Response for an optimized order: the scheduled plan plus finish, lateness and search counters"""
+    timeline = problem.timeline(order)
+    finish = timeline[-1][1] if timeline else problem.start
+    return {
+        'plan': schedule(problem, order),
+        'order': [int(i) for i in order],
+        'finish': minutes_to_time(round(finish)),
+        'lateMinutes': round(sum(row[2] for row in timeline)),
+        'overrunMinutes': round(max(finish - problem.end, 0)),
+        'cost': round(cost, 1),
+        'originalCost': round(original_cost, 1) if np.isfinite(original_cost) else None,
+        **extra,
+        'elapsedMs': round((time.perf_counter() - started) * 1000, 1)
+    }
+
+
+def optimize_plan(plan, start_time='09:00', end_time='21:00', date=None, budget_ms=DEFAULT_BUDGET_MS,
+                  seed=None, data_dir=DATA_DIR, waits=None):
+    """Reorder a client plan to minimize finish time, respecting break windows and fixed-time items"""
+    started = time.perf_counter()
+    ride_index, table = waits or expected_waits(data_dir, date)
+    problem = PlanProblem(plan, parse_time(start_time), parse_time(end_time), ride_index, table)
+    optimizer = PlanOptimizer(problem, seed=seed, initial_order=np.arange(len(plan)))
+    original_cost = optimizer.best_cost
+    order, cost = optimizer.improve(budget_ms)
+    return plan_result(problem, order, cost, original_cost, started,
+                       evaluations=optimizer.evaluations, iterations=optimizer.iterations)
+
+
+def warm_order(cached_keys, keys):
+    """Map a cached order of item keys onto the current items; items it does not know go last"""
+    positions = {}
+    for index, key in enumerate(keys):
+        positions.setdefault(key, []).append(index)
+    order = [positions[key].pop(0) for key in cached_keys if positions.get(key)]
+    placed = set(order)
+    return np.array(order + [index for index in range(len(keys)) if index not in placed], dtype=np.int64)
+
+
+class ForecastTables:
+    """Expected-wait tables and per-item duration rows by day type, dropped whenever the history changes
+
+    The forecast version is re-read at most every FORECAST_CHECK_SECONDS, so callers can ask for
+    it on every request. The tables only use finished days, so a new version means a day rolled
+    over or a past day was backfilled or corrected; live updates to today never drop them.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, waits=None):
+        self.data_dir = data_dir
+        self.fixed_waits = waits
+        self.tables = {}                   # day type -> (ride_index, waits)
+        self.rows = {}                     # day type -> {item_key: duration row by start slot}
+        self.version = 'fixed' if waits is not None else None
+        self.end = None                    # last finished day the tables include
+        self.checked = 0.0
+
+    def refresh(self, force=False):
+        """Pick up a newly published forecast; returns True when the version changed"""
+        if self.fixed_waits is not None:
+            return False
+        now = time.monotonic()
+        if not force and self.version is not None and now - self.checked < FORECAST_CHECK_SECONDS:
+            return False
+        self.checked = now
+        version, end = forecast_version(self.data_dir)
+        if version == self.version:
+            return False
+        self.version, self.end = version, end
+        self.tables.clear()
+        self.rows.clear()
+        return True
+
+    def waits(self, date=None):
+        if self.fixed_waits is not None:
+            return self.fixed_waits
+        self.refresh()
+        kind = day_type(date)
+        if kind not in self.tables:
+            self.tables[kind] = expected_waits(self.data_dir, date, end=self.end)
+        return self.tables[kind]
+
+    def row_cache(self, date=None):
+        return self.rows.setdefault(day_type(date), {})
+
+
+class PlanCache:
+    """LRU of optimized plan orders keyed by (ride set, start slot, end slot, day type, forecast version)
+
+    Many visitors ask for the same plan. An identical request is re-timed from the cached order
+    without any search; one whose items mostly overlap a cached plan in the same context starts
+    local search from that order with a fraction of the budget instead of a beam search. Entries
+    from an older forecast version can never match again and are dropped when a new one appears.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, waits=None, forecast=None, size=PLAN_CACHE_SIZE):
+        self.forecast = forecast or ForecastTables(data_dir, waits)
+        self.size = size
+        self.version = None
+        self.entries = OrderedDict()       # key -> item signatures in optimized order
+        self.postings = {}                 # (context, item signature) -> keys of entries holding it
+        self.stats = {'lookups': 0, 'hits': 0, 'partial_hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def _store(self, key, order):
+        if key not in self.entries:
+            for signature in set(key[0]):
+                self.postings.setdefault((key[1:], signature), set()).add(key)
+        self.entries[key] = order
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            old, _ = self.entries.popitem(last=False)
+            for signature in set(old[0]):
+                holders = self.postings[(old[1:], signature)]
+                holders.discard(old)
+                if not holders:
+                    del self.postings[(old[1:], signature)]
+            self.stats['evictions'] += 1
+
+    def _similar(self, context, signatures):
+        """Cached key in the same context whose item set overlaps `signatures` most, if enough"""
+        wanted = set(signatures)
+        overlap = {}
+        for signature in wanted:
+            for key in self.postings.get((context, signature), ()):
+                overlap[key] = overlap.get(key, 0) + 1
+        best, best_score = None, PARTIAL_OVERLAP
+        for key, shared in overlap.items():
+            score = shared / (len(wanted) + len(set(key[0])) - shared)
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def optimize(self, plan, start_time='09:00', end_time='21:00', date=None, budget_ms=DEFAULT_BUDGET_MS, seed=None):
+        """optimize_plan through the cache; the result's "cache" field says hit, partial or miss"""
+        started = time.perf_counter()
+        ride_index, table = self.forecast.waits(date)
+        if self.forecast.version != self.version:
+            if self.entries:
+                self.stats['invalidations'] += 1
+            self.entries.clear()
+            self.postings.clear()
+            self.version = self.forecast.version
+        start, end = parse_time(start_time), parse_time(end_time)
+        problem = PlanProblem(plan, start, end, ride_index, table, row_cache=self.forecast.row_cache(date))
+        signatures = [item_signature(item, ride_index) for item in plan]
+        context = (int(start // SLOT_MINUTES), int(end // SLOT_MINUTES), day_type(date), self.version)
+        key = (tuple(sorted(signatures)),) + context
+        original = np.arange(len(plan))
+        original_cost = float(problem.evaluate(original[None, :])[0])
+        self.stats['lookups'] += 1
+
+        cached = self.entries.get(key)
+        if cached is not None:
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            order = warm_order(cached, signatures)
+            cost = float(problem.evaluate(order[None, :])[0])
+            return plan_result(problem, order, cost, original_cost, started, cache='hit', evaluations=2, iterations=0)
+
+        similar = self._similar(context, signatures)
+        if similar is not None:
+            self.entries.move_to_end(similar)
+            self.stats['partial_hits'] += 1
+            starts = np.array([original, warm_order(self.entries[similar], signatures)])
+            optimizer = PlanOptimizer(problem, seed=seed, initial_order=starts, beam=False)
+            budget_ms *= PARTIAL_BUDGET_SHARE
+        else:
+            self.stats['misses'] += 1
+            optimizer = PlanOptimizer(problem, seed=seed, initial_order=original)
+        order, cost = optimizer.improve(budget_ms)
+        self._store(key, tuple(signatures[i] for i in order))
+        return plan_result(problem, order, cost, original_cost, started, cache='partial' if similar else 'miss',
+                           evaluations=optimizer.evaluations, iterations=optimizer.iterations)
+
+    def metrics(self):
+        lookups = self.stats['lookups']
+        return {
+            **self.stats,
+            'size': len(self.entries),
+            'hitRate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+            'reuseRate': round((self.stats['hits'] + self.stats['partial_hits']) / lookups, 3) if lookups else 0.0,
+            'forecastVersion': self.version
+        }
+
+
+class Replanner:
+    """Re-optimizes only the unfinished suffix of a tracked plan from the current time
+
+    Meant to live in a long-running process (read_api.py): the wait tables, the per-item duration
+    rows and every plan's last re-planned order stay warm between progress updates, so each call
+    skips the beam search and spends its small budget on local search from the previous solution.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, waits=None, forecast=None):
+        self.forecast = forecast or ForecastTables(data_dir, waits)
+        self.solutions = OrderedDict()     # plan key -> last best remaining order as item keys
+        self.stats = {'replans': 0, 'warm_starts': 0}
+
+    def waits(self, date=None):
+        return self.forecast.waits(date)
+
+    def replan(self, plan, current_time, end_time='21:00', date=None, budget_ms=REPLAN_BUDGET_MS, seed=None):
+        """Keep completed items, re-order the rest starting at current_time; an in-progress item stays first"""
+        started = time.perf_counter()
+        now = parse_time(current_time)
+        done = [i for i, item in enumerate(plan) if item.get('status') == 'completed']
+        remaining = [i for i, item in enumerate(plan) if item.get('status') != 'completed']
+        items = [plan[i] for i in remaining]
+        ride_index, table = self.waits(date)
+        problem = PlanProblem(items, now, parse_time(end_time), ride_index, table,
+                              row_cache=self.forecast.row_cache(date))
+        for i, item in enumerate(items):
+            if item.get('status') == 'in-progress':
+                problem.earliest[i] = problem.latest[i] = now
+
+        # The plan's current order is the previous solution; the cached one may be better still
+        starts = [np.arange(len(items))]
+        plan_key = tuple(sorted(map(repr, map(item_key, plan))))
+        cached = self.solutions.get(plan_key)
+        if cached:
+            starts.append(warm_order(cached, [item_key(item) for item in items]))
+            self.stats['warm_starts'] += 1
+        optimizer = PlanOptimizer(problem, seed=seed, initial_order=np.array(starts), beam=False)
+        previous_cost = float(problem.evaluate(starts[0][None, :])[0])
+        # The budget covers the whole call, not just the search
+        spent_ms = (time.perf_counter() - started) * 1000
+        order, cost = optimizer.improve(max(budget_ms - spent_ms, 0), REPLAN_BATCH_SIZE)
+
+        self.solutions[plan_key] = [item_key(items[i]) for i in order]
+        self.solutions.move_to_end(plan_key)
+        while len(self.solutions) > SOLUTION_CACHE_SIZE:
+            self.solutions.popitem(last=False)
+        self.stats['replans'] += 1
+
+        timeline = problem.timeline(order)
+        finish = timeline[-1][1] if timeline else now
+        return {
+            'plan': [plan[i] for i in done] + schedule(problem, order),
+            'order': done + [remaining[i] for i in order],
+            'finish': minutes_to_time(round(finish)),
+            'lateMinutes': round(sum(row[2] for row in timeline)),
+            'overrunMinutes': round(max(finish - problem.end, 0)),
+            'cost': round(cost, 1),
+            'previousCost': round(previous_cost, 1),
+            'warmStart': bool(cached),
+            'evaluations': optimizer.evaluations,
+            'elapsedMs': round((time.perf_counter() - started) * 1000, 2)
+        }
+
+
+if __name__ == "__main__":
+    # Usage: python plan_optimizer.py [plan.json | -]
+    # Same request format as plan_risk.py plus an optional "budgetMs". Break items may carry
+    # "windowStart"/"windowEnd" and any item a "fixedTime" ("HH:MM"). A request with "currentTime"
+    # re-plans the unfinished part of a tracked plan instead.
+    if len(sys.argv) > 1 and sys.argv[1] == '-':
+        request = json.load(sys.stdin)
+        if request.get('currentTime'):
+            result = Replanner().replan(
+                request.get('plan', []),
+                request['currentTime'],
+                end_time=request.get('planEndTime', '21:00'),
+                date=request.get('date'),
+                budget_ms=float(request.get('budgetMs', REPLAN_BUDGET_MS))
+            )
+            json.dump(result, sys.stdout)
+            sys.exit(0)
+        result = optimize_plan(
+            request.get('plan', []),
+            start_time=request.get('planStartTime', '09:00'),
+            end_time=request.get('planEndTime', '21:00'),
+            date=request.get('date'),
+            budget_ms=float(request.get('budgetMs', DEFAULT_BUDGET_MS))
+        )
+        json.dump(result, sys.stdout)
+        sys.exit(0)
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            request = json.load(f)
+    else:
+        ride_index, _ = expected_waits()
+        request = {'plan': [{'type': 'ride', 'name': ride} for ride in ride_index] + [
+            {'type': 'spacer', 'name': 'Lunch', 'duration': 45, 'windowStart': '11:30', 'windowEnd': '13:00'},
+            {'type': 'spacer', 'name': 'Show', 'duration': 30, 'fixedTime': '15:00'}
+        ]}
+        print(f"No plan given, optimizing a demo plan with {len(ride_index)} rides, lunch and a show")
+
+    result = optimize_plan(
+        request.get('plan', []),
+        start_time=request.get('planStartTime', '09:00'),
+        end_time=request.get('planEndTime', '21:00'),
+        date=request.get('date'),
+        budget_ms=float(request.get('budgetMs', DEFAULT_BUDGET_MS))
+    )
+    print(f"🧭 {result['evaluations']} orders evaluated in {result['elapsedMs']} ms "
+          f"(cost {result['originalCost']} -> {result['cost']})")
+    print(f"🏁 Finish {result['finish']}, late {result['lateMinutes']} min, overrun {result['overrunMinutes']} min")
+    for item in result['plan']:
+        print(f"  {item['estimatedStartTime']} -> {item['estimatedEndTime']}  {item.get('name') or item['type']}")
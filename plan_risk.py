@@ -0,0 +1,157 @@
+import json
+import sys
+import time
+import warnings
+
+import numpy as np
+
+from wait_data import (
+    DATA_DIR, SLOT_MINUTES, SLOTS_PER_DAY, load_history_matrix, minutes_to_time, parse_time, weekday_of
+)
+
+RIDE_MINUTES = 5          # same ride-time allowance the client adds to every wait
+DEFAULT_SAMPLES = 10000
+JITTER_SIGMA = 0.15       # lognormal spread around the sampled historical wait
+MIN_WEEKDAY_DAYS = 3      # use same-weekday history only when there is enough of it
+
+
+def fill_missing_slots(matrix):
+    """Fill NaN slots with the per-slot median across days, then interpolate along the day"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        profile = np.nanmedian(matrix, axis=1)
+    slots = np.arange(matrix.shape[2])
+    for row in profile:
+        valid = ~np.isnan(row)
+        if valid.any():
+            row[:] = np.interp(slots, slots[valid], row[valid])
+    return np.where(np.isnan(matrix), profile[:, None, :], matrix)
+
+
+class WaitSampler:
+    """Draws wait-time trajectories from historical per-slot distributions, one whole historical day per run"""
+
+    def __init__(self, rides, matrix, jitter_sigma=JITTER_SIGMA):
+        self.ride_index = {ride: i for i, ride in enumerate(rides)}
+        self.waits = fill_missing_slots(matrix)
+        self.jitter_sigma = jitter_sigma
+
+    @classmethod
+    def from_history(cls, data_dir=DATA_DIR, date=None, end=None, **kwargs):
+        """Build from data/ (days up to `end`, if given), preferring days with the same weekday as date"""
+        if date:
+            rides, dates, matrix = load_history_matrix(data_dir, weekday=weekday_of(date), end=end)
+            if len(dates) >= MIN_WEEKDAY_DAYS:
+                return cls(rides, matrix, **kwargs)
+        rides, _, matrix = load_history_matrix(data_dir, end=end)
+        return cls(rides, matrix, **kwargs)
+
+    @property
+    def day_count(self):
+        return self.waits.shape[1]
+
+    def sample(self, ride, minutes, day_choice, rng):
+        """Vectorized wait draw for arrival times `minutes` (N,) on historical days `day_choice` (N,)"""
+        index = self.ride_index.get(ride)
+        if index is None or self.day_count == 0:
+            return None
+        slots = np.clip((minutes // SLOT_MINUTES).astype(np.int64), 0, SLOTS_PER_DAY - 1)
+        waits = self.waits[index, day_choice, slots]
+        if self.jitter_sigma:
+            waits = waits * rng.lognormal(0.0, self.jitter_sigma, size=waits.shape)
+        return waits
+
+
+def evaluate_plan(plan, start_time='09:00', end_time='21:00', date=None,
+                  samples=DEFAULT_SAMPLES, sampler=None, seed=None, data_dir=DATA_DIR):
+    """Monte Carlo finish-time distribution for a client ride plan
+
+    `plan` uses the client's item format: rides are {'type': 'ride', 'name', 'waitTime', 'rideTime'}
+    and breaks/spacers carry a fixed 'duration'. All runs are propagated together as NumPy arrays.
+    """
+    started = time.perf_counter()
+    sampler = sampler or WaitSampler.from_history(data_dir, date)
+    rng = np.random.default_rng(seed)
+    end_minutes = parse_time(end_time)
+
+    clock = np.full(samples, float(parse_time(start_time)))
+    # Every ride in a run follows the same randomly drawn historical day, so busy days stay busy
+    day_choice = rng.integers(0, max(sampler.day_count, 1), size=samples)
+    items = []
+    for item in plan:
+        start = clock
+        if item.get('type') == 'ride':
+            waits = sampler.sample(item.get('name'), clock, day_choice, rng)
+            if waits is None:
+                waits = np.full(samples, float(item.get('waitTime') or 30))
+            duration = waits + item.get('rideTime', RIDE_MINUTES)
+        else:
+            waits = None
+            duration = np.full(samples, float(item.get('duration', 0)))
+        clock = start + duration
+
+        start_p50 = np.percentile(start, 50)
+        end_p50, end_p90 = np.percentile(clock, [50, 90])
+        summary = {
+            'name': item.get('name'),
+            'type': item.get('type'),
+            'startP50': minutes_to_time(round(start_p50)),
+            'endP50': minutes_to_time(round(end_p50)),
+            'endP90': minutes_to_time(round(end_p90)),
+            'overrunProbability': round(float(np.mean(clock > end_minutes)), 4)
+        }
+        if waits is not None:
+            wait_p50, wait_p90 = np.percentile(waits, [50, 90])
+            summary['waitP50'] = round(float(wait_p50))
+            summary['waitP90'] = round(float(wait_p90))
+        items.append(summary)
+
+    finish_p50, finish_p90 = np.percentile(clock, [50, 90])
+    return {
+        'samples': samples,
+        'historyDays': sampler.day_count,
+        'planEndTime': end_time,
+        'finishP50': minutes_to_time(round(finish_p50)),
+        'finishP90': minutes_to_time(round(finish_p90)),
+        'overrunProbability': round(float(np.mean(clock > end_minutes)), 4),
+        'items': items,
+        'elapsedMs': round((time.perf_counter() - started) * 1000, 1)
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python plan_risk.py [plan.json | -]
+    # The JSON holds {"plan": [...], "planStartTime": "09:00", "planEndTime": "21:00", "date": "YYYY-MM-DD"}.
+    # With "-" the request is read from stdin and the result is written to stdout as JSON (used by server.js).
+    if len(sys.argv) > 1 and sys.argv[1] == '-':
+        request = json.load(sys.stdin)
+        result = evaluate_plan(
+            request.get('plan', []),
+            start_time=request.get('planStartTime', '09:00'),
+            end_time=request.get('planEndTime', '21:00'),
+            date=request.get('date'),
+            samples=int(request.get('samples', DEFAULT_SAMPLES))
+        )
+        json.dump(result, sys.stdout)
+        sys.exit(0)
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            request = json.load(f)
+    else:
+        rides, _, _ = load_history_matrix()
+        request = {'plan': [{'type': 'ride', 'name': ride} for ride in rides]}
+        print(f"No plan given, evaluating a demo plan with all {len(rides)} rides")
+
+    result = evaluate_plan(
+        request.get('plan', []),
+        start_time=request.get('planStartTime', '09:00'),
+        end_time=request.get('planEndTime', '21:00'),
+        date=request.get('date')
+    )
+    print(f"🎲 {result['samples']} runs over {result['historyDays']} historical days in {result['elapsedMs']} ms")
+    print(f"🏁 Finish p50 {result['finishP50']}, p90 {result['finishP90']} "
+          f"(overrun of {result['planEndTime']}: {result['overrunProbability']:.0%})")
+    for item in result['items']:
+        print(f"  {item['name'] or item['type']:30} {item['startP50']} -> {item['endP50']} "
+              f"(p90 {item['endP90']}, overrun {item['overrunProbability']:.0%})")
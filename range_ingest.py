@@ -0,0 +1,191 @@
+import json
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+
+import requests
+
+from pipeline import refresh_derived
+from wait_data import DATA_DIR, PARK_NAME, UPSTREAM_URL, is_ride_name, load_day, time_to_minutes, write_json
+
+PARK_HEATMAP_URL = f'{UPSTREAM_URL}/waits/graph/quick/parkheat'
+PARK_ID = 243  # Epic Universe
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+DEFAULT_CHUNK_DAYS = 7
+
+PLOTLY_PATTERN = re.compile(r'Plotly\.newPlot\([^,]+,\s*(\[.*?\]),\s*\{', re.DOTALL)
+ISO_DATE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})\s*(.*)$')
+SLASH_DATE = re.compile(r'^(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\s*(.*)$')
+MONTH_DATE = re.compile(r'^([A-Z][a-z]{2})\w*\.?\s+(\d{1,2})(?:,\s*(\d{4}))?\s*(.*)$')
+
+
+def parse_heatmap(payload):
+    """Return (x, y, z) from a thrill-data heatmap payload ({'plot1': '<div>...Plotly.newPlot(...)'})"""
+    match = PLOTLY_PATTERN.search(payload['plot1'])
+    if not match:
+        raise ValueError('No Plotly data found in heatmap response')
+    trace = json.loads(match.group(1))[0]
+    return trace['x'], trace['y'], trace.get('text') or trace['z']
+
+
+def infer_year(month, start_date):
+    """Year of a label without one: a month before the chunk's start month has rolled into the next year"""
+    year = int(start_date[:4])
+    return year + 1 if month < int(start_date[5:7]) else year
+
+
+def split_label(label, start_date):
+    """Split a heatmap label into (YYYY-MM-DD or None, remainder)"""
+    label = str(label).replace('<br>', ' ').strip()
+    match = ISO_DATE.match(label)
+    if match:
+        return f"{match.group(1)}-{match.group(2)}-{match.group(3)}", match.group(4)
+    match = SLASH_DATE.match(label)
+    if match:
+        month, day, label_year, rest = match.groups()
+        label_year = int(label_year) + (2000 if len(label_year) == 2 else 0) if label_year \
+            else infer_year(int(month), start_date)
+        return f"{label_year:04d}-{int(month):02d}-{int(day):02d}", rest
+    match = MONTH_DATE.match(label)
+    if match:
+        try:
+            month = datetime.strptime(match.group(1), '%b').month
+        except ValueError:
+            return None, label
+        label_year = int(match.group(3)) if match.group(3) else infer_year(month, start_date)
+        return f"{label_year:04d}-{month:02d}-{int(match.group(2)):02d}", match.group(4)
+    return None, label
+
+
+def clean_wait(value):
+    if value == '' or value is None:
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def split_heatmap(x, y, z, start_date, end_date):
+    """Split a multi-day heatmap into {date: {ride: [(time label, wait), ...]}}
+
+    Handles the two shapes the park endpoint returns: a grid whose x labels carry the date,
+    and a plain single-day grid.
+    """
+    days = {}
+    columns = [split_label(label, start_date) for label in x]
+    if any(date for date, _ in columns):
+        for ride_name, row in zip(y, z):
+            if not is_ride_name(ride_name):
+                continue
+            for (date, time_label), value in zip(columns, row):
+                if date and time_to_minutes(time_label) is not None:
+                    days.setdefault(date, {}).setdefault(ride_name, []).append((time_label, clean_wait(value)))
+        return days
+
+    if start_date != end_date:
+        raise ValueError('Heatmap has no per-day labels; the upstream aggregated the range')
+    for ride_name, row in zip(y, z):
+        if is_ride_name(ride_name):
+            days.setdefault(start_date, {})[ride_name] = [
+                (label, clean_wait(value)) for label, value in zip(x, row)
+                if time_to_minutes(label) is not None
+            ]
+    return days
+
+
+def build_day(date, rides):
+    """Day dict in the same format extract_today_data.py writes"""
+    ride_entries = []
+    for name, slots in sorted(rides.items()):
+        current_wait = next((wait for _, wait in reversed(slots) if wait is not None), None)
+        ride_entries.append({
+            'name': name,
+            'waitTime': current_wait,
+            'status': 'Open' if current_wait is not None else 'Down',
+            'wait_times': [{'time': label, 'wait': wait} for label, wait in slots]
+        })
+    return {'date': date, 'park': PARK_NAME, 'rides': ride_entries}
+
+
+def write_days(days, data_dir=DATA_DIR):
+    """Write per-day matrices as last_week_waits files, merging rides into any existing file for the date"""
+    written = []
+    for date, rides in sorted(days.items()):
+        path = os.path.join(data_dir, f'last_week_waits_{date}.json')
+        merged = {}
+        if os.path.exists(path):
+            for ride in load_day(path).get('rides', []):
+                if is_ride_name(ride.get('name')):
+                    merged[ride['name']] = [(entry['time'], entry.get('wait')) for entry in ride['wait_times']]
+        merged.update(rides)
+        day = build_day(date, merged)
+        write_json(path, day)
+        written.append(day)
+    return written
+
+
+def fetch_range(start_date, end_date):
+    """One upstream request for a whole date range of the park grid"""
+    response = requests.get(
+        PARK_HEATMAP_URL,
+        params={
+            'id': PARK_ID,
+            'dateStart': start_date,
+            'dateEnd': end_date,
+            'tag': 'min'
+        },
+        headers=HEADERS,
+        timeout=60
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def date_chunks(start_date, end_date, chunk_days=DEFAULT_CHUNK_DAYS):
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    end = datetime.strptime(end_date, '%Y-%m-%d')
+    while start <= end:
+        chunk_end = min(start + timedelta(days=chunk_days - 1), end)
+        yield start.strftime('%Y-%m-%d'), chunk_end.strftime('%Y-%m-%d')
+        start = chunk_end + timedelta(days=1)
+
+
+def ingest_range(start_date, end_date, chunk_days=DEFAULT_CHUNK_DAYS, data_dir=DATA_DIR, fetch=fetch_range):
+    """Backfill a date range in chunk-sized requests, then refresh derived data once"""
+    days = {}
+    requests_made = 0
+    for chunk_start, chunk_end in date_chunks(start_date, end_date, chunk_days):
+        x, y, z = parse_heatmap(fetch(chunk_start, chunk_end))
+        requests_made += 1
+        for date, ride_rows in split_heatmap(x, y, z, chunk_start, chunk_end).items():
+            days.setdefault(date, {}).update(ride_rows)
+
+    written = write_days(days, data_dir)
+    if written:
+        refresh_derived(written, data_dir)
+    return written, requests_made
+
+
+if __name__ == "__main__":
+    # Usage: python range_ingest.py START_DATE END_DATE [CHUNK_DAYS]
+    if len(sys.argv) < 3:
+        print("Usage: python range_ingest.py YYYY-MM-DD YYYY-MM-DD [CHUNK_DAYS]")
+        sys.exit(1)
+    start_date, end_date = sys.argv[1], sys.argv[2]
+    chunk_days = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_CHUNK_DAYS
+    try:
+        datetime.strptime(start_date, '%Y-%m-%d')
+        datetime.strptime(end_date, '%Y-%m-%d')
+    except ValueError:
+        print("Invalid date format. Please use YYYY-MM-DD format.")
+        sys.exit(1)
+
+    print(f"📅 Backfilling {start_date} .. {end_date} in {chunk_days}-day requests")
+    written, requests_made = ingest_range(start_date, end_date, chunk_days)
+    print(f"✅ Wrote {len(written)} day files with {requests_made} upstream requests")
+    for day in written:
+        print(f"  {day['date']}: {len(day['rides'])} rides")
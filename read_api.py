@@ -0,0 +1,482 @@
+import asyncio
+import json
+from bisect import bisect_left, bisect_right
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import pytz
+
+from alerts import AlertEngine, QueueSink, current_minute, default_sinks, rules_path, write_journal
+from archive import Partition, partition_path
+from export_columnar import ride_id
+from plan_optimizer import DEFAULT_BUDGET_MS, REPLAN_BUDGET_MS, ForecastTables, PlanCache, Replanner, clamp_budget
+from ride_now import index_sources, load_index, recommend_request
+from wait_data import DATA_DIR, DAY_FILE_PATTERN, latest_today_file, load_day, parse_time, time_to_minutes
+
+EASTERN = pytz.timezone('US/Eastern')
+READ_API_PORT = int(os.environ.get('READ_API_PORT', 5001))
+HISTORY_CACHE_DAYS = 30          # LRU cap for historical days kept parsed in memory
+RELOAD_CHECK_SECONDS = 5         # how often to look for a newly published snapshot
+ALERT_SAVE_DELAY = 1.0           # rule changes are gathered this long before one journal write
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+RIDE_FIELDS = ('name', 'waitTime', 'status', 'wait_times')
+PLAN_ROUTES = ('/api/plan/optimize', '/api/plan/replan')
+
+
+class DayView:
+    """A day file split into per-ride arrays once, so projections are index lookups and list slices"""
+
+    __slots__ = ('day', 'body', 'rides', 'index', 'minutes', 'slots')
+
+    def __init__(self, day):
+        self.day = day
+        self.body = encode(day)
+        self.rides = day.get('rides', [])
+        self.index = {}
+        self.minutes = []   # per ride: sorted slot minutes, parallel to self.slots
+        self.slots = []     # per ride: wait_times entries that carry a real time label
+        for position, ride in enumerate(self.rides):
+            name = ride.get('name') or ''
+            self.index.setdefault(name, position)
+            self.index.setdefault(ride_id(name), position)
+            timed = [(time_to_minutes(entry.get('time')), entry) for entry in ride.get('wait_times', [])]
+            timed = sorted((item for item in timed if item[0] is not None), key=lambda item: item[0])
+            self.minutes.append([minute for minute, _ in timed])
+            self.slots.append([entry for _, entry in timed])
+
+    def project(self, rides=None, start=None, end=None, fields=None):
+        """Day dict restricted to the given rides (names or ids), [start, end] minutes and ride fields"""
+        if rides is None:
+            positions = range(len(self.rides))
+        else:
+            positions = sorted({self.index[name] for name in rides if name in self.index})
+        fields = fields or RIDE_FIELDS
+        windowed = start is not None or end is not None
+        projected = []
+        for position in positions:
+            ride = self.rides[position]
+            entry = {field: ride.get(field) for field in fields if field != 'wait_times'}
+            if 'wait_times' in fields:
+                if windowed:
+                    minutes = self.minutes[position]
+                    lo = bisect_left(minutes, start) if start is not None else 0
+                    hi = bisect_right(minutes, end) if end is not None else len(minutes)
+                    entry['wait_times'] = self.slots[position][lo:hi]
+                else:
+                    entry['wait_times'] = ride.get('wait_times', [])
+            projected.append(entry)
+        return {**self.day, 'rides': projected}
+
+
+def parse_projection(query):
+    """(rides, start, end, fields) from ?rides=&from=&to=&fields=, or None when nothing is projected"""
+    if not any(key in query for key in ('rides', 'from', 'to', 'fields')):
+        return None
+    rides = [name.strip() for value in query.get('rides', []) for name in value.split(',') if name.strip()] or None
+    start = parse_time(query['from'][0]) if 'from' in query else None
+    end = parse_time(query['to'][0]) if 'to' in query else None
+    fields = None
+    if 'fields' in query:
+        fields = [field.strip() for value in query['fields'] for field in value.split(',') if field.strip()]
+        unknown = [field for field in fields if field not in RIDE_FIELDS]
+        if unknown:
+            raise ValueError(f'unknown fields: {", ".join(unknown)}')
+        if 'name' not in fields:
+            fields.insert(0, 'name')
+    return rides, start, end, fields
+
+
+class Snapshot:
+    """Immutable parsed + pre-encoded view of today's and the baseline data; replaced wholesale, never mutated"""
+
+    __slots__ = ('today', 'today_path', 'baseline', 'baseline_path', 'version', 'loaded_at')
+
+    def __init__(self, today_path, baseline_path, version):
+        self.today_path = today_path
+        self.baseline_path = baseline_path
+        self.today = DayView(load_day(today_path)) if today_path else None
+        self.baseline = DayView(load_day(baseline_path)) if baseline_path else None
+        self.version = version
+        self.loaded_at = time.time()
+
+
+def encode(data):
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def file_signature(path):
+    if not path:
+        return None
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+def closest_baseline_file(data_dir, today):
+    """The last_week_waits file closest to a week before `today` (same rule as server.js)"""
+    target = datetime.strptime(today, '%Y-%m-%d') - timedelta(days=7)
+    candidates = []
+    for filename in os.listdir(data_dir):
+        match = DAY_FILE_PATTERN.match(filename)
+        if match and match.group(1) == 'last_week_waits':
+            distance = abs((datetime.strptime(match.group(2), '%Y-%m-%d') - target).days)
+            candidates.append((distance, filename))
+    return os.path.join(data_dir, min(candidates)[1]) if candidates else None
+
+
+class DataCache:
+    """Double-buffered snapshot for today/baseline plus an LRU of historical days"""
+
+    def __init__(self, data_dir=DATA_DIR, history_days=HISTORY_CACHE_DAYS):
+        self.data_dir = data_dir
+        self.history_days = history_days
+        self.snapshot = None
+        self.signature = None
+        self.history = OrderedDict()   # date -> (signature, DayView)
+        self.stats = {'snapshot_swaps': 0, 'history_hits': 0, 'history_misses': 0}
+
+    def _current_signature(self):
+        today_path = latest_today_file(self.data_dir)
+        today = datetime.now(EASTERN).strftime('%Y-%m-%d')
+        baseline_path = closest_baseline_file(self.data_dir, today)
+        return file_signature(today_path), file_signature(baseline_path)
+
+    def reload(self):
+        """Build a new snapshot off to the side if the published files changed, then swap it in"""
+        signature = self._current_signature()
+        if signature == self.signature:
+            return False
+        today_sig, baseline_sig = signature
+        version = (self.snapshot.version + 1) if self.snapshot else 1
+        snapshot = Snapshot(today_sig[0] if today_sig else None, baseline_sig[0] if baseline_sig else None, version)
+        # A single reference assignment: readers see the old or the new snapshot, never a mix
+        self.snapshot = snapshot
+        self.signature = signature
+        self.stats['snapshot_swaps'] += 1
+        return True
+
+    def publish(self):
+        """Let an in-process ingest swap in freshly written files without waiting for the next check"""
+        self.signature = None
+        self.reload()
+
+    def day(self, date):
+        """DayView for a historical day, via the LRU (None if neither a file nor the archive has that date)"""
+        if not DATE_PATTERN.match(date or ''):
+            return None
+        path = None
+        for prefix in ('last_week_waits', 'today_waits'):
+            candidate = os.path.join(self.data_dir, f'{prefix}_{date}.json')
+            if os.path.exists(candidate):
+                path = candidate
+                break
+        if path is None:
+            # Older days may only survive in the monthly archive once their JSON is pruned
+            path = partition_path(date, self.data_dir)
+            if not os.path.exists(path):
+                return None
+        signature = file_signature(path)
+        cached = self.history.get(date)
+        if cached and cached[0] == signature:
+            self.history.move_to_end(date)
+            self.stats['history_hits'] += 1
+            return cached[1]
+        self.stats['history_misses'] += 1
+        if path.endswith('.json'):
+            view = DayView(load_day(path))
+        else:
+            day = Partition(path).read_day(date)
+            if day is None:
+                return None
+            view = DayView(day.to_legacy())
+        self.history[date] = (signature, view)
+        self.history.move_to_end(date)
+        while len(self.history) > self.history_days:
+            self.history.popitem(last=False)
+        return view
+
+
+class ReadApi:
+    """Minimal asyncio HTTP/1.1 server answering read endpoints from DataCache without re-reading files
+
+    It also hosts plan optimization and re-planning, which need a long-lived process to keep
+    their tables and cached plans warm. Those run on one planning thread, so a search or a table
+    rebuild never holds up the reads, and the plan state is only ever touched from that thread.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.forecast = ForecastTables(cache.data_dir)
+        self.replanner = Replanner(forecast=self.forecast)
+        self.planner = PlanCache(forecast=self.forecast)
+        self.planning = ThreadPoolExecutor(max_workers=1, thread_name_prefix='planner')
+        self.ride_now = None
+        self.ride_now_signature = None
+        self.alerts = AlertEngine.load(rules_path(cache.data_dir), default_sinks())
+        self.alert_queue = next(sink for sink in self.alerts.sinks if isinstance(sink, QueueSink))
+        self.alert_snapshot = None
+        self.alert_saver = None
+
+    def check_alerts(self):
+        """Run the alert rules against a newly swapped-in snapshot; only rides that changed are evaluated
+
+        Called on the event loop, like the alert routes, so rules are never changed mid-evaluation.
+        """
+        snapshot = self.cache.snapshot
+        if snapshot is None or snapshot.today is None or snapshot is self.alert_snapshot:
+            return []
+        self.alert_snapshot = snapshot
+        events = self.alerts.apply_day(snapshot.today.day, current_minute())
+        self.save_alerts()
+        return events
+
+    def save_alerts(self):
+        """Schedule a journal write for pending rule changes; one writer at a time, off the event loop"""
+        if self.alerts.journal and self.alert_saver is None:
+            self.alert_saver = asyncio.get_running_loop().create_task(self.write_alerts())
+
+    async def write_alerts(self):
+        await asyncio.sleep(ALERT_SAVE_DELAY)
+        try:
+            while self.alerts.journal:
+                mode, records = self.alerts.take_journal()
+                await asyncio.to_thread(write_journal, rules_path(self.cache.data_dir), mode, records)
+        except OSError as e:
+            # The journal may now be missing records: the next write replaces it with a snapshot
+            self.alerts.logged = float('inf')
+            print(f"❌ Saving alert rules failed: {e}")
+        finally:
+            self.alert_saver = None
+
+    def add_alert(self, body):
+        """POST /api/alerts: {watcher, ride, condition, threshold} -> {rule, events fired straight away}"""
+        try:
+            request = json.loads(body or b'{}')
+            rule, events = self.alerts.add_rule(request.get('watcher'), request.get('ride'), request.get('condition'),
+                                                request.get('threshold'), current_minute())
+        except (TypeError, ValueError) as e:
+            return 400, encode({'error': f'Invalid alert rule: {e}'})
+        self.save_alerts()
+        return 200, encode({'rule': rule, 'events': events})
+
+    def remove_alert(self, body):
+        """POST /api/alerts/delete: {id} -> the removed rule"""
+        try:
+            rule = self.alerts.remove_rule(int(json.loads(body or b'{}')['id']))
+        except (KeyError, TypeError, ValueError) as e:
+            return 400, encode({'error': f'Invalid alert delete request: {e}'})
+        if rule is None:
+            return 404, encode({'error': 'No such alert rule'})
+        self.save_alerts()
+        return 200, encode({'rule': rule})
+
+    def reload_ride_now(self):
+        """Rebuild the ride-now index when today's file or the nowcast is republished"""
+        signature = tuple(file_signature(path) for path in index_sources(self.cache.data_dir))
+        if signature == self.ride_now_signature:
+            return False
+        self.ride_now = load_index(self.cache.data_dir)
+        self.ride_now_signature = signature
+        return True
+
+    def recommend(self, query):
+        """GET /api/ride-now?land=&time=HH:MM&completed=a,b&k=5 -> top k rides to head for now"""
+        if self.ride_now is None:
+            self.reload_ride_now()
+        if self.ride_now is None:
+            return 404, encode({'error': 'No today data found'})
+        try:
+            request = {
+                'land': query.get('land', [None])[0],
+                'time': query.get('time', [None])[0],
+                'completedRides': [name for value in query.get('completed', []) for name in value.split(',') if name],
+                'k': query.get('k', [5])[0]
+            }
+            return 200, encode(recommend_request(self.ride_now, request))
+        except ValueError as e:
+            return 400, encode({'error': str(e)})
+
+    def optimize(self, body):
+        """POST /api/plan/optimize: {plan, planStartTime, planEndTime, date, budgetMs} -> optimized plan"""
+        try:
+            request = json.loads(body or b'{}')
+            result = self.planner.optimize(
+                request['plan'],
+                start_time=request.get('planStartTime', '09:00'),
+                end_time=request.get('planEndTime', '21:00'),
+                date=request.get('date'),
+                budget_ms=clamp_budget(request.get('budgetMs', DEFAULT_BUDGET_MS))
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            return 400, encode({'error': f'Invalid optimize request: {e}'})
+        return 200, encode(result)
+
+    def replan(self, body):
+        """POST /api/plan/replan: {plan, currentTime, planEndTime, date, budgetMs} -> re-planned suffix"""
+        try:
+            request = json.loads(body or b'{}')
+            result = self.replanner.replan(
+                request['plan'],
+                request['currentTime'],
+                end_time=request.get('planEndTime', '21:00'),
+                date=request.get('date'),
+                budget_ms=clamp_budget(request.get('budgetMs', REPLAN_BUDGET_MS))
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            return 400, encode({'error': f'Invalid replan request: {e}'})
+        return 200, encode(result)
+
+    def route(self, method, target, body=b''):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        snapshot = self.cache.snapshot
+        if method == 'POST' and url.path == '/api/plan/replan':
+            return self.replan(body)
+        if method == 'POST' and url.path == '/api/plan/optimize':
+            return self.optimize(body)
+        if method == 'POST' and url.path == '/api/alerts':
+            return self.add_alert(body)
+        if method == 'POST' and url.path == '/api/alerts/delete':
+            return self.remove_alert(body)
+        if method != 'GET':
+            return 405, encode({'error': 'Method not allowed'})
+        try:
+            projection = parse_projection(query)
+        except ValueError as e:
+            return 400, encode({'error': str(e)})
+
+        def respond(view, missing):
+            if view is None:
+                return 404, encode({'error': missing})
+            return 200, view.body if projection is None else encode(view.project(*projection))
+
+        if url.path == '/api/wait-times/today':
+            return respond(snapshot.today if snapshot else None, 'No today data found')
+        if url.path == '/api/wait-times/last-week':
+            if 'today' in query:
+                if not DATE_PATTERN.match(query['today'][0]):
+                    return 400, encode({'error': 'today must be YYYY-MM-DD'})
+                path = closest_baseline_file(self.cache.data_dir, query['today'][0])
+                date = DAY_FILE_PATTERN.match(os.path.basename(path)).group(2) if path else None
+                return respond(self.cache.day(date) if date else None, 'No historical data files found')
+            return respond(snapshot.baseline if snapshot else None, 'No historical data files found')
+        if url.path.startswith('/api/wait-times/day/'):
+            return respond(self.cache.day(url.path.rsplit('/', 1)[-1]), 'No data for that date')
+        if url.path == '/api/ride-now':
+            return self.recommend(query)
+        if url.path == '/api/alerts':
+            watcher = query.get('watcher', [None])[0]
+            if not watcher:
+                return 400, encode({'error': 'watcher is required'})
+            return 200, encode({'rules': self.alerts.watcher_rules(watcher)})
+        if url.path == '/api/alerts/events':
+            try:
+                since = int(query.get('since', [0])[0])
+            except ValueError:
+                return 400, encode({'error': 'since must be an event sequence number'})
+            events = self.alert_queue.since(since, query.get('watcher', [None])[0])
+            return 200, encode({'seq': self.alerts.seq, 'events': events})
+        if url.path == '/health':
+            return 200, encode({
+                'version': snapshot.version if snapshot else None,
+                'loadedAt': snapshot.loaded_at if snapshot else None,
+                'historyCached': len(self.cache.history),
+                **self.cache.stats,
+                **self.replanner.stats,
+                'planCache': self.planner.metrics(),
+                'alerts': {**self.alerts.stats, 'rules': len(self.alerts.rules)}
+            })
+        return 404, encode({'error': 'Not found'})
+
+    async def dispatch(self, method, target, body=b''):
+        """route() for one request: plan searches go to the planning thread, anything unexpected is a 500"""
+        try:
+            if method == 'POST' and urlsplit(target).path in PLAN_ROUTES:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.planning, self.route, method, target, body)
+            return self.route(method, target, body)
+        except Exception as e:
+            print(f"❌ {method} {target} failed: {e}")
+            return 500, encode({'error': 'Internal server error'})
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                if len(parts) < 2:
+                    break
+                method, target = parts[0], parts[1]
+                keep_alive = True
+                length = 0
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = header.decode('latin-1').partition(':')
+                    name = name.strip().lower()
+                    if name == 'connection' and value.strip().lower() == 'close':
+                        keep_alive = False
+                    elif name == 'content-length':
+                        length = int(value.strip() or 0)
+
+                request_body = await reader.readexactly(length) if length else b''
+                status, body = await self.dispatch(method, target, request_body)
+                writer.write(
+                    f'HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n'
+                    f'Content-Type: application/json\r\n'
+                    f'Content-Length: {len(body)}\r\n'
+                    f'Access-Control-Allow-Origin: *\r\n'
+                    f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode('latin-1') + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def watch(self, interval=RELOAD_CHECK_SECONDS):
+        """Swap in new snapshots as the ingest publishes files; parsing happens off the event loop"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await asyncio.to_thread(self.cache.reload):
+                    print(f"🔁 Snapshot v{self.cache.snapshot.version} loaded")
+                await asyncio.to_thread(self.reload_ride_now)
+                self.check_alerts()
+            except Exception as e:
+                print(f"❌ Snapshot reload failed: {e}")
+
+    async def serve(self, host='0.0.0.0', port=READ_API_PORT):
+        await asyncio.to_thread(self.cache.reload)
+        await asyncio.get_running_loop().run_in_executor(self.planning, self.replanner.waits)
+        await asyncio.to_thread(self.reload_ride_now)
+        self.check_alerts()
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"📡 Read API listening on http://{host}:{port}")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.watch())
+
+
+if __name__ == "__main__":
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else DATA_DIR
+    api = ReadApi(DataCache(data_dir))
+    try:
+        asyncio.run(api.serve())
+    except KeyboardInterrupt:
+        print("\n👋 Read API stopped")
+    finally:
+        api.planning.shutdown(cancel_futures=True)
+        if api.alerts.journal:
+            write_journal(rules_path(data_dir), *api.alerts.take_journal())
+        api.alerts.close()
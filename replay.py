@@ -0,0 +1,170 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from live_poller import SLOT_SETTLE_MINUTES
+from park_day import ParkDay, load_season
+from pipeline import refresh_derived
+from range_ingest import parse_heatmap
+from read_api import DataCache
+from upstream_stub import UpstreamStub
+from wait_data import DATA_DIR, PARK_NAME, list_day_files, minutes_to_time
+
+DEFAULT_SPEED = 0              # 0 replays as fast as possible; N paces slots at N x real time
+GROWTH_WARNING = 2.0           # flag a step whose late-day cost exceeds its early-day cost by this factor
+
+
+def replay_day(date, data_dir=DATA_DIR, speed=DEFAULT_SPEED, work_dir=None):
+    """Feed one archived day slot by slot through poll -> parse -> store -> derive -> serve
+
+    Runs in a scratch data directory seeded with the days before `date`, so derived state
+    looks like it would that morning. Each slot is published on a simulated clock at the
+    time the upstream would publish it. Its lag is measured from that moment until the read
+    API has swapped in the new snapshot; a slot whose work overruns the gap delays the next.
+    Returns one record per slot.
+    """
+    source = UpstreamStub(data_dir)
+    day = source.day(date)
+    minutes = sorted({minute for minute in day.minutes.tolist() if minute >= 0})
+    history = {past: past_day for past, past_day in load_season(data_dir, end=date).items() if past < date}
+
+    with contextlib.ExitStack() as stack:
+        scratch = work_dir or stack.enter_context(tempfile.TemporaryDirectory(prefix='replay_'))
+        for past_day in history.values():
+            past_day.save(os.path.join(scratch, f'last_week_waits_{past_day.date}.json'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            if history:
+                refresh_derived([past_day.to_legacy() for past_day in history.values()], scratch, verbose=False)
+        cache = DataCache(scratch)
+        today_path = os.path.join(scratch, f'today_waits_{date}.json')
+
+        records = []
+        started = time.perf_counter()
+        for index, minute in enumerate(minutes):
+            publish = minute + SLOT_SETTLE_MINUTES
+            source.configure({'now': f'{date} {publish // 60:02d}:{publish % 60:02d}'})
+            due = started + (publish - minutes[0] - SLOT_SETTLE_MINUTES) * 60 / speed if speed else time.perf_counter()
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+
+            steps = {}
+            mark = time.perf_counter()
+            payload = json.loads(source.heatmap(date, None))
+            steps['poll'] = time.perf_counter() - mark
+
+            mark = time.perf_counter()
+            x, y, z = parse_heatmap(payload)
+            partial = ParkDay.from_grid(date, PARK_NAME, y, x, z).to_legacy()
+            steps['parse'] = time.perf_counter() - mark
+
+            mark = time.perf_counter()
+            with open(today_path, 'w', encoding='utf-8') as f:
+                json.dump(partial, f, indent=2)
+            steps['store'] = time.perf_counter() - mark
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                timings = refresh_derived([partial], scratch, verbose=False)
+            steps.update(timings)
+
+            mark = time.perf_counter()
+            cache.publish()
+            steps['serve'] = time.perf_counter() - mark
+
+            done = time.perf_counter()
+            records.append({
+                'slot': minutes_to_time(minute),
+                'index': index,
+                'lagSeconds': done - due,
+                'steps': steps,
+                'derivedBytes': directory_size(os.path.join(scratch, 'derived'))
+            })
+        return records
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def summarize(records, speed=DEFAULT_SPEED):
+    """Lag percentiles plus, per step, mean cost over the first and last quarter of the day and its trend"""
+    lags = np.array([record['lagSeconds'] for record in records]) * 1000
+    quarter = max(len(records) // 4, 1)
+    steps = {}
+    for name in records[0]['steps'] if records else []:
+        costs = np.array([record['steps'][name] for record in records]) * 1000
+        early, late = costs[:quarter].mean(), costs[-quarter:].mean()
+        slope = float(np.polyfit(np.arange(len(costs)), costs, 1)[0]) if len(costs) > 1 else 0.0
+        steps[name] = {
+            'meanMs': round(float(costs.mean()), 2),
+            'earlyMs': round(float(early), 2),
+            'lateMs': round(float(late), 2),
+            'msPerSlot': round(slope, 3),
+            'growing': bool(early > 0 and late / early > GROWTH_WARNING and late - early > 1)
+        }
+    summary = {
+        'slots': len(records),
+        'speed': f'{speed:g}x' if speed else 'max speed',
+        'lagMs': {
+            'p50': round(float(np.percentile(lags, 50)), 2),
+            'p95': round(float(np.percentile(lags, 95)), 2),
+            'max': round(float(lags.max()), 2)
+        } if len(lags) else {},
+        'steps': steps,
+        'derivedBytes': records[-1]['derivedBytes'] if records else 0
+    }
+    if speed and len(lags):
+        # Lag in simulated minutes is what a user would see as staleness at this speed-up
+        summary['lagSimulatedMinutes'] = round(float(lags.max()) / 1000 * speed / 60, 2)
+    return summary
+
+
+def print_summary(date, summary, records, verbose=False):
+    print(f"⏩ Replayed {date}: {summary['slots']} slots at {summary['speed']}")
+    if verbose:
+        for record in records:
+            total = sum(record['steps'].values()) * 1000
+            print(f"  {record['slot']}  lag {record['lagSeconds'] * 1000:8.1f} ms  work {total:7.1f} ms  "
+                  f"derived {record['derivedBytes'] / 1024:7.1f} KB")
+    lag = summary['lagMs']
+    if lag:
+        print(f"  lag p50 {lag['p50']:.1f} ms  p95 {lag['p95']:.1f} ms  max {lag['max']:.1f} ms")
+    for name, step in summary['steps'].items():
+        flag = '  ⚠️  grows through the day' if step['growing'] else ''
+        print(f"  {name:14} mean {step['meanMs']:7.2f} ms  early {step['earlyMs']:7.2f}  late {step['lateMs']:7.2f}  "
+              f"trend {step['msPerSlot']:+.3f} ms/slot{flag}")
+    print(f"  derived artifacts: {summary['derivedBytes'] / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    # Usage: python replay.py [DATE] [--speed N] [--data DIR] [--keep DIR] [--verbose] [--json]
+    args = sys.argv[1:]
+    data_dir = args[args.index('--data') + 1] if '--data' in args else DATA_DIR
+    speed = float(args[args.index('--speed') + 1]) if '--speed' in args else DEFAULT_SPEED
+    keep = args[args.index('--keep') + 1] if '--keep' in args else None
+    values = {args[i + 1] for i, arg in enumerate(args[:-1]) if arg in ('--data', '--speed', '--keep')}
+    dates = [arg for arg in args if not arg.startswith('--') and arg not in values]
+    files = list_day_files(data_dir)
+    date = dates[0] if dates else (max(files) if files else None)
+    if not date:
+        print("❌ No day to replay")
+        sys.exit(1)
+    if keep:
+        shutil.rmtree(keep, ignore_errors=True)
+        os.makedirs(keep)
+    records = replay_day(date, data_dir, speed, keep)
+    summary = summarize(records, speed)
+    if '--json' in args:
+        print(json.dumps({'date': date, **summary, 'records': records}, indent=2))
+    else:
+        print_summary(date, summary, records, '--verbose' in args)
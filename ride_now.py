@@ -0,0 +1,193 @@
+import heapq
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+from wait_data import (
+    DATA_DIR, SLOT_MINUTES, SLOTS_PER_DAY, derived_path, is_ride_name, latest_today_file, load_day,
+    minutes_to_time, parse_time, time_to_minutes
+)
+
+EASTERN = pytz.timezone('US/Eastern')
+DEFAULT_K = 5
+HUB_LAND = 'Celestial Park'
+SAME_LAND_MINUTES = 4          # walk between two rides in the same land
+# Estimated walk from each land's entrance to the Celestial Park hub; every other land is reached through it
+HUB_WALK_MINUTES = {
+    'Celestial Park': 3,
+    'Dark Universe': 6,
+    'Isle of Berk': 6,
+    'SUPER NINTENDO WORLD': 7,
+    'The Wizarding World of Harry Potter': 8,
+}
+# Same truncated heatmap names as rideLandMap in server.js
+RIDE_LANDS = {
+    "Stardust Racers": "Celestial Park",
+    "Constellation Carousel": "Celestial Park",
+    "Curse of the Werewolf": "Dark Universe",
+    "Darkmoor Monster Makeup Experience": "Dark Universe",
+    "Monsters Unch...Experiment": "Dark Universe",
+    "Hiccup's Wing Gliders": "Isle of Berk",
+    "Dragon Racer's Rally": "Isle of Berk",
+    "Fyre Drill": "Isle of Berk",
+    "The Untrainable Dragon": "Isle of Berk",
+    "Meet Toothles...nd Friends": "Isle of Berk",
+    "Mario Kart: B... Challenge": "SUPER NINTENDO WORLD",
+    "Yoshi's Adventure": "SUPER NINTENDO WORLD",
+    "Mine-Cart Madness": "SUPER NINTENDO WORLD",
+    "Bowser Jr. Challenge": "SUPER NINTENDO WORLD",
+    "Harry Potter ...e Ministry": "The Wizarding World of Harry Potter",
+}
+
+
+def walk_matrix(lands):
+    """(lands, lands) walking minutes: within a land, or out to the hub and into the other land"""
+    hub = np.array([HUB_WALK_MINUTES.get(land, HUB_WALK_MINUTES[HUB_LAND]) for land in lands], dtype=float)
+    walks = hub[:, None] + hub[None, :]
+    np.fill_diagonal(walks, SAME_LAND_MINUTES)
+    return walks
+
+
+class RideNowIndex:
+    """Today's rides as arrays so a recommendation is a few vector ops and a k-element heap
+
+    Built once per published nowcast. `forecast` holds, per ride and slot, the nowcast for slots
+    after the ride's last observation (carried forward past the last forecast slot). Walking
+    times are precomputed from every land to every ride.
+    """
+
+    def __init__(self, date, rides, lands, current, last_slot, forecast):
+        self.date = date
+        self.rides = rides
+        self.ride_index = {ride: i for i, ride in enumerate(rides)}
+        self.lands = sorted(set(lands) | set(HUB_WALK_MINUTES))
+        self.land_index = {land: i for i, land in enumerate(self.lands)}
+        self.ride_lands = np.array([self.land_index[land] for land in lands], dtype=np.int64)
+        self.current = current              # live wait, NaN when closed or unknown
+        self.last_slot = last_slot          # slot of each ride's latest observation (-1 if none)
+        self.forecast = forecast            # (rides, SLOTS_PER_DAY) expected wait
+        self.walks = walk_matrix(self.lands)[:, self.ride_lands] if rides else np.zeros((len(self.lands), 0))
+        self.rows = np.arange(len(rides))
+
+    @classmethod
+    def from_day(cls, day, nowcast=None):
+        """Index from today's day dict, using the nowcast's forecasts when it is for the same date"""
+        forecasts = {}
+        if nowcast and nowcast.get('date') == day.get('date'):
+            forecasts = {ride['name']: ride.get('wait_times', []) for ride in nowcast.get('rides', [])}
+        rides = [ride for ride in day.get('rides', []) if is_ride_name(ride.get('name'))]
+        current = np.full(len(rides), np.nan)
+        last_slot = np.full(len(rides), -1, dtype=np.int64)
+        forecast = np.full((len(rides), SLOTS_PER_DAY), np.nan)
+        for i, ride in enumerate(rides):
+            if ride.get('status') == 'Open' and ride.get('waitTime') is not None:
+                current[i] = ride['waitTime']
+            for entry in ride.get('wait_times', []):
+                minute = time_to_minutes(entry.get('time'))
+                if minute is not None and entry.get('wait') is not None:
+                    last_slot[i] = max(last_slot[i], minute // SLOT_MINUTES)
+            for entry in forecasts.get(ride['name'], []):
+                minute = time_to_minutes(entry.get('time'))
+                if minute is not None and entry.get('forecast') is not None:
+                    forecast[i, minute // SLOT_MINUTES] = entry['forecast']
+            # Later slots keep the last forecast; slots with none at all fall back to the live wait
+            filled = np.where(np.isnan(forecast[i]), 0, np.arange(SLOTS_PER_DAY))
+            np.maximum.accumulate(filled, out=filled)
+            forecast[i] = forecast[i, filled]
+            forecast[i, np.isnan(forecast[i])] = current[i]
+        names = [ride['name'] for ride in rides]
+        return cls(day.get('date'), names, [RIDE_LANDS.get(name, HUB_LAND) for name in names],
+                   current, last_slot, forecast)
+
+    def recommend(self, land=None, minute=None, completed=(), k=DEFAULT_K):
+        """Top k open rides by walk + forecast wait on arrival, skipping completed ones; best first"""
+        walk = self.walks[self.land_index.get(land, self.land_index[HUB_LAND])]
+        arrival = minute + walk
+        slots = np.minimum(arrival // SLOT_MINUTES, SLOTS_PER_DAY - 1).astype(np.int64)
+        # Until a ride's next slot is published the live wait is the freshest estimate
+        waits = np.where(slots > self.last_slot, self.forecast[self.rows, slots], self.current)
+        scores = walk + waits
+        scores[np.isnan(self.current)] = np.nan
+        for name in completed:
+            row = self.ride_index.get(name)
+            if row is not None:
+                scores[row] = np.nan
+        candidates = [(score, row) for row, score in enumerate(scores.tolist()) if score == score]
+        return [{
+            'name': self.rides[row],
+            'land': self.lands[self.ride_lands[row]],
+            'walkMinutes': round(float(walk[row])),
+            'arrival': minutes_to_time(round(float(arrival[row]))),
+            'forecastWait': round(float(waits[row])),
+            'currentWait': round(float(self.current[row])),
+            'score': round(score, 1)
+        } for score, row in heapq.nsmallest(k, candidates)]
+
+
+def index_sources(data_dir=DATA_DIR):
+    """(today file, nowcast file) the index is built from; either may be None"""
+    nowcast = derived_path(data_dir, 'nowcast.json')
+    return latest_today_file(data_dir), nowcast if os.path.exists(nowcast) else None
+
+
+def load_index(data_dir=DATA_DIR):
+    today_path, nowcast_path = index_sources(data_dir)
+    if not today_path:
+        return None
+    return RideNowIndex.from_day(load_day(today_path), load_day(nowcast_path) if nowcast_path else None)
+
+
+def current_minute():
+    now = datetime.now(EASTERN)
+    return now.hour * 60 + now.minute
+
+
+def recommend_request(index, request):
+    """Answer a {land, time, completedRides, k} request (time "HH:MM", default now in park time)"""
+    minute = parse_time(request['time']) if request.get('time') else current_minute()
+    if not 0 <= minute < 24 * 60:
+        raise ValueError(f"invalid time: {request['time']}")
+    k = int(request.get('k', DEFAULT_K))
+    if k < 1:
+        raise ValueError('k must be at least 1')
+    started = time.perf_counter()
+    rides = index.recommend(request.get('land'), minute, request.get('completedRides') or (), k)
+    return {
+        'date': index.date,
+        'time': minutes_to_time(minute),
+        'land': request.get('land') if request.get('land') in index.land_index else HUB_LAND,
+        'rides': rides,
+        'elapsedMs': round((time.perf_counter() - started) * 1000, 3)
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python ride_now.py [LAND] [HH:MM] [--k N]   or   python ride_now.py -   (JSON request on stdin)
+    index = load_index()
+    if len(sys.argv) > 1 and sys.argv[1] == '-':
+        request = json.load(sys.stdin)
+        if index is None:
+            json.dump({'error': 'No today data found'}, sys.stdout)
+            sys.exit(1)
+        json.dump(recommend_request(index, request), sys.stdout)
+        sys.exit(0)
+
+    if index is None:
+        print("❌ No today_waits file found")
+        sys.exit(1)
+    args = sys.argv[1:]
+    k = int(args[args.index('--k') + 1]) if '--k' in args else DEFAULT_K
+    positional = [arg for i, arg in enumerate(args) if not arg.startswith('--') and (i == 0 or args[i - 1] != '--k')]
+    request = {'land': positional[0] if positional else None, 'k': k}
+    if len(positional) > 1:
+        request['time'] = positional[1]
+    result = recommend_request(index, request)
+    print(f"🎯 Ride now from {result['land']} at {result['time']} ({result['elapsedMs']} ms)")
+    for ride in result['rides']:
+        print(f"  {ride['name']:30} walk {ride['walkMinutes']:2d} + wait {ride['forecastWait']:3d} min "
+              f"(now {ride['currentWait']}) in {ride['land']}")
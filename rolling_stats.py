@@ -0,0 +1,275 @@
+import os
+import sys
+from datetime import datetime
+
+from wait_data import (
+    DATA_DIR, derived_path, list_day_files, load_day, iter_ride_slots,
+    minutes_to_time, time_to_minutes, weekday_of, write_json
+)
+
+STATS_FILE = derived_path(DATA_DIR, 'rolling_stats.json')
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+CORRECTION_DAYS = 3   # most recent days whose slot values are kept so backfills and corrections re-fold
+
+
+class RunningStats:
+    """Welford running count/mean/variance/min/max that updates in O(1) and merges with other shards"""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, min_value=None, max_value=None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = min_value
+        self.max = max_value
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def remove(self, value):
+        """Inverse Welford update: take back one value folded in earlier
+
+        min/max cannot be un-folded; the caller resets them when `value` was an extreme.
+        """
+        if self.count <= 1:
+            self.count, self.mean, self.m2, self.min, self.max = 0, 0.0, 0.0, None, None
+            return
+        mean = (self.mean * self.count - value) / (self.count - 1)
+        self.m2 = max(self.m2 - (value - self.mean) * (value - mean), 0.0)
+        self.mean = mean
+        self.count -= 1
+
+    def merge(self, other):
+        """Combine another shard into this one (Chan et al. parallel variance)"""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+    def to_list(self):
+        return [self.count, round(self.mean, 4), round(self.m2, 4), self.min, self.max]
+
+    @classmethod
+    def from_list(cls, values):
+        return cls(*values)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': round(self.mean, 1),
+            'std': round(self.std, 1),
+            'min': self.min,
+            'max': self.max
+        }
+
+
+class WaitStatsStore:
+    """Running wait statistics per ride x weekday x slot over all history, plus today so far per ride
+
+    The values folded in from the last CORRECTION_DAYS days are remembered, so a slot that shows
+    up late (a backfill) is still counted and a corrected value replaces its old contribution
+    instead of being skipped. Older days are sealed: only their dates and each bucket's bounds
+    are kept, and slots re-read from them are ignored.
+    """
+
+    def __init__(self):
+        self.history = {}     # (ride, weekday, minute) -> RunningStats
+        self.today = {}       # ride -> RunningStats for today_date
+        self.today_date = None
+        self.observed = {}    # date -> {ride: {time label: wait folded in}}, recent days only
+        self.sealed = {}      # (ride, weekday, minute) -> [min, max] over sealed days
+        self.sealed_dates = set()
+
+    def observe(self, date, ride, minute, wait):
+        """Fold in one slot; a changed value replaces the old one. Returns False if nothing changed"""
+        if date in self.sealed_dates:
+            return False
+        seen = self.observed.setdefault(date, {}).setdefault(ride, {})
+        label = minutes_to_time(minute)
+        old = seen.get(label)
+        if old == wait:
+            return False
+        seen[label] = wait
+
+        key = (ride, weekday_of(date), minute)
+        stats = self.history.get(key)
+        if stats is None:
+            stats = self.history[key] = RunningStats()
+        if old is not None:
+            stats.remove(old)
+            if old in (stats.min, stats.max):
+                self._reset_bounds(key, stats)
+        stats.update(wait)
+
+        if self.today_date is None or date > self.today_date:
+            self.today_date = date
+            self.today = {}
+        if date == self.today_date:
+            if old is None:
+                self.today.setdefault(ride, RunningStats()).update(wait)
+            else:
+                self.today[ride] = RunningStats()
+                for value in seen.values():
+                    self.today[ride].update(value)
+        return True
+
+    def _reset_bounds(self, key, stats):
+        """Recompute a bucket's min/max from its sealed bounds and the recent values after one was removed"""
+        ride, weekday, minute = key
+        label = minutes_to_time(minute)
+        values = [rides[ride][label] for date, rides in self.observed.items()
+                  if weekday_of(date) == weekday and label in rides.get(ride, {})]
+        values += self.sealed.get(key, [])
+        stats.min = min(values) if values else None
+        stats.max = max(values) if values else None
+
+    def seal(self, keep=CORRECTION_DAYS):
+        """Forget the raw values of all but the `keep` most recent days, keeping their bucket bounds"""
+        for date in sorted(self.observed)[:-keep or None]:
+            weekday = weekday_of(date)
+            for ride, slots in self.observed.pop(date).items():
+                for label, wait in slots.items():
+                    key = (ride, weekday, time_to_minutes(label))
+                    bounds = self.sealed.get(key)
+                    self.sealed[key] = [min(bounds[0], wait), max(bounds[1], wait)] if bounds else [wait, wait]
+            self.sealed_dates.add(date)
+
+    def ingest_day(self, day):
+        """Fold in every new or changed slot of a day file; re-ingesting the same file is a no-op"""
+        added = 0
+        for ride, minute, wait in iter_ride_slots(day):
+            if self.observe(day['date'], ride, minute, wait):
+                added += 1
+        self.seal()
+        return added
+
+    def merge(self, other):
+        """Merge another store (e.g. a shard built from a different date range) into this one"""
+        for key, stats in other.history.items():
+            self.history.setdefault(key, RunningStats()).merge(stats)
+        for date, rides in other.observed.items():
+            for ride, slots in rides.items():
+                self.observed.setdefault(date, {}).setdefault(ride, {}).update(slots)
+        for key, (low, high) in other.sealed.items():
+            bounds = self.sealed.get(key)
+            self.sealed[key] = [min(bounds[0], low), max(bounds[1], high)] if bounds else [low, high]
+        self.sealed_dates |= other.sealed_dates
+        if other.today_date and (self.today_date is None or other.today_date > self.today_date):
+            self.today_date = other.today_date
+            self.today = {}
+        if other.today_date == self.today_date:
+            for ride, stats in other.today.items():
+                self.today.setdefault(ride, RunningStats()).merge(stats)
+        self.seal()
+        return self
+
+    def slot_stats(self, ride, weekday, minute):
+        return self.history.get((ride, weekday, minute))
+
+    def ride_summary(self, ride, weekday=None):
+        """Merge the per-slot buckets for a ride into one summary (optionally for one weekday)"""
+        total = RunningStats()
+        for (name, day, _), stats in self.history.items():
+            if name == ride and (weekday is None or day == weekday):
+                total.merge(stats)
+        return total
+
+    def rides(self):
+        return sorted({ride for ride, _, _ in self.history})
+
+    def to_dict(self):
+        history = {}
+        for (ride, weekday, minute), stats in sorted(self.history.items()):
+            slots = history.setdefault(ride, {}).setdefault(WEEKDAYS[weekday], {})
+            slots[minutes_to_time(minute)] = stats.to_list()
+        sealed = {}
+        for (ride, weekday, minute), bounds in sorted(self.sealed.items()):
+            sealed.setdefault(ride, {}).setdefault(WEEKDAYS[weekday], {})[minutes_to_time(minute)] = bounds
+        return {
+            'updated': datetime.now().isoformat(timespec='seconds'),
+            'fields': ['count', 'mean', 'm2', 'min', 'max'],
+            'today_date': self.today_date,
+            'today': {ride: stats.to_list() for ride, stats in sorted(self.today.items())},
+            'summary': {ride: self.ride_summary(ride).summary() for ride in self.rides()},
+            'history': history,
+            'observed': self.observed,
+            'sealed': sealed,
+            'sealed_dates': sorted(self.sealed_dates)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        store = cls()
+        for ride, weekdays in data.get('history', {}).items():
+            for weekday, slots in weekdays.items():
+                for time_label, values in slots.items():
+                    key = (ride, WEEKDAYS.index(weekday), time_to_minutes(time_label))
+                    store.history[key] = RunningStats.from_list(values)
+        store.today_date = data.get('today_date')
+        store.today = {ride: RunningStats.from_list(values) for ride, values in data.get('today', {}).items()}
+        store.observed = data.get('observed', {})
+        for ride, weekdays in data.get('sealed', {}).items():
+            for weekday, slots in weekdays.items():
+                for time_label, bounds in slots.items():
+                    store.sealed[(ride, WEEKDAYS.index(weekday), time_to_minutes(time_label))] = bounds
+        store.sealed_dates = set(data.get('sealed_dates', []))
+        return store
+
+    def save(self, path=STATS_FILE):
+        write_json(path, self.to_dict())
+
+    @classmethod
+    def load(cls, path=STATS_FILE):
+        if not os.path.exists(path):
+            return cls()
+        return cls.from_dict(load_day(path))
+
+
+def update_rolling_stats(data_dir=DATA_DIR, days=None, stats_file=None, rebuild=False):
+    """Fold new slots into the persisted stats store (just the given days, or every day file)"""
+    stats_file = stats_file or derived_path(data_dir, 'rolling_stats.json')
+    store = WaitStatsStore() if rebuild else WaitStatsStore.load(stats_file)
+    if days is None:
+        days = (load_day(path) for path in list_day_files(data_dir).values())
+    added = 0
+    for day in days:
+        added += store.ingest_day(day)
+    store.save(stats_file)
+    return store, added
+
+
+if __name__ == "__main__":
+    rebuild = '--rebuild' in sys.argv
+    store, added = update_rolling_stats(rebuild=rebuild)
+    print(f"📊 Rolling stats updated: {added} new or changed slots, {len(store.history)} ride/weekday/slot buckets")
+    print(f"💾 Saved to {STATS_FILE}")
+    for ride in store.rides():
+        summary = store.ride_summary(ride).summary()
+        today = store.today.get(ride)
+        today_text = f"today avg {today.mean:.1f}" if today else "no data today"
+        print(f"  {ride:30} avg {summary['mean']:5.1f} ± {summary['std']:4.1f} "
+              f"(min {summary['min']}, max {summary['max']}) | {today_text}")
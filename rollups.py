@@ -0,0 +1,196 @@
+import math
+import os
+import sys
+from datetime import datetime, timedelta
+
+from wait_data import (
+    DATA_DIR, PARK_NAME, derived_path, iter_ride_slots, list_day_files, load_day, write_json
+)
+
+LEVELS = ['hour', 'day', 'week']                              # finest to coarsest
+LEVEL_MINUTES = {'hour': 60, 'day': 24 * 60, 'week': 7 * 24 * 60}
+BIN_MINUTES = 5           # week p90s come from merged per-day histograms with this bin width
+MAX_BIN = 60              # waits of 300+ minutes share the last bin
+
+
+def rollup_dir(data_dir=DATA_DIR):
+    return derived_path(data_dir, 'rollups')
+
+
+def level_file(level, bucket):
+    """Hour buckets are stored per month, day buckets (and their histogram state) per year, weeks in one file"""
+    if level == 'hour':
+        return f'hour_{bucket[:7]}.json'
+    if level in ('day', 'state'):
+        return f'{level}_{bucket[:4]}.json'
+    return 'week.json'
+
+
+def week_start(date):
+    day = datetime.strptime(date, '%Y-%m-%d')
+    return (day - timedelta(days=day.weekday())).strftime('%Y-%m-%d')
+
+
+def summarize(values):
+    """[count, mean, min, max, p90] for one bucket (nearest-rank p90)"""
+    ordered = sorted(values)
+    count = len(ordered)
+    return [count, round(sum(ordered) / count, 1), ordered[0], ordered[-1],
+            ordered[max(math.ceil(0.9 * count) - 1, 0)]]
+
+
+def day_histogram(values):
+    """Mergeable per-day state behind the week level: count/sum/min/max plus a wait histogram"""
+    bins = {}
+    for value in values:
+        key = str(min(int(value) // BIN_MINUTES, MAX_BIN))
+        bins[key] = bins.get(key, 0) + 1
+    return {'count': len(values), 'sum': sum(values), 'min': min(values), 'max': max(values), 'bins': bins}
+
+
+def merged_summary(states):
+    """[count, mean, min, max, p90] from several day histograms; p90 is the upper edge of its bin"""
+    count = sum(state['count'] for state in states)
+    bins = {}
+    for state in states:
+        for key, n in state['bins'].items():
+            bins[int(key)] = bins.get(int(key), 0) + n
+    low = min(state['min'] for state in states)
+    high = max(state['max'] for state in states)
+    target = math.ceil(0.9 * count)
+    seen = 0
+    p90 = high
+    for key in sorted(bins):
+        seen += bins[key]
+        if seen >= target:
+            p90 = min(max((key + 1) * BIN_MINUTES, low), high)
+            break
+    return [count, round(sum(state['sum'] for state in states) / count, 1), low, high, p90]
+
+
+class RollupFiles:
+    """Lazily loaded level files plus the per-day histogram state, written back only if touched"""
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.directory = rollup_dir(data_dir)
+        self.files = {}
+        self.dirty = set()
+
+    def get(self, filename):
+        if filename not in self.files:
+            path = os.path.join(self.directory, filename)
+            self.files[filename] = load_day(path) if os.path.exists(path) else {}
+        return self.files[filename]
+
+    def touch(self, filename):
+        self.dirty.add(filename)
+        return self.get(filename)
+
+    def save(self):
+        for filename in sorted(self.dirty):
+            write_json(os.path.join(self.directory, filename), self.files[filename])
+        written = len(self.dirty)
+        self.dirty.clear()
+        return written
+
+
+def ingest_day(files, day):
+    """Replace one day's hour and day buckets and its histogram state; returns the day's week"""
+    date = day['date']
+    hours = {}
+    for ride, minute, wait in iter_ride_slots(day):
+        for series in (ride, PARK_NAME):
+            hours.setdefault(series, {}).setdefault(minute // 60, []).append(wait)
+
+    hour_file = files.touch(level_file('hour', date))
+    day_file = files.touch(level_file('day', date))
+    state = files.touch(level_file('state', date))
+    for buckets in hour_file.values():
+        for key in [key for key in buckets if key.startswith(date)]:
+            del buckets[key]
+    for series_days in list(day_file.values()) + list(state.values()):
+        series_days.pop(date, None)
+
+    for series, by_hour in hours.items():
+        values = [wait for waits in by_hour.values() for wait in waits]
+        for hour, waits in sorted(by_hour.items()):
+            hour_file.setdefault(series, {})[f'{date}T{hour:02d}'] = summarize(waits)
+        day_file.setdefault(series, {})[date] = summarize(values)
+        state.setdefault(series, {})[date] = day_histogram(values)
+    return week_start(date)
+
+
+def rebuild_week(files, week):
+    """Recompute every series' bucket for one week from the per-day histograms"""
+    week_file = files.touch(level_file('week', week))
+    dates = [(datetime.strptime(week, '%Y-%m-%d') + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(7)]
+    states = {}
+    for filename in {level_file('state', date) for date in dates}:
+        for series, series_days in files.get(filename).items():
+            states.setdefault(series, []).extend(series_days[date] for date in dates if date in series_days)
+    for series in set(states) | set(week_file):
+        if states.get(series):
+            week_file.setdefault(series, {})[week] = merged_summary(states[series])
+        else:
+            week_file[series].pop(week, None)
+
+
+def update_rollups(data_dir=DATA_DIR, days=None, rebuild=False):
+    """Fold the given day dicts (or every day file) into the hour/day/week pyramids; returns files written"""
+    if rebuild and os.path.isdir(rollup_dir(data_dir)):
+        for filename in os.listdir(rollup_dir(data_dir)):
+            os.remove(os.path.join(rollup_dir(data_dir), filename))
+    if days is None:
+        days = (load_day(path) for path in list_day_files(data_dir).values())
+    files = RollupFiles(data_dir)
+    weeks = {ingest_day(files, day) for day in days}
+    for week in sorted(weeks):
+        rebuild_week(files, week)
+    return files.save()
+
+
+def pick_level(start, end, max_points):
+    """Finest level whose bucket count over [start, end] stays within max_points"""
+    span_minutes = ((datetime.strptime(end, '%Y-%m-%d') - datetime.strptime(start, '%Y-%m-%d')).days + 1) * 24 * 60
+    for level in LEVELS:
+        if span_minutes / LEVEL_MINUTES[level] <= max_points:
+            return level
+    return LEVELS[-1]
+
+
+def query_rollups(series, start, end, level=None, max_points=400, data_dir=DATA_DIR):
+    """{bucket: [count, mean, min, max, p90]} for a ride (or the park) over [start, end] dates
+
+    Reads only the files of the chosen level that overlap the range, so a season at week
+    level is one small file.
+    """
+    level = level or pick_level(start, end, max_points)
+    if level == 'week':
+        start = week_start(start)
+    files = RollupFiles(data_dir)
+    first, last = level_file(level, start), level_file(level, end)
+    names = []
+    if os.path.isdir(files.directory):
+        names = [name for name in os.listdir(files.directory)
+                 if (name.startswith(f'{level}_') or name == first) and first <= name <= last]
+    buckets = {}
+    for filename in sorted(names):
+        for bucket, values in files.get(filename).get(series, {}).items():
+            if start <= bucket[:10] <= end:
+                buckets[bucket] = values
+    return level, dict(sorted(buckets.items()))
+
+
+if __name__ == "__main__":
+    # Usage: python rollups.py [--rebuild]
+    #        python rollups.py SERIES START_DATE END_DATE [hour|day|week]
+    if len(sys.argv) >= 4:
+        level, buckets = query_rollups(sys.argv[1], sys.argv[2], sys.argv[3],
+                                       sys.argv[4] if len(sys.argv) > 4 else None)
+        print(f"📈 {sys.argv[1]} {sys.argv[2]} .. {sys.argv[3]} at {level} level ({len(buckets)} buckets)")
+        for bucket, (count, mean, low, high, p90) in buckets.items():
+            print(f"  {bucket:14} mean {mean:5.1f}  min {low:3}  max {high:3}  p90 {p90:3}  ({count} slots)")
+        sys.exit(0)
+
+    written = update_rollups(rebuild='--rebuild' in sys.argv)
+    print(f"🧱 Rollups updated: {written} files in {rollup_dir()}")
@@ -9,6 +9,9 @@ require('dotenv').config();
 
 const app = express();
 const PORT = process.env.PORT || 5000;
+// The long-running Python read API (read_api.py) keeps the re-planner's tables warm
+const READ_API_URL = process.env.READ_API_URL || 'http://localhost:5001';
+const THRILL_DATA_URL = (process.env.THRILL_DATA_URL || 'https://www.thrill-data.com').replace(/\/$/, '');
 const HOST = '0.0.0.0'; // Listen on all network interfaces
 
 app.use(cors());
@@ -17,6 +20,79 @@ app.use(express.json());
 // Store completed rides
 let completedRides = new Set();
 
+// Field and time-window projection for the wait-time endpoints (?rides=&from=&to=&fields=),
+// mirroring read_api.py so both read paths accept the same queries
+const RIDE_FIELDS = ['name', 'waitTime', 'status', 'wait_times'];
+
+function parseSlotMinutes(value) {
+    const clock = /^(\d{1,2}):(\d{2})$/.exec(value.trim());
+    if (clock) return Number(clock[1]) * 60 + Number(clock[2]);
+    const label = /^(\d{1,2}):(\d{2})\s*(AM|PM)$/.exec(value.trim());
+    if (!label) return null;
+    const hour = Number(label[1]) % 12 + (label[3] === 'PM' ? 12 : 0);
+    return hour * 60 + Number(label[2]);
+}
+
+function slotLabel(minutes) {
+    const hour = Math.floor(minutes / 60) % 24;
+    return `${String(hour % 12 || 12).padStart(2, '0')}:${String(minutes % 60).padStart(2, '0')} ${hour < 12 ? 'AM' : 'PM'}`;
+}
+
+function rideSlug(name) {
+    return name.toLowerCase().replace(/[^a-z0-9]+/g, '-').replace(/^-+|-+$/g, '');
+}
+
+function listParam(value) {
+    if (value === undefined) return null;
+    return [].concat(value).join(',').split(',').map(item => item.trim()).filter(Boolean);
+}
+
+function projectDay(data, query) {
+    const rides = listParam(query.rides);
+    let fields = listParam(query.fields);
+    const start = query.from !== undefined ? parseSlotMinutes(String(query.from)) : null;
+    const end = query.to !== undefined ? parseSlotMinutes(String(query.to)) : null;
+    if ((query.from !== undefined && start === null) || (query.to !== undefined && end === null)) {
+        throw new RangeError('from/to must be HH:MM or "08:45 AM"');
+    }
+    if (fields) {
+        const unknown = fields.filter(field => !RIDE_FIELDS.includes(field));
+        if (unknown.length) throw new RangeError(`unknown fields: ${unknown.join(', ')}`);
+        if (!fields.includes('name')) fields.unshift('name');
+    } else {
+        fields = RIDE_FIELDS;
+    }
+    if (!rides && start === null && end === null && fields === RIDE_FIELDS) return data;
+
+    const wanted = rides ? new Set(rides) : null;
+    const projected = (data.rides || [])
+        .filter(ride => !wanted || wanted.has(ride.name) || wanted.has(rideSlug(ride.name || '')))
+        .map(ride => {
+            const entry = {};
+            fields.forEach(field => {
+                if (field !== 'wait_times') entry[field] = ride[field];
+            });
+            if (fields.includes('wait_times')) {
+                entry.wait_times = (ride.wait_times || []).filter(slot => {
+                    if (start === null && end === null) return true;
+                    const minutes = parseSlotMinutes(String(slot.time || ''));
+                    return minutes !== null && (start === null || minutes >= start) && (end === null || minutes <= end);
+                });
+            }
+            return entry;
+        });
+    return { ...data, rides: projected };
+}
+
+function sendProjected(res, data, query) {
+    try {
+        res.json(projectDay(data, query));
+    } catch (error) {
+        if (error instanceof RangeError) return res.status(400).json({ error: error.message });
+        throw error;
+    }
+}
+
 // Get last week's wait times (static JSON)
 app.get('/api/wait-times/last-week', (req, res) => {
     try {
@@ -60,7 +136,7 @@ app.get('/api/wait-times/last-week', (req, res) => {
         const filePath = path.join(dataDir, closestFile.file);
         console.log(`Using last week data file: ${filePath} (date: ${closestFile.date}, requested: ${lastWeekStr})`);
         const data = JSON.parse(fs.readFileSync(filePath, 'utf8'));
-        res.json(data);
+        sendProjected(res, data, req.query);
     } catch (error) {
         console.error('Error serving last week data:', error);
         res.status(500).json({ error: 'Failed to load last week data' });
@@ -97,7 +173,7 @@ app.get('/api/wait-times/today', (req, res) => {
         
         const data = JSON.parse(fileContent);
         console.log(`Successfully parsed JSON with ${data.rides ? data.rides.length : 0} rides`);
-        res.json(data);
+        sendProjected(res, data, req.query);
     } catch (error) {
         console.error('Error serving today data:', error);
         console.error('Error details:', error.message);
@@ -105,21 +181,236 @@ app.get('/api/wait-times/today', (req, res) => {
     }
 });
 
+// Get today's observations with the nowcast for the rest of the day (built by nowcast.py)
+app.get('/api/wait-times/nowcast', (req, res) => {
+    try {
+        const nowcastFile = path.join(__dirname, 'data', 'derived', 'nowcast.json');
+        if (!fs.existsSync(nowcastFile)) {
+            return res.status(404).json({ error: 'No nowcast found. Run nowcast.py first.' });
+        }
+        res.json(JSON.parse(fs.readFileSync(nowcastFile, 'utf8')));
+    } catch (error) {
+        console.error('Error serving nowcast:', error);
+        res.status(500).json({ error: 'Failed to load nowcast' });
+    }
+});
+
+// Get the park crowd calendar: recent days plus a multi-week forecast (built by crowd_calendar.py)
+app.get('/api/crowd-calendar', (req, res) => {
+    try {
+        const calendarFile = path.join(__dirname, 'data', 'derived', 'crowd_calendar.json');
+        if (!fs.existsSync(calendarFile)) {
+            return res.status(404).json({ error: 'No crowd calendar found. Run crowd_calendar.py first.' });
+        }
+        res.json(JSON.parse(fs.readFileSync(calendarFile, 'utf8')));
+    } catch (error) {
+        console.error('Error serving crowd calendar:', error);
+        res.status(500).json({ error: 'Failed to load crowd calendar' });
+    }
+});
+
+// Get precomputed rolling wait statistics (built by rolling_stats.py)
+app.get('/api/wait-stats', (req, res) => {
+    try {
+        const statsFile = path.join(__dirname, 'data', 'derived', 'rolling_stats.json');
+        if (!fs.existsSync(statsFile)) {
+            return res.status(404).json({ error: 'No rolling stats found. Run rolling_stats.py first.' });
+        }
+        const stats = JSON.parse(fs.readFileSync(statsFile, 'utf8'));
+        const { ride } = req.query;
+        if (ride) {
+            return res.json({
+                ride,
+                today_date: stats.today_date,
+                fields: stats.fields,
+                summary: stats.summary[ride] || null,
+                today: stats.today[ride] || null,
+                history: stats.history[ride] || {}
+            });
+        }
+        res.json({
+            updated: stats.updated,
+            today_date: stats.today_date,
+            fields: stats.fields,
+            summary: stats.summary,
+            today: stats.today
+        });
+    } catch (error) {
+        console.error('Error serving wait stats:', error);
+        res.status(500).json({ error: 'Failed to load wait stats' });
+    }
+});
+
+// Get precomputed best-time-to-ride windows (built by best_times.py).
+// ?ride=&below=N[&time=HH:MM] instead answers when that ride's wait should next be at or under N minutes today,
+// looked up in the below-threshold runs the nowcast stage stores (the weekday's history before the first slot).
+app.get('/api/best-times', (req, res) => {
+    const { ride, below, time } = req.query;
+    if (below !== undefined) {
+        const minute = time === undefined ? etMinutes() : parseSlotMinutes(String(time));
+        if (!ride || minute === null) {
+            return res.status(400).json({ error: 'below needs a ride and an optional time as HH:MM' });
+        }
+        try {
+            // Today's nowcast holds the runs of slots under each threshold; before it exists, the weekday's history does
+            const date = etDateString();
+            const nowcastFile = path.join(__dirname, 'data', 'derived', 'nowcast.json');
+            const bestTimesFile = path.join(__dirname, 'data', 'derived', 'best_times.json');
+            const nowcast = fs.existsSync(nowcastFile) ? JSON.parse(fs.readFileSync(nowcastFile, 'utf8')) : null;
+            let source, thresholds, runs;
+            if (nowcast && nowcast.date === date) {
+                const row = nowcast.rides.find(entry => entry.name === ride);
+                source = 'nowcast';
+                thresholds = nowcast.thresholds;
+                runs = row && row.below[below];
+            } else if (fs.existsSync(bestTimesFile)) {
+                const table = JSON.parse(fs.readFileSync(bestTimesFile, 'utf8'));
+                const weekday = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'][(new Date(`${date}T12:00:00Z`).getUTCDay() + 6) % 7];
+                const entry = table.rides[ride] && table.rides[ride][weekday];
+                source = 'history';
+                thresholds = table.thresholds;
+                runs = entry && entry.below[below];
+            } else {
+                return res.status(404).json({ error: 'No nowcast or best times found. Run the pipeline first.' });
+            }
+            if (!thresholds.map(String).includes(String(below))) {
+                return res.status(400).json({ error: `below must be one of ${thresholds.join(', ')}` });
+            }
+            if (!runs) {
+                return res.status(404).json({ error: `No forecast for ride: ${ride}` });
+            }
+            const run = runs.find(([, end]) => parseSlotMinutes(end) > minute);
+            const next = run && {
+                time: parseSlotMinutes(run[0]) > minute ? run[0] : slotLabel(minute),
+                until: run[1],
+                source
+            };
+            return res.json({ ride, date, time: slotLabel(minute), below: Number(below), next: next || null });
+        } catch (error) {
+            console.error('Error finding next time below threshold:', error);
+            return res.status(500).json({ error: `Failed to find next time below ${below} minutes` });
+        }
+    }
+
+    try {
+        const bestTimesFile = path.join(__dirname, 'data', 'derived', 'best_times.json');
+        if (!fs.existsSync(bestTimesFile)) {
+            return res.status(404).json({ error: 'No best times found. Run best_times.py first.' });
+        }
+        const table = JSON.parse(fs.readFileSync(bestTimesFile, 'utf8'));
+        const { day } = req.query;
+        if (!ride) {
+            return res.json(table);
+        }
+        const rideTimes = table.rides[ride];
+        if (!rideTimes) {
+            return res.status(404).json({ error: `No best times for ride: ${ride}` });
+        }
+        // ?day= accepts a weekday label (Mon..Sun) or a YYYY-MM-DD date
+        const weekdays = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'];
+        let weekday = day;
+        if (day && /^\d{4}-\d{2}-\d{2}$/.test(day)) {
+            weekday = weekdays[(new Date(`${day}T12:00:00Z`).getUTCDay() + 6) % 7];
+        }
+        const response = { ride, windowMinutes: table.windowMinutes, thresholds: table.thresholds };
+        if (weekday) {
+            Object.assign(response, { day: weekday }, rideTimes[weekday]);
+        } else {
+            response.days = rideTimes;
+        }
+        res.json(response);
+    } catch (error) {
+        console.error('Error serving best times:', error);
+        res.status(500).json({ error: 'Failed to load best times' });
+    }
+});
+
+// Hour/day/week min/mean/max/p90 rollups for a ride or the park (built by rollups.py).
+// ?level= picks hour|day|week; by default the finest level that keeps the range under 400 buckets.
+const ROLLUP_LEVELS = { hour: 60, day: 24 * 60, week: 7 * 24 * 60 };
+
+app.get('/api/wait-rollups', (req, res) => {
+    try {
+        const rollupDir = path.join(__dirname, 'data', 'derived', 'rollups');
+        const { series = 'Epic Universe', from, to } = req.query;
+        if (!/^\d{4}-\d{2}-\d{2}$/.test(from || '') || !/^\d{4}-\d{2}-\d{2}$/.test(to || '')) {
+            return res.status(400).json({ error: 'from and to must be YYYY-MM-DD' });
+        }
+        if (!fs.existsSync(rollupDir)) {
+            return res.status(404).json({ error: 'No rollups found. Run rollups.py first.' });
+        }
+        const spanMinutes = ((new Date(to) - new Date(from)) / 86400000 + 1) * 24 * 60;
+        const level = req.query.level ||
+            Object.keys(ROLLUP_LEVELS).find(name => spanMinutes / ROLLUP_LEVELS[name] <= 400) || 'week';
+        if (!ROLLUP_LEVELS[level]) {
+            return res.status(400).json({ error: 'level must be hour, day or week' });
+        }
+
+        let start = from;
+        if (level === 'week') {
+            const day = new Date(`${from}T12:00:00Z`);
+            day.setUTCDate(day.getUTCDate() - (day.getUTCDay() + 6) % 7);
+            start = day.toISOString().split('T')[0];
+        }
+        // Only read the files covering the range: hour files per month, day files per year
+        const keyLength = { hour: 7, day: 4, week: 0 }[level];
+        const files = fs.readdirSync(rollupDir).filter(file => {
+            if (level === 'week') return file === 'week.json';
+            const match = file.match(new RegExp(`^${level}_(.+)\\.json$`));
+            return match && match[1] >= start.slice(0, keyLength) && match[1] <= to.slice(0, keyLength);
+        });
+
+        const buckets = {};
+        files.sort().forEach(file => {
+            const data = JSON.parse(fs.readFileSync(path.join(rollupDir, file), 'utf8'));
+            Object.entries(data[series] || {}).forEach(([bucket, values]) => {
+                if (bucket.slice(0, 10) >= start && bucket.slice(0, 10) <= to) buckets[bucket] = values;
+            });
+        });
+        const ordered = Object.fromEntries(Object.entries(buckets).sort(([a], [b]) => a.localeCompare(b)));
+        res.json({ series, level, fields: ['count', 'mean', 'min', 'max', 'p90'], buckets: ordered });
+    } catch (error) {
+        console.error('Error serving rollups:', error);
+        res.status(500).json({ error: 'Failed to load rollups' });
+    }
+});
+
+// The One Call response is cached in one file shared with the Python collector (weather_collector.py),
+// so upstream is hit at most once per TTL however many clients or processes ask. After a failed
+// refresh the file carries retry_at, and until then the last payload is served without retrying.
+const WEATHER_CACHE_FILE = path.join(__dirname, 'data', 'weather', 'onecall_cache.json');
+const WEATHER_CACHE_TTL_MS = 10 * 60 * 1000; // weather_collector.CACHE_TTL_SECONDS
+let weatherRefresh = null;
+
+const readWeatherCache = async () => {
+    if (fs.existsSync(WEATHER_CACHE_FILE)) {
+        const entry = JSON.parse(fs.readFileSync(WEATHER_CACHE_FILE, 'utf8'));
+        const fresh = entry.fetched_at && Date.now() - entry.fetched_at * 1000 < WEATHER_CACHE_TTL_MS;
+        const backingOff = entry.retry_at && Date.now() < entry.retry_at * 1000;
+        if (fresh || (backingOff && entry.payload)) {
+            return entry.payload;
+        }
+        if (backingOff) {
+            throw new Error('Weather upstream unavailable, retrying later');
+        }
+    }
+    // Stale or missing: let the collector refresh the file (it serves the last payload if upstream fails)
+    if (!weatherRefresh) {
+        weatherRefresh = runPythonJson('weather_collector.py', {}).finally(() => {
+            weatherRefresh = null;
+        });
+    }
+    return (await weatherRefresh).payload;
+};
+
 // Get weather data
 app.get('/api/weather', async (req, res) => {
-    const apiKey = process.env.WEATHER_API_KEY;
-    if (!apiKey) {
+    if (!process.env.WEATHER_API_KEY) {
         return res.status(500).json({ error: 'Weather API key is not configured.' });
     }
 
-    // Coordinates for Universal's Epic Universe
-    const lat = 28.4739;
-    const lon = -81.4688;
-    const url = `https://api.openweathermap.org/data/3.0/onecall?lat=${lat}&lon=${lon}&exclude=minutely,daily,alerts&units=imperial&appid=${apiKey}`;
-
     try {
-        const response = await axios.get(url);
-        const weatherData = response.data;
+        const weatherData = await readWeatherCache();
 
         // Get current time in Eastern Time (Universal Studios timezone)
         const now = new Date();
@@ -208,7 +499,7 @@ app.get('/api/weather', async (req, res) => {
 // Get wait times from Thrill Data (legacy endpoint - keep for compatibility)
 app.get('/api/wait-times', async (req, res) => {
     try {
-        const response = await axios.get('https://www.thrill-data.com/waittimes/epic-universe');
+        const response = await axios.get(`${THRILL_DATA_URL}/waittimes/epic-universe`);
         const $ = cheerio.load(response.data);
         
         const rides = [];
@@ -261,149 +552,216 @@ app.post('/api/reset-rides', (req, res) => {
     res.json({ success: true });
 });
 
-// Trigger data update and return fresh data (Node.js version - no Python required)
-app.post('/api/refresh-data', async (req, res) => {
-    try {
-        console.log('🔄 Triggering data refresh (Node.js version)...');
-        
-        // Master list of rides and their lands at Epic Universe
-        // Note: Using the truncated names from the Thrill Data API
-        const rideLandMap = {
-            "Stardust Racers": "Celestial Park",
-            "Constellation Carousel": "Celestial Park",
-            "Curse of the Werewolf": "Dark Universe",
-            "Darkmoor Monster Makeup Experience": "Dark Universe",
-            "Monsters Unch...Experiment": "Dark Universe",
-            "Hiccup's Wing Gliders": "Isle of Berk",
-            "Dragon Racer's Rally": "Isle of Berk",
-            "Fyre Drill": "Isle of Berk",
-            "The Untrainable Dragon": "Isle of Berk",
-            "Meet Toothles...nd Friends": "Isle of Berk",
-            "Mario Kart: B... Challenge": "SUPER NINTENDO WORLD",
-            "Yoshi's Adventure": "SUPER NINTENDO WORLD",
-            "Mine-Cart Madness": "SUPER NINTENDO WORLD",
-            "Bowser Jr. Challenge": "SUPER NINTENDO WORLD",
-            "Harry Potter ...e Ministry": "The Wizarding World of Harry Potter",
+// Master list of rides and their lands at Epic Universe
+// Note: Using the truncated names from the Thrill Data API
+const rideLandMap = {
+    "Stardust Racers": "Celestial Park",
+    "Constellation Carousel": "Celestial Park",
+    "Curse of the Werewolf": "Dark Universe",
+    "Darkmoor Monster Makeup Experience": "Dark Universe",
+    "Monsters Unch...Experiment": "Dark Universe",
+    "Hiccup's Wing Gliders": "Isle of Berk",
+    "Dragon Racer's Rally": "Isle of Berk",
+    "Fyre Drill": "Isle of Berk",
+    "The Untrainable Dragon": "Isle of Berk",
+    "Meet Toothles...nd Friends": "Isle of Berk",
+    "Mario Kart: B... Challenge": "SUPER NINTENDO WORLD",
+    "Yoshi's Adventure": "SUPER NINTENDO WORLD",
+    "Mine-Cart Madness": "SUPER NINTENDO WORLD",
+    "Bowser Jr. Challenge": "SUPER NINTENDO WORLD",
+    "Harry Potter ...e Ministry": "The Wizarding World of Harry Potter",
 
-        };
-        
-        // Use Node.js to fetch data instead of Python
-        const axios = require('axios');
-        const cheerio = require('cheerio');
-        const fs = require('fs');
-        const path = require('path');
-        
-        // Get current date in Eastern Time
-        const now = new Date();
-        const etOffset = -5; // Eastern Time is UTC-5 (or UTC-4 during DST)
-        const utc = now.getTime() + (now.getTimezoneOffset() * 60000);
-        const today = new Date(utc + (etOffset * 3600000));
-        const todayStr = today.toISOString().split('T')[0];
-        
-        console.log(`Fetching heatmap data for date: ${todayStr}`);
-        
-        // Fetch the heatmap data (this gives us the full day's historical data)
-        const heatMapResponse = await axios.get('https://www.thrill-data.com/waits/graph/quick/parkheat', {
-            params: {
-                id: 243,  // Epic Universe park ID
-                dateStart: todayStr,
-                tag: 'min'
-            },
-            headers: {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-        });
-        
-        // Extract the Plotly.newPlot data array
-        const plotData = heatMapResponse.data.plot1;
-        const dataArrayMatch = plotData.match(/Plotly\.newPlot\([^,]+,\s*(\[.*?\]),\s*\{/s);
-        
-        if (!dataArrayMatch) {
-            throw new Error('Could not extract Plotly data array');
-        }
-        
-        // Parse the data array
-        let dataArr;
-        try {
-            dataArr = eval(dataArrayMatch[1]);
-        } catch (e) {
-            throw new Error('Failed to parse Plotly data array: ' + e.message);
+};
+
+// Park-local calendar date (YYYY-MM-DD) for a moment; the time zone database handles the EST/EDT switch
+const etDateFormat = new Intl.DateTimeFormat('en-US', {
+    timeZone: 'America/New_York', year: 'numeric', month: '2-digit', day: '2-digit'
+});
+const etDateString = (date = new Date()) => {
+    const parts = Object.fromEntries(etDateFormat.formatToParts(date).map(part => [part.type, part.value]));
+    return `${parts.year}-${parts.month}-${parts.day}`;
+};
+const etTimeFormat = new Intl.DateTimeFormat('en-US', {
+    timeZone: 'America/New_York', hourCycle: 'h23', hour: '2-digit', minute: '2-digit'
+});
+const etMinutes = (date = new Date()) => {
+    const parts = Object.fromEntries(etTimeFormat.formatToParts(date).map(part => [part.type, part.value]));
+    return Number(parts.hour) * 60 + Number(parts.minute);
+};
+
+// Scrape today's heatmap from Thrill Data and write the day file (Node.js version - no Python required)
+const scrapeTodayData = async () => {
+    const todayStr = etDateString();
+    
+    console.log(`Fetching heatmap data for date: ${todayStr}`);
+    
+    // Fetch the heatmap data (this gives us the full day's historical data)
+    const heatMapResponse = await axios.get(`${THRILL_DATA_URL}/waits/graph/quick/parkheat`, {
+        params: {
+            id: 243,  // Epic Universe park ID
+            dateStart: todayStr,
+            tag: 'min'
+        },
+        headers: {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
-        
-        const data = dataArr[0];
-        const z = data.z; // Wait times matrix
-        const y = data.y; // Ride names
-        const x = data.x; // Time labels
-        
-        console.log(`Extracted data: ${y.length} rides, ${x.length} time points`);
-        
-        // Process the data into the same format as the Python script
-        const rides = [];
-        
-        for (let i = 0; i < y.length; i++) {
-            const rideName = y[i];
-            const waitTimes = z[i] || [];
-            
-            // Look up the land for the current ride, default to 'Unknown'
-            const land = rideLandMap[rideName] || 'Unknown';
-
-            // Convert wait times to the expected format
-            const formattedWaitTimes = [];
-            for (let j = 0; j < x.length; j++) {
-                const timeLabel = x[j];
-                const waitTime = waitTimes[j];
-                
-                // Skip "Average" time point
-                if (timeLabel === "Average") continue;
-                
-                formattedWaitTimes.push({
-                    time: timeLabel,
-                    wait: waitTime === '' || waitTime === null ? null : parseInt(waitTime)
-                });
-            }
+    });
+    
+    // Extract the Plotly.newPlot data array
+    const plotData = heatMapResponse.data.plot1;
+    const dataArrayMatch = plotData.match(/Plotly\.newPlot\([^,]+,\s*(\[.*?\]),\s*\{/s);
+    
+    if (!dataArrayMatch) {
+        throw new Error('Could not extract Plotly data array');
+    }
+    
+    // Parse the data array (it is plain JSON, same as the Python extractors read it)
+    let dataArr;
+    try {
+        dataArr = JSON.parse(dataArrayMatch[1]);
+    } catch (e) {
+        throw new Error('Failed to parse Plotly data array: ' + e.message);
+    }
+    
+    const data = dataArr[0];
+    const z = data.z; // Wait times matrix
+    const y = data.y; // Ride names
+    const x = data.x; // Time labels
+    
+    console.log(`Extracted data: ${y.length} rides, ${x.length} time points`);
+    
+    // Process the data into the same format as the Python script
+    const rides = [];
+    
+    for (let i = 0; i < y.length; i++) {
+        const rideName = y[i];
+        const waitTimes = z[i] || [];
+        
+        // Look up the land for the current ride, default to 'Unknown'
+        const land = rideLandMap[rideName] || 'Unknown';
+
+        // Convert wait times to the expected format
+        const formattedWaitTimes = [];
+        for (let j = 0; j < x.length; j++) {
+            const timeLabel = x[j];
+            const waitTime = waitTimes[j];
             
-            // Get current wait time (latest non-null value)
-            let currentWait = null;
-            for (let k = formattedWaitTimes.length - 1; k >= 0; k--) {
-                if (formattedWaitTimes[k].wait !== null) {
-                    currentWait = formattedWaitTimes[k].wait;
-                    break;
-                }
-            }
+            // Skip "Average" time point
+            if (timeLabel === "Average") continue;
             
-            rides.push({
-                name: rideName,
-                waitTime: currentWait,
-                status: currentWait !== null ? "Open" : "Down",
-                wait_times: formattedWaitTimes,
-                land: land
+            formattedWaitTimes.push({
+                time: timeLabel,
+                wait: waitTime === '' || waitTime === null ? null : parseInt(waitTime)
             });
         }
         
-        // Create the data structure
-        const todayData = {
-            date: todayStr,
-            park: "Epic Universe",
-            rides: rides
-        };
-        
-        // Ensure data directory exists
-        const dataDir = path.join(__dirname, 'data');
-        if (!fs.existsSync(dataDir)) {
-            fs.mkdirSync(dataDir, { recursive: true });
+        // Get current wait time (latest non-null value)
+        let currentWait = null;
+        for (let k = formattedWaitTimes.length - 1; k >= 0; k--) {
+            if (formattedWaitTimes[k].wait !== null) {
+                currentWait = formattedWaitTimes[k].wait;
+                break;
+            }
         }
         
-        // Save to file
-        const outputFile = path.join(dataDir, `today_waits_${todayStr}.json`);
-        fs.writeFileSync(outputFile, JSON.stringify(todayData, null, 2));
-        
-        console.log(`✅ Data refresh completed successfully. Saved ${rides.length} rides to ${outputFile}`);
-        
+        rides.push({
+            name: rideName,
+            waitTime: currentWait,
+            status: currentWait !== null ? "Open" : "Down",
+            wait_times: formattedWaitTimes,
+            land: land
+        });
+    }
+    
+    // Create the data structure
+    const todayData = {
+        date: todayStr,
+        park: "Epic Universe",
+        rides: rides
+    };
+    
+    // Ensure data directory exists
+    const dataDir = path.join(__dirname, 'data');
+    if (!fs.existsSync(dataDir)) {
+        fs.mkdirSync(dataDir, { recursive: true });
+    }
+    
+    // Save to a temp file and rename so concurrent readers never see a half-written file
+    const outputFile = path.join(dataDir, `today_waits_${todayStr}.json`);
+    fs.writeFileSync(`${outputFile}.tmp`, JSON.stringify(todayData, null, 2));
+    fs.renameSync(`${outputFile}.tmp`, outputFile);
+    
+    console.log(`✅ Data refresh completed successfully. Saved ${rides.length} rides to ${outputFile}`);
+    return todayData;
+};
+
+// Refreshes are coalesced per park: one upstream scrape in flight at a time, and data younger
+// than the freshness window is returned as-is (stale data is returned too, then revalidated in the background)
+const REFRESH_FRESH_MS = 2 * 60 * 1000;
+const refreshState = {};
+
+// Seed the refresh cache from the day file on disk so a restart doesn't force a scrape
+const seedFromDisk = (park) => {
+    const dataDir = path.join(__dirname, 'data');
+    if (!fs.existsSync(dataDir)) return;
+    const files = fs.readdirSync(dataDir)
+        .filter(file => file.startsWith('today_waits_') && file.endsWith('.json'))
+        .sort()
+        .reverse();
+    const todayStr = etDateString();
+    if (files.length === 0 || files[0] !== `today_waits_${todayStr}.json`) return;
+    const filePath = path.join(dataDir, files[0]);
+    refreshState[park] = {
+        data: JSON.parse(fs.readFileSync(filePath, 'utf8')),
+        fetchedAt: fs.statSync(filePath).mtimeMs,
+        pending: null
+    };
+};
+
+const revalidate = (park) => {
+    const state = refreshState[park] || (refreshState[park] = { data: null, fetchedAt: 0, pending: null });
+    if (!state.pending) {
+        state.pending = scrapeTodayData()
+            .then(data => {
+                state.data = data;
+                state.fetchedAt = Date.now();
+                return data;
+            })
+            .finally(() => {
+                state.pending = null;
+            });
+    }
+    return state.pending;
+};
+
+// Trigger data update and return fresh data
+app.post('/api/refresh-data', async (req, res) => {
+    const park = 'epic-universe';
+    try {
+        if (!refreshState[park]) {
+            seedFromDisk(park);
+        }
+        const state = refreshState[park];
+        let revalidating = false;
+
+        if (!state || !state.data) {
+            console.log('🔄 Triggering data refresh (Node.js version)...');
+            await revalidate(park);
+        } else if (Date.now() - state.fetchedAt >= REFRESH_FRESH_MS) {
+            console.log('🔄 Serving cached data and revalidating in the background...');
+            revalidating = true;
+            revalidate(park).catch(error => console.error('Background refresh failed:', error.message));
+        }
+
+        const { data, fetchedAt } = refreshState[park];
         res.json({ 
             success: true, 
-            message: 'Data refreshed successfully (Node.js version)',
-            data: todayData,
-            ridesCount: rides.length
+            message: revalidating ? 'Served cached data, refresh in progress' : 'Data refreshed successfully (Node.js version)',
+            data,
+            ridesCount: data.rides.length,
+            fetchedAt: new Date(fetchedAt).toISOString(),
+            dataAgeSeconds: Math.round((Date.now() - fetchedAt) / 1000),
+            revalidating
         });
         
     } catch (error) {
@@ -493,6 +851,163 @@ app.post('/api/get-historical-data', async (req, res) => {
     }
 });
 
+// Run one of the Python planning scripts in stdin/stdout JSON mode
+async function runPythonJson(script, payload) {
+    const pythonProcess = spawn('python', [script, '-'], {
+        cwd: __dirname,
+        stdio: 'pipe'
+    });
+
+    let output = '';
+    let errorOutput = '';
+    pythonProcess.stdout.on('data', (data) => {
+        output += data.toString();
+    });
+    pythonProcess.stderr.on('data', (data) => {
+        errorOutput += data.toString();
+    });
+
+    pythonProcess.stdin.write(JSON.stringify(payload));
+    pythonProcess.stdin.end();
+
+    await new Promise((resolve, reject) => {
+        pythonProcess.on('close', (code) => {
+            if (code !== 0) {
+                reject(new Error(`Python script failed: ${errorOutput}`));
+            } else {
+                resolve();
+            }
+        });
+        pythonProcess.on('error', reject);
+    });
+    return JSON.parse(output);
+}
+
+// Monte Carlo risk of a ride plan overrunning planEndTime (computed by plan_risk.py)
+app.post('/api/plan-risk', async (req, res) => {
+    const { plan, planStartTime, planEndTime, date, samples } = req.body;
+    if (!Array.isArray(plan)) {
+        return res.status(400).json({ error: 'plan must be an array of plan items' });
+    }
+
+    try {
+        res.json(await runPythonJson('plan_risk.py', { plan, planStartTime, planEndTime, date, samples }));
+    } catch (error) {
+        console.error('Error evaluating plan risk:', error);
+        res.status(500).json({ error: `Failed to evaluate plan risk: ${error.message}` });
+    }
+});
+
+// Reorder a plan to finish earliest while keeping break windows and fixed times (plan_optimizer.py).
+// Breaks may carry windowStart/windowEnd and any item a fixedTime ("HH:MM"); budgetMs bounds the search.
+// Forwarded to the read API, whose plan cache answers repeated plans without searching again.
+app.post('/api/plan-optimize', async (req, res) => {
+    const { plan, planStartTime, planEndTime, date, budgetMs } = req.body;
+    if (!Array.isArray(plan)) {
+        return res.status(400).json({ error: 'plan must be an array of plan items' });
+    }
+
+    const payload = { plan, planStartTime, planEndTime, date, budgetMs };
+    try {
+        const response = await axios.post(`${READ_API_URL}/api/plan/optimize`, payload, { timeout: 5000 });
+        return res.json(response.data);
+    } catch (error) {
+        if (error.response && error.response.status === 400) {
+            return res.status(400).json(error.response.data);
+        }
+        console.log(`Read API unavailable for plan optimization (${error.message}), running plan_optimizer.py`);
+    }
+
+    try {
+        res.json(await runPythonJson('plan_optimizer.py', payload));
+    } catch (error) {
+        console.error('Error optimizing plan:', error);
+        res.status(500).json({ error: `Failed to optimize plan: ${error.message}` });
+    }
+});
+
+// Top open rides to head for now: forecast wait on arrival plus walking time from the user's land,
+// skipping completed rides (ride_now.py). Answered by the read API in well under a millisecond.
+app.get('/api/ride-now', async (req, res) => {
+    const { land, time, k } = req.query;
+    const completed = req.query.completed !== undefined
+        ? String(req.query.completed).split(',').filter(Boolean)
+        : Array.from(completedRides);
+
+    try {
+        const response = await axios.get(`${READ_API_URL}/api/ride-now`, {
+            params: { land, time, k, completed: completed.join(',') },
+            timeout: 2000
+        });
+        return res.json(response.data);
+    } catch (error) {
+        if (error.response && [400, 404].includes(error.response.status)) {
+            return res.status(error.response.status).json(error.response.data);
+        }
+        console.log(`Read API unavailable for ride-now (${error.message}), running ride_now.py`);
+    }
+
+    try {
+        res.json(await runPythonJson('ride_now.py', { land, time, k, completedRides: completed }));
+    } catch (error) {
+        console.error('Error recommending rides:', error);
+        res.status(500).json({ error: `Failed to recommend rides: ${error.message}` });
+    }
+});
+
+// Wait-time alerts (alerts.py) live in the read API, which evaluates them as each snapshot lands.
+// POST /api/alerts {watcher, ride, condition: below|above|reopens|closes, threshold}, POST /api/alerts/delete {id},
+// GET /api/alerts?watcher= and GET /api/alerts/events?watcher=&since=SEQ are passed straight through.
+const forwardAlerts = async (req, res) => {
+    try {
+        const response = await axios({
+            method: req.method,
+            url: `${READ_API_URL}${req.path}`,
+            params: req.query,
+            data: req.method === 'POST' ? req.body : undefined,
+            timeout: 2000
+        });
+        res.json(response.data);
+    } catch (error) {
+        if (error.response) {
+            return res.status(error.response.status).json(error.response.data);
+        }
+        console.error('Error reaching the read API for alerts:', error.message);
+        res.status(503).json({ error: 'Alerts are unavailable (read API not reachable)' });
+    }
+};
+app.get('/api/alerts', forwardAlerts);
+app.post('/api/alerts', forwardAlerts);
+app.post('/api/alerts/delete', forwardAlerts);
+app.get('/api/alerts/events', forwardAlerts);
+
+// Re-optimize the unfinished part of a tracked plan from currentTime, e.g. after recordActualEnd.
+// Forwarded to the read API where it answers in ~10 ms; falls back to a one-off Python process.
+app.post('/api/plan-replan', async (req, res) => {
+    const { plan, currentTime, planEndTime, date, budgetMs } = req.body;
+    if (!Array.isArray(plan) || !currentTime) {
+        return res.status(400).json({ error: 'plan must be an array and currentTime is required' });
+    }
+
+    const payload = { plan, currentTime, planEndTime, date, budgetMs };
+    try {
+        const response = await axios.post(`${READ_API_URL}/api/plan/replan`, payload, { timeout: 2000 });
+        return res.json(response.data);
+    } catch (error) {
+        if (error.response && error.response.status === 400) {
+            return res.status(400).json(error.response.data);
+        }
+        console.log(`Read API unavailable for re-planning (${error.message}), running plan_optimizer.py`);
+    }
+
+    try {
+        res.json(await runPythonJson('plan_optimizer.py', payload));
+    } catch (error) {
+        console.error('Error re-planning:', error);
+        res.status(500).json({ error: `Failed to re-plan: ${error.message}` });
+    }
+});
+
 // Serve static files from the dist directory
 app.use(express.static('dist'));
 
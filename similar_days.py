@@ -0,0 +1,236 @@
+import os
+import sys
+import warnings
+
+import numpy as np
+
+from wait_data import (
+    DATA_DIR, SLOT_MINUTES, derived_path, iter_ride_slots, latest_today_file, list_day_files,
+    load_day, minutes_to_time, write_json
+)
+
+FEATURE_START = 8 * 60        # day vectors cover park hours, 8:00 AM ..
+FEATURE_END = 22 * 60         # .. 10:00 PM
+FEATURE_SLOTS = (FEATURE_END - FEATURE_START) // SLOT_MINUTES
+DEFAULT_NEIGHBOURS = 5
+LEVEL_LIMITS = (0.5, 2.0)     # clamp on scaling an analog day to today's observed level
+
+
+def feature_slot(minute):
+    slot = (minute - FEATURE_START) // SLOT_MINUTES
+    return slot if 0 <= slot < FEATURE_SLOTS else None
+
+
+def fill_day(waits):
+    """Interpolate gaps inside each ride's observed span; slots outside it (and rides with no data) stay NaN"""
+    filled = waits.copy()
+    slots = np.arange(FEATURE_SLOTS)
+    for r in range(waits.shape[1]):
+        valid = np.flatnonzero(~np.isnan(waits[:, r]))
+        if len(valid):
+            span = slots[valid[0]:valid[-1] + 1]
+            filled[span, r] = np.interp(span, valid, waits[valid, r])
+    return filled
+
+
+class SimilarDayIndex:
+    """Every park-day as a (slots, rides) array in one growable matrix, searched by k-NN on any prefix
+
+    Adding a day touches only its own row plus running per-slot sums, so the index grows
+    incrementally; nothing is recomputed over the whole history.
+    """
+
+    def __init__(self, rides=None, dates=None, waits=None, features=None):
+        self.rides = list(rides or [])
+        self.ride_index = {ride: i for i, ride in enumerate(self.rides)}
+        self.dates = list(dates or [])
+        self.row_index = {date: i for i, date in enumerate(self.dates)}
+        self.size = len(self.dates)
+        shape = (max(self.size, 16), FEATURE_SLOTS, len(self.rides))
+        self.waits = np.full(shape, np.nan, dtype=np.float32)       # raw observations
+        self.features = np.full(shape, np.nan, dtype=np.float32)    # gap-filled rows that get searched
+        self.sums = np.zeros(shape[1:])
+        self.counts = np.zeros(shape[1:])
+        self.new_rides = 0
+        if self.size:
+            self.waits[:self.size] = waits
+            self.features[:self.size] = features
+            observed = ~np.isnan(waits)
+            self.sums = np.where(observed, waits, 0).sum(axis=0, dtype=np.float64)
+            self.counts = observed.sum(axis=0).astype(np.float64)
+
+    def _add_rides(self, names):
+        new = sorted(name for name in names if name not in self.ride_index)
+        if not new:
+            return
+        for name in new:
+            self.ride_index[name] = len(self.rides)
+            self.rides.append(name)
+        self.new_rides = len(new)
+        pad = ((0, 0), (0, 0), (0, len(new)))
+        self.waits = np.pad(self.waits, pad, constant_values=np.nan)
+        self.features = np.pad(self.features, pad, constant_values=np.nan)
+        self.sums = np.pad(self.sums, pad[1:])
+        self.counts = np.pad(self.counts, pad[1:])
+
+    def profile(self):
+        """Mean observed wait per (slot, ride) across the index"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.nan_to_num(self.sums / self.counts)
+
+    def scales(self):
+        """Per-ride mean wait, used to put rides with long and short queues on one footing"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scales = self.sums.sum(axis=0) / self.counts.sum(axis=0)
+        return np.where(np.isfinite(scales) & (scales > 0), scales, 1.0).astype(np.float32)
+
+    def day_waits(self, day):
+        """(FEATURE_SLOTS, rides) array of a day's observed waits in this index's ride order, NaN elsewhere"""
+        waits = np.full((FEATURE_SLOTS, len(self.rides)), np.nan, dtype=np.float32)
+        for ride, minute, wait in iter_ride_slots(day):
+            slot = feature_slot(minute)
+            if slot is not None and ride in self.ride_index:
+                waits[slot, self.ride_index[ride]] = wait
+        return waits
+
+    def add_day(self, day):
+        """Insert or replace one day's row"""
+        self._add_rides({ride for ride, _, _ in iter_ride_slots(day)})
+        row = self.row_index.get(day['date'])
+        if row is None:
+            if self.size == len(self.waits):
+                grow = ((0, len(self.waits)), (0, 0), (0, 0))
+                self.waits = np.pad(self.waits, grow, constant_values=np.nan)
+                self.features = np.pad(self.features, grow, constant_values=np.nan)
+            row = self.size
+            self.size += 1
+            self.dates.append(day['date'])
+            self.row_index[day['date']] = row
+        else:
+            old = self.waits[row]
+            self.sums -= np.nan_to_num(old)
+            self.counts -= ~np.isnan(old)
+        waits = self.day_waits(day)
+        self.waits[row] = waits
+        self.sums += np.nan_to_num(waits)
+        self.counts += ~np.isnan(waits)
+        profile = self.profile()
+        if self.new_rides:
+            # Days indexed before these rides appeared get their typical curve, so rows never hold NaN
+            self.features[:self.size, :, -self.new_rides:] = profile[:, -self.new_rides:]
+            self.new_rides = 0
+        filled = fill_day(waits)
+        self.features[row] = np.where(np.isnan(filled), profile, filled)
+
+    def query(self, day, k=DEFAULT_NEIGHBOURS, until_minute=None, exclude=None):
+        """[(date, distance)] of the k days closest to `day` over its observed prefix (RMS of normalized waits)"""
+        waits = self.day_waits(day)
+        observed = ~np.isnan(waits)
+        if until_minute is not None:
+            cutoff = min(max((until_minute - FEATURE_START) // SLOT_MINUTES + 1, 0), FEATURE_SLOTS)
+        else:
+            rows = np.flatnonzero(observed.any(axis=1))
+            cutoff = rows[-1] + 1 if len(rows) else 0
+        mask = observed[:cutoff]
+        if not mask.any():
+            return [], cutoff
+
+        candidates = np.array([date != (exclude or day['date']) for date in self.dates], dtype=bool)
+        # Slot-major rows make the prefix a contiguous block; only observed cells are compared
+        width = cutoff * len(self.rides)
+        prefix = self.features[:self.size].reshape(self.size, -1)[:, :width]
+        columns = np.flatnonzero(mask)
+        if len(columns) < width:
+            prefix = prefix[:, columns]
+        inverse_scale = np.tile(1.0 / self.scales(), cutoff)[columns]
+        diff = (prefix - waits[:cutoff].ravel()[columns]) * inverse_scale
+        distances = np.sqrt(np.einsum('ij,ij->i', diff, diff) / len(columns))
+        distances[~candidates] = np.inf
+        k = min(k, int(candidates.sum()))
+        if k == 0:
+            return [], cutoff
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest])]
+        return [(self.dates[i], float(distances[i])) for i in nearest], cutoff
+
+    def analog_forecast(self, day, k=DEFAULT_NEIGHBOURS, until_minute=None):
+        """Rest-of-day forecast per ride: the neighbours' curves, distance-weighted and scaled to today's level"""
+        neighbours, cutoff = self.query(day, k, until_minute)
+        if not neighbours:
+            return neighbours, cutoff, {}
+        rows = np.array([self.row_index[date] for date, _ in neighbours])
+        weights = 1.0 / (np.array([distance for _, distance in neighbours]) + 0.05)
+        weights /= weights.sum()
+        expected = np.tensordot(weights, self.features[rows], axes=1)
+
+        waits = self.day_waits(day)[:cutoff]
+        forecast = {}
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            observed_level = np.nanmean(waits, axis=0)
+        analog_level = expected[:cutoff].mean(axis=0) if cutoff else np.full(len(self.rides), np.nan)
+        for r, ride in enumerate(self.rides):
+            level = observed_level[r] / analog_level[r] if cutoff and analog_level[r] > 0 else np.nan
+            level = float(np.clip(level, *LEVEL_LIMITS)) if np.isfinite(level) else 1.0
+            forecast[ride] = [
+                {'time': minutes_to_time(FEATURE_START + slot * SLOT_MINUTES),
+                 'wait': round(float(expected[slot, r]) * level)}
+                for slot in range(cutoff, FEATURE_SLOTS)
+            ]
+        return neighbours, cutoff, forecast
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, rides=np.array(self.rides), dates=np.array(self.dates),
+                     waits=self.waits[:self.size], features=self.features[:self.size])
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            return cls(data['rides'].tolist(), data['dates'].tolist(), data['waits'], data['features'])
+
+
+def update_similar_days(data_dir=DATA_DIR, days=None, index_file=None, rebuild=False):
+    """Add new days to the persisted index and write the analog forecast for the latest one"""
+    index_file = index_file or derived_path(data_dir, 'similar_days.npz')
+    index = SimilarDayIndex() if rebuild else SimilarDayIndex.load(index_file)
+    if days is None:
+        days = [load_day(path) for path in list_day_files(data_dir).values()]
+    for day in days:
+        index.add_day(day)
+    index.save(index_file)
+    if days:
+        latest = max(days, key=lambda day: day['date'])
+        neighbours, cutoff, forecast = index.analog_forecast(latest)
+        write_json(derived_path(data_dir, 'similar_days.json'), {
+            'date': latest['date'],
+            'matchedUntil': minutes_to_time(FEATURE_START + cutoff * SLOT_MINUTES) if cutoff else None,
+            'neighbours': [{'date': date, 'distance': round(distance, 3)} for date, distance in neighbours],
+            'forecast': forecast
+        })
+    return index
+
+
+if __name__ == "__main__":
+    # Usage: python similar_days.py [--rebuild] [DAY_FILE]
+    rebuild = '--rebuild' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != '--rebuild']
+    index_file = derived_path(DATA_DIR, 'similar_days.npz')
+    if rebuild or not os.path.exists(index_file):
+        index = update_similar_days(rebuild=True)
+    else:
+        index = SimilarDayIndex.load(index_file)
+    path = args[0] if args else latest_today_file()
+    if not path:
+        print("❌ No day file to match")
+        sys.exit(1)
+    day = load_day(path)
+    neighbours, cutoff = index.query(day)
+    print(f"🔎 {day['date']} matched on {cutoff} slots against {index.size} indexed days")
+    for date, distance in neighbours:
+        print(f"  {date}  distance {distance:.3f}")
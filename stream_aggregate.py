@@ -0,0 +1,107 @@
+import sys
+
+import ijson
+
+from park_day import season_sources
+from rolling_stats import WEEKDAYS, RunningStats
+from wait_data import DATA_DIR, is_ride_name, time_to_minutes, weekday_of
+
+
+def iter_day_slots(path):
+    """Yield (ride, minute, wait) from one day file using ijson events, never building the nested tree"""
+    ride = None
+    minute = None
+    with open(path, 'rb') as f:
+        for prefix, event, value in ijson.parse(f):
+            if prefix == 'rides.item.name':
+                ride = value if is_ride_name(value) else None
+            elif prefix == 'rides.item.wait_times.item.time':
+                minute = time_to_minutes(value)
+            elif prefix == 'rides.item.wait_times.item.wait':
+                if ride is not None and minute is not None and value is not None:
+                    yield ride, minute, int(value)
+
+
+def iter_archive(data_dir=DATA_DIR, start=None, end=None):
+    """Yield (date, ride, minute, wait) across every day, one day in memory at a time
+
+    Day files are streamed with ijson; days pruned into the monthly archive are decoded one at a time.
+    """
+    for date, source in season_sources(data_dir, start, end).items():
+        slots = iter_day_slots(source) if isinstance(source, str) else source.read_day(date).iter_slots()
+        for ride, minute, wait in slots:
+            yield date, ride, minute, wait
+
+
+def filter_slots(stream, rides=None, weekdays=None, start_minute=None, end_minute=None):
+    """Generator stage: keep tuples for the given rides, weekdays and time-of-day range"""
+    rides = set(rides) if rides else None
+    weekdays = set(weekdays) if weekdays is not None else None
+    for date, ride, minute, wait in stream:
+        if rides is not None and ride not in rides:
+            continue
+        if weekdays is not None and weekday_of(date) not in weekdays:
+            continue
+        if start_minute is not None and minute < start_minute:
+            continue
+        if end_minute is not None and minute > end_minute:
+            continue
+        yield date, ride, minute, wait
+
+
+# Common group keys for aggregate(); each maps a (date, ride, minute, wait) tuple to a group
+def by_ride(row):
+    return row[1]
+
+
+def by_ride_weekday(row):
+    return row[1], WEEKDAYS[weekday_of(row[0])]
+
+
+def by_hour(row):
+    return row[2] // 60
+
+
+def by_date(row):
+    return row[0]
+
+
+def aggregate(stream, groupings, reducer=RunningStats):
+    """Run several group-and-reduce aggregations in one pass over the stream
+
+    `groupings` maps an output name to a key function. Memory is one reducer per distinct
+    group, independent of how many days the stream covers.
+    """
+    results = {name: {} for name in groupings}
+    for row in stream:
+        wait = row[3]
+        for name, key_fn in groupings.items():
+            groups = results[name]
+            key = key_fn(row)
+            state = groups.get(key)
+            if state is None:
+                state = groups[key] = reducer()
+            state.update(wait)
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python stream_aggregate.py [START_DATE] [END_DATE]
+    start = sys.argv[1] if len(sys.argv) > 1 else None
+    end = sys.argv[2] if len(sys.argv) > 2 else None
+    results = aggregate(iter_archive(start=start, end=end), {
+        'ride': by_ride,
+        'hour': by_hour,
+        'date': by_date
+    })
+
+    print(f"📦 Streamed archive {start or 'start'} .. {end or 'end'}")
+    print("\n🎢 By ride:")
+    for ride, stats in sorted(results['ride'].items(), key=lambda item: -item[1].mean):
+        print(f"  {ride:30} mean {stats.mean:5.1f}  max {stats.max:4}  slots {stats.count}")
+    print("\n⏰ By hour:")
+    for hour, stats in sorted(results['hour'].items()):
+        print(f"  {hour:02d}:00  mean {stats.mean:5.1f}")
+    print("\n📅 By date:")
+    for date, stats in sorted(results['date'].items()):
+        print(f"  {date}  mean {stats.mean:5.1f}  slots {stats.count}")
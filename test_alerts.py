@@ -0,0 +1,188 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from alerts import AlertEngine, QueueSink, WebhookSink, write_journal
+
+RIDE = 'Mine-Cart Madness'
+
+
+def day(date, wait, status='Open', ride=RIDE):
+    return {'date': date, 'rides': [{'name': ride, 'waitTime': wait, 'status': status}]}
+
+
+@pytest.fixture
+def sink():
+    return QueueSink()
+
+
+@pytest.fixture
+def engine(sink):
+    return AlertEngine([sink])
+
+
+def feed(engine, readings, date='2025-06-19', start=600):
+    """Apply (wait, status) readings one poll apart; returns the conditions fired per reading"""
+    fired = []
+    for step, (wait, status) in enumerate(readings):
+        events = engine.apply_day(day(date, wait, status), start + step * 2)
+        fired.append([event['condition'] for event in events])
+    return fired
+
+
+def test_below_fires_on_crossing_and_rearms_past_hysteresis(engine, sink):
+    engine.add_rule('ana', RIDE, 'below', 20)
+    fired = feed(engine, [(30, 'Open'), (18, 'Open'), (17, 'Open'), (22, 'Open'), (19, 'Open'),
+                          (25, 'Open'), (15, 'Open')])
+    assert fired == [[], ['below'], [], [], [], [], ['below']]
+    events = sink.since(0)
+    assert [event['wait'] for event in events] == [18, 15]
+    assert sink.since(events[0]['seq']) == events[1:]
+
+
+def test_above_fires_on_crossing_and_rearms_past_hysteresis(engine):
+    engine.add_rule('ana', RIDE, 'above', 60)
+    fired = feed(engine, [(40, 'Open'), (65, 'Open'), (58, 'Open'), (61, 'Open'), (55, 'Open'), (70, 'Open')])
+    assert fired == [[], ['above'], [], [], [], ['above']]
+
+
+def test_rules_across_thresholds_fire_only_where_crossed(engine, sink):
+    for threshold in (10, 20, 30, 40):
+        engine.add_rule(f'w{threshold}', RIDE, 'below', threshold)
+    feed(engine, [(45, 'Open'), (25, 'Open')])
+    assert sorted(event['threshold'] for event in sink.since(0)) == [30, 40]
+    assert [event['watcher'] for event in sink.since(0, watcher='w30')] == ['w30']
+
+
+def test_rule_already_satisfied_fires_when_added(engine):
+    feed(engine, [(12, 'Open')])
+    _, events = engine.add_rule('ana', RIDE, 'below', 20, minute=610)
+    assert [event['condition'] for event in events] == ['below']
+    assert feed(engine, [(11, 'Open')], start=612) == [[]]
+
+
+def test_close_and_reopen_transitions_with_cooldown(engine):
+    engine.add_rule('ana', RIDE, 'closes')
+    engine.add_rule('ana', RIDE, 'reopens')
+    fired = []
+    for minute, wait, status in [(600, 30, 'Open'), (602, None, 'Closed'), (605, 25, 'Open'),
+                                 (610, None, 'Down'), (630, 20, 'Open')]:
+        fired.append([event['condition'] for event in engine.apply_day(day('2025-06-19', wait, status), minute)])
+    # The second close lands inside the 15-minute cooldown of the first; the later reopen does not
+    assert fired == [[], ['closes'], ['reopens'], [], ['reopens']]
+
+
+def test_day_rollover_resets_status(engine):
+    engine.add_rule('ana', RIDE, 'reopens')
+    engine.add_rule('ana', RIDE, 'closes')
+    assert feed(engine, [(30, 'Open'), (None, 'Closed')], date='2025-06-19', start=1260) == [[], ['closes']]
+    # The park opening the next morning is a first reading, not a reopen
+    assert feed(engine, [(5, 'Open')], date='2025-06-20', start=540) == [[]]
+    assert engine.date == '2025-06-20'
+    # Yesterday's fire does not put today's transitions in cooldown
+    assert feed(engine, [(None, 'Closed')], date='2025-06-20', start=542) == [['closes']]
+
+
+def test_unchanged_rides_are_skipped(engine):
+    engine.add_rule('ana', RIDE, 'below', 20)
+    feed(engine, [(30, 'Open'), (30, 'Open'), (30, 'Open')])
+    assert engine.stats['updates'] == 3
+    assert engine.stats['rides_changed'] == 1
+
+
+def test_removed_rule_stops_firing(engine, sink):
+    rule, _ = engine.add_rule('ana', RIDE, 'below', 20)
+    feed(engine, [(30, 'Open')])
+    assert engine.remove_rule(rule['id']) == rule
+    feed(engine, [(10, 'Open')], start=602)
+    assert sink.since(0) == []
+
+
+def test_saved_rules_keep_their_armed_state(tmp_path, engine, sink):
+    engine.add_rule('ana', RIDE, 'below', 20)
+    feed(engine, [(30, 'Open'), (15, 'Open')])
+    path = tmp_path / 'alert_rules.jsonl'
+    engine.save(path)
+    restored = AlertEngine.load(path, [sink])
+    # Still fired: staying under the threshold after a restart must not alert again
+    assert feed(restored, [(30, 'Open'), (15, 'Open')], start=700) == [[], ['below']]
+    assert feed(AlertEngine.load(path, [sink]), [(15, 'Open')], start=800) == [[]]
+
+
+def test_journal_records_only_the_changes_and_replays(tmp_path, engine, sink):
+    path = tmp_path / 'alert_rules.jsonl'
+    kept, _ = engine.add_rule('ana', RIDE, 'below', 20)
+    dropped, _ = engine.add_rule('bo', RIDE, 'above', 60)
+    engine.add_rule('cy', RIDE, 'closes')
+    write_journal(path, *engine.take_journal())
+    feed(engine, [(30, 'Open'), (15, 'Open')])
+    engine.remove_rule(dropped['id'])
+    mode, records = engine.take_journal()
+    assert mode == 'a'
+    assert records == [{'op': 'armed', 'id': kept['id'], 'armed': False}, {'op': 'remove', 'id': dropped['id']}]
+    write_journal(path, mode, records)
+
+    restored = AlertEngine.load(path, [sink])
+    assert sorted(restored.rules) == sorted(engine.rules)
+    assert restored.to_dict() == engine.to_dict()
+    assert restored.add_rule('dee', RIDE, 'below', 10)[0]['id'] == engine.next_id
+
+
+def test_journal_is_compacted_into_a_snapshot(tmp_path, engine):
+    engine.add_rule('ana', RIDE, 'below', 20)
+    feed(engine, [(30, 'Open'), (15, 'Open')] * 600)
+    mode, records = engine.take_journal()
+    assert (mode, len(records)) == ('w', 1)
+    path = tmp_path / 'alert_rules.jsonl'
+    write_journal(path, mode, records)
+    assert AlertEngine.load(path).to_dict() == engine.to_dict()
+
+
+class Receiver(BaseHTTPRequestHandler):
+    """Stub webhook endpoint that records the batches posted to it"""
+
+    batches = []
+
+    def do_POST(self):
+        Receiver.batches.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def receiver():
+    Receiver.batches = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Receiver)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/alerts'
+    server.shutdown()
+
+
+def test_webhook_delivers_batches_in_order_from_one_worker(receiver):
+    webhook = WebhookSink(receiver)
+    engine = AlertEngine([webhook])
+    engine.add_rule('ana', RIDE, 'below', 20)
+    engine.add_rule('bo', RIDE, 'above', 40)
+    threads = threading.active_count()
+    feed(engine, [(30, 'Open'), (15, 'Open'), (50, 'Open'), (10, 'Open')])
+    assert threading.active_count() == threads
+    engine.close()
+    assert not webhook.worker.is_alive()
+    assert [[event['condition'] for event in batch['events']] for batch in Receiver.batches] == \
+        [['below'], ['above'], ['below']]
+    assert webhook.failures == 0
+
+
+def test_webhook_drops_batches_beyond_backlog():
+    webhook = WebhookSink('http://127.0.0.1:9/alerts', timeout=0.1, backlog=1)
+    webhook.batches.put(None)   # park the worker so nothing is drained
+    webhook.worker.join()
+    webhook.emit([{'seq': 1}])
+    webhook.emit([{'seq': 2}, {'seq': 3}])
+    assert webhook.dropped == 2
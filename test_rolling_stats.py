@@ -0,0 +1,53 @@
+import statistics
+
+from rolling_stats import CORRECTION_DAYS, WaitStatsStore
+from wait_data import minutes_to_time, weekday_of
+
+RIDE = 'Mine-Cart Madness'
+
+
+def day(date, waits, start=600):
+    """Day file with one ride whose 15-minute slots from `start` hold `waits`"""
+    slots = [{'time': minutes_to_time(start + i * 15), 'wait': wait} for i, wait in enumerate(waits)]
+    return {'date': date, 'rides': [{'name': RIDE, 'wait_times': slots}]}
+
+
+def check(stats, values):
+    assert stats.count == len(values)
+    assert abs(stats.mean - statistics.mean(values)) < 1e-9
+    assert abs(stats.variance - (statistics.variance(values) if len(values) > 1 else 0.0)) < 1e-9
+    assert (stats.min, stats.max) == (min(values), max(values))
+
+
+def test_correction_replaces_the_old_value():
+    store = WaitStatsStore()
+    store.ingest_day(day('2025-06-12', [20, 40]))
+    store.ingest_day(day('2025-06-19', [60, 30]))
+    assert store.ingest_day(day('2025-06-19', [25, 30])) == 1
+    check(store.slot_stats(RIDE, weekday_of('2025-06-19'), 600), [20, 25])
+    check(store.today[RIDE], [25, 30])
+
+
+def test_backfilled_slot_is_counted_once():
+    store = WaitStatsStore()
+    store.ingest_day(day('2025-06-19', [20]))
+    assert store.ingest_day(day('2025-06-19', [20, 35])) == 1
+    assert store.ingest_day(day('2025-06-19', [20, 35])) == 0
+    check(store.today[RIDE], [20, 35])
+
+
+def test_old_days_are_sealed_and_keep_their_bounds(tmp_path):
+    store = WaitStatsStore()
+    dates = ['2025-06-05', '2025-06-12', '2025-06-19', '2025-06-20', '2025-06-21']
+    for date, wait in zip(dates, [90, 10, 50, 5, 5]):
+        store.ingest_day(day(date, [wait]))
+    assert sorted(store.observed) == dates[-CORRECTION_DAYS:]
+    assert store.sealed_dates == set(dates[:-CORRECTION_DAYS])
+    # Re-reading every day file after a restart adds nothing
+    path = tmp_path / 'rolling_stats.json'
+    store.save(path)
+    store = WaitStatsStore.load(path)
+    assert sum(store.ingest_day(day(date, [wait])) for date, wait in zip(dates, [90, 10, 50, 5, 5])) == 0
+    # Correcting the only recent Thursday slot still knows the sealed Thursdays' extremes
+    store.ingest_day(day('2025-06-19', [30]))
+    check(store.slot_stats(RIDE, weekday_of('2025-06-19'), 600), [90, 10, 30])
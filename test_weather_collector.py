@@ -0,0 +1,110 @@
+import pytest
+
+from weather_collector import CACHE_TTL_SECONDS, WeatherCache, collect_weather, load_weather
+
+# 2025-06-19 17:00 UTC = 1:00 PM in the park
+NOW = 1750352400
+
+
+def one_call(temp):
+    return {
+        'current': {'dt': NOW, 'temp': temp, 'feels_like': temp + 2, 'humidity': 60,
+                    'weather': [{'main': 'Clouds'}]},
+        'hourly': [{'dt': NOW + hour * 3600, 'temp': temp + hour, 'feels_like': temp + hour, 'pop': 0.4,
+                    'weather': [{'main': 'Thunderstorm'}]} for hour in range(3)]
+    }
+
+
+class StubApi:
+    """Stands in for the One Call API: counts calls and fails on demand"""
+
+    def __init__(self):
+        self.calls = 0
+        self.failing = False
+
+    def __call__(self):
+        self.calls += 1
+        if self.failing:
+            raise ConnectionError('upstream down')
+        return one_call(80 + self.calls)
+
+
+class Clock:
+    def __init__(self, now=NOW):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def api():
+    return StubApi()
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_ttl_hit_reuses_one_fetch_across_instances(tmp_path, api, clock):
+    cache = WeatherCache(tmp_path, fetch=api, clock=clock)
+    payload, fetched_at = cache.get()
+    clock.now += CACHE_TTL_SECONDS - 1
+    assert cache.get() == (payload, fetched_at)
+    # Another process sharing the data directory reads the cache file instead of calling upstream
+    assert WeatherCache(tmp_path, fetch=api, clock=clock).get() == (payload, fetched_at)
+    assert api.calls == 1
+
+
+def test_ttl_expiry_refetches(tmp_path, api, clock):
+    cache = WeatherCache(tmp_path, fetch=api, clock=clock)
+    first, _ = cache.get()
+    clock.now += CACHE_TTL_SECONDS
+    second, fetched_at = cache.get()
+    assert api.calls == 2
+    assert second != first
+    assert fetched_at == clock.now
+
+
+def test_stale_payload_served_when_refresh_fails(tmp_path, api, clock):
+    cache = WeatherCache(tmp_path, fetch=api, clock=clock)
+    payload, fetched_at = cache.get()
+    clock.now += CACHE_TTL_SECONDS * 3
+    api.failing = True
+    assert cache.get() == (payload, fetched_at)
+    assert api.calls == 2
+    # The failure is recorded: nobody, in this process or another, retries within the TTL
+    api.failing = False
+    clock.now += CACHE_TTL_SECONDS - 1
+    assert cache.get() == (payload, fetched_at)
+    assert WeatherCache(tmp_path, fetch=api, clock=clock).get() == (payload, fetched_at)
+    assert api.calls == 2
+    # Upstream recovers: the first call after the retry time refreshes
+    clock.now += 1
+    assert cache.get()[1] == clock.now
+    assert api.calls == 3
+
+
+def test_error_propagates_with_nothing_cached(tmp_path, api, clock):
+    api.failing = True
+    with pytest.raises(ConnectionError):
+        WeatherCache(tmp_path, fetch=api, clock=clock).get()
+    # Later callers fail fast until the retry time instead of calling upstream again
+    with pytest.raises(RuntimeError):
+        WeatherCache(tmp_path, fetch=api, clock=clock).get()
+    assert api.calls == 1
+
+
+def test_collect_aligns_hours_to_slots_and_keeps_current(tmp_path, api, clock):
+    cache = WeatherCache(tmp_path, fetch=api, clock=clock)
+    collect_weather(tmp_path, cache)
+    slots = load_weather('2025-06-19', tmp_path)
+    assert slots['01:00 PM']['source'] == 'current'
+    assert slots['01:15 PM'] == slots['01:45 PM']
+    assert slots['02:30 PM']['thunderstorm'] and slots['02:30 PM']['precipitation'] == 40
+
+    # A later forecast never overwrites a slot observed as current
+    clock.now += CACHE_TTL_SECONDS
+    collect_weather(tmp_path, cache)
+    assert load_weather('2025-06-19', tmp_path)['01:00 PM']['temperature'] == 81
@@ -0,0 +1,309 @@
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from archive import load_archived_day
+from park_day import NULL_WAIT, ParkDay
+from wait_data import DATA_DIR, PARK_NAME, is_ride_name, list_day_files, minutes_to_time, time_to_minutes
+
+STUB_PORT = int(os.environ.get('STUB_PORT', 5050))
+RECORDED_FILE = 'thrill_data_response.txt'
+PLOTLY_PATTERN = re.compile(r'(Plotly\.newPlot\([^,]+,\s*)(\[.*?\])(,\s*\{)', re.DOTALL)
+HEATMAP_PATHS = ('/waits/graph/quick/parkheat',)
+CURRENT_PATHS = ('/waits/park/uor/epic-universe/', '/waits/park/uor/epic-universe', '/waittimes/epic-universe')
+SYNTHETIC_HOURS = (8 * 60 + 45, 21 * 60 + 45)
+SOURCES = ('data', 'recorded', 'synthetic')
+DEFAULT_CONFIG = {
+    'source': 'data',          # data: day files/archive, synthetic when a date is missing; recorded: replay the file
+    'latencyMs': 0,            # added to every upstream response ..
+    'jitterMs': 0,             # .. plus a uniform 0..jitterMs
+    'errorRate': 0.0,          # fraction of upstream requests answered with a 500
+    'throttleRps': 0,          # token-bucket limit (burst of one second); over it -> 429 with Retry-After
+    'now': None,               # "YYYY-MM-DD HH:MM" simulated clock: later slots are blank, the live page shows this moment
+    'seed': 0
+}
+
+
+class UpstreamStub:
+    """Stand-in for thrill-data.com: heatmap JSON and the current-waits page, with injected faults
+
+    Serves the park heatmap endpoint (single day or a date range with dated x labels, like the
+    real one) and the current-waits HTML table. Days come from data/ (or the archive), from a
+    seeded synthetic generator, or from a recorded payload replayed verbatim.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, recorded_path=RECORDED_FILE, config=None):
+        self.data_dir = data_dir
+        self.config = dict(DEFAULT_CONFIG, **(config or {}))
+        with open(recorded_path, 'r', encoding='utf-8') as f:
+            self.recorded = f.read()
+        payload = json.loads(self.recorded)
+        match = PLOTLY_PATTERN.search(payload['plot1'])
+        self.title = payload.get('title')
+        self.template = (payload['plot1'][:match.end(1)], json.loads(match.group(2))[0],
+                         payload['plot1'][match.start(3):])
+        self.recorded_rides = [name for name in self.template[1]['y'] if is_ride_name(name)]
+        self.days = {}
+        self.rng = random.Random(self.config['seed'])
+        self.tokens = 0.0
+        self.refilled = time.monotonic()
+        self.stats = {'requests': 0, 'byStatus': {}, 'byPath': {}}
+
+    def configure(self, changes):
+        unknown = set(changes) - set(DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(f'unknown settings: {", ".join(sorted(unknown))}')
+        if changes.get('source', 'data') not in SOURCES:
+            raise ValueError(f'source must be one of {", ".join(SOURCES)}')
+        if changes.get('now'):
+            datetime.strptime(changes['now'], '%Y-%m-%d %H:%M')
+        self.config.update(changes)
+        if 'seed' in changes:
+            self.rng.seed(changes['seed'])
+            self.days.clear()
+        return self.config
+
+    def clock(self):
+        """(date, minute) of the simulated now, or None when serving whole days"""
+        if not self.config['now']:
+            return None
+        now = datetime.strptime(self.config['now'], '%Y-%m-%d %H:%M')
+        return now.strftime('%Y-%m-%d'), now.hour * 60 + now.minute
+
+    def synthetic_day(self, date):
+        """A plausible day: per-ride level, a midday hump, noise, rounded to 5 and an occasional breakdown"""
+        rng = np.random.default_rng(zlib.crc32(f'{self.config["seed"]}:{date}'.encode()))
+        minutes = np.arange(SYNTHETIC_HOURS[0], SYNTHETIC_HOURS[1] + 1, 15)
+        phase = (minutes - SYNTHETIC_HOURS[0]) / (SYNTHETIC_HOURS[1] - SYNTHETIC_HOURS[0])
+        levels = rng.uniform(10, 90, size=(len(self.recorded_rides), 1))
+        curve = levels * (0.5 + 0.8 * np.sin(np.pi * phase)) + rng.normal(0, 6, size=(len(self.recorded_rides), len(minutes)))
+        waits = (np.maximum(np.round(curve / 5) * 5, 5)).astype(np.int16)
+        for row in np.flatnonzero(rng.random(len(self.recorded_rides)) < 0.2):
+            start = rng.integers(0, len(minutes) - 4)
+            waits[row, start:start + rng.integers(1, 5)] = NULL_WAIT
+        return ParkDay(date, PARK_NAME, [minutes_to_time(minute) for minute in minutes], waits,
+                       [{'name': name} for name in self.recorded_rides])
+
+    def day(self, date):
+        if date not in self.days:
+            day = None
+            if self.config['source'] == 'data':
+                path = list_day_files(self.data_dir).get(date)
+                day = ParkDay.load(path) if path else load_archived_day(date, self.data_dir)
+            self.days[date] = day or self.synthetic_day(date)
+        return self.days[date]
+
+    def visible_rows(self, day):
+        """[(ride, [label], [wait or None])] as of the simulated clock (later slots and days blank)"""
+        clock = self.clock()
+        rows = []
+        for ride in day:
+            if not is_ride_name(ride.name):
+                continue
+            waits = [None if wait < 0 else wait for wait in ride.waits.tolist()]
+            if clock and day.date >= clock[0]:
+                waits = [wait if day.date == clock[0] and 0 <= minute <= clock[1] else None
+                         for minute, wait in zip(day.minutes.tolist(), waits)]
+            rows.append((ride.name, list(day.times), waits))
+        return rows
+
+    def heatmap(self, start, end):
+        """The parkheat JSON body for [start, end]; single days carry the Average row and column"""
+        if self.config['source'] == 'recorded':
+            return self.recorded.encode('utf-8')
+        first = datetime.strptime(start, '%Y-%m-%d')
+        last = datetime.strptime(end or start, '%Y-%m-%d')
+        dates = [(first + timedelta(days=i)).strftime('%Y-%m-%d') for i in range((last - first).days + 1)]
+        rows = {}
+        x = []
+        for date in dates:
+            day_rows = self.visible_rows(self.day(date))
+            labels = [label for label in day_rows[0][1] if time_to_minutes(label) is not None] if day_rows else []
+            offset = len(x)
+            x.extend(labels if len(dates) == 1 else [f'{date} {label}' for label in labels])
+            for name, day_labels, waits in day_rows:
+                by_label = dict(zip(day_labels, waits))
+                row = rows.setdefault(name, [None] * offset)
+                row.extend([None] * (offset - len(row)))
+                row.extend(by_label.get(label) for label in labels)
+        for row in rows.values():
+            row.extend([None] * (len(x) - len(row)))
+
+        names = sorted(rows)
+        z = [[str(wait) if wait is not None else '' for wait in rows[name]] for name in names]
+        if len(dates) == 1:
+            x = x + ['Average']
+            for row in z:
+                observed = [int(value) for value in row if value]
+                row.append(str(round(sum(observed) / len(observed))) if observed else '')
+            columns = list(zip(*z)) if z else []
+            names.append('Average')
+            z.append([str(round(sum(int(v) for v in column if v) / max(sum(1 for v in column if v), 1)))
+                      if any(column) else '' for column in columns])
+        prefix, trace, suffix = self.template
+        trace = dict(trace, x=x, y=names, z=z, text=z)
+        # Compact separators like the real payload: extract_today_data's quote repair depends on them
+        plot1 = prefix + json.dumps([trace], separators=(',', ':')) + suffix
+        return json.dumps({'plot1': plot1, 'title': self.title}).encode('utf-8')
+
+    def current_page(self):
+        """HTML attractions table (name, height, type, wait) as of the simulated clock or the latest day"""
+        clock = self.clock()
+        if clock:
+            date = clock[0]
+        else:
+            files = list_day_files(self.data_dir)
+            date = max(files) if files and self.config['source'] == 'data' else datetime.now().strftime('%Y-%m-%d')
+        cells = []
+        for name, _, waits in self.visible_rows(self.day(date)):
+            current = next((wait for wait in reversed(waits) if wait is not None), None)
+            wait = f'{current} min' if current is not None else 'Closed'
+            cells.append(f'<tr><td><a href="#">{name}</a></td><td>Any</td><td>Ride</td><td>{wait}</td></tr>')
+        return ('<html><body><table class="table"><thead><tr><th>Ride</th><th>Height</th><th>Type</th>'
+                f'<th>Wait</th></tr></thead><tbody>{"".join(cells)}</tbody></table></body></html>').encode('utf-8')
+
+    def admit(self):
+        """Token bucket for throttleRps; False means answer 429"""
+        rate = self.config['throttleRps']
+        if not rate:
+            return True
+        now = time.monotonic()
+        self.tokens = min(rate, self.tokens + (now - self.refilled) * rate)
+        self.refilled = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    async def route(self, method, target, body=b''):
+        """(status, content type, body, extra headers)"""
+        url = urlsplit(target)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path == '/__stub/stats':
+            return 200, 'application/json', json.dumps(self.stats).encode('utf-8'), {}
+        if url.path == '/__stub/config':
+            if method == 'POST':
+                try:
+                    self.configure(json.loads(body or b'{}'))
+                except (TypeError, ValueError) as e:
+                    return 400, 'application/json', json.dumps({'error': str(e)}).encode('utf-8'), {}
+            return 200, 'application/json', json.dumps(self.config).encode('utf-8'), {}
+        if url.path not in HEATMAP_PATHS + CURRENT_PATHS:
+            return 404, 'text/plain', b'Not found', {}
+
+        if not self.admit():
+            return 429, 'text/plain', b'Too many requests', {'Retry-After': '1'}
+        delay = self.config['latencyMs'] + self.rng.uniform(0, self.config['jitterMs'])
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if self.rng.random() < self.config['errorRate']:
+            return 500, 'text/plain', b'Injected upstream error', {}
+        if url.path in CURRENT_PATHS:
+            return 200, 'text/html; charset=utf-8', self.current_page(), {}
+        try:
+            start = query.get('dateStart') or (self.clock() or (datetime.now().strftime('%Y-%m-%d'),))[0]
+            body = await asyncio.to_thread(self.heatmap, start, query.get('dateEnd'))
+        except ValueError as e:
+            return 400, 'text/plain', str(e).encode('utf-8'), {}
+        return 200, 'application/json', body, {}
+
+    def count(self, path, status):
+        self.stats['requests'] += 1
+        self.stats['byStatus'][str(status)] = self.stats['byStatus'].get(str(status), 0) + 1
+        self.stats['byPath'][path] = self.stats['byPath'].get(path, 0) + 1
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                if len(parts) < 2:
+                    break
+                method, target = parts[0], parts[1]
+                keep_alive = True
+                length = 0
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = header.decode('latin-1').partition(':')
+                    name = name.strip().lower()
+                    if name == 'connection' and value.strip().lower() == 'close':
+                        keep_alive = False
+                    elif name == 'content-length':
+                        length = int(value.strip() or 0)
+
+                request_body = await reader.readexactly(length) if length else b''
+                status, content_type, body, headers = await self.route(method, target, request_body)
+                self.count(urlsplit(target).path, status)
+                reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 429: 'Too Many Requests',
+                          500: 'Internal Server Error'}.get(status, 'OK')
+                extra = ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+                writer.write(
+                    f'HTTP/1.1 {status} {reason}\r\n'
+                    f'Content-Type: {content_type}\r\n'
+                    f'Content-Length: {len(body)}\r\n'
+                    f'{extra}'
+                    f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode('latin-1') + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=STUB_PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"🧪 Upstream stub on http://{host}:{port} ({self.config['source']} source)")
+        print(f"   export THRILL_DATA_URL=http://{host}:{port} to point the ingest at it")
+        async with server:
+            await server.serve_forever()
+
+
+def parse_options(args):
+    """--port N --source S --latency MS --jitter MS --error-rate P --throttle RPS --now 'YYYY-MM-DD HH:MM' --seed N [DATA_DIR]"""
+    flags = {'--source': ('source', str), '--latency': ('latencyMs', float), '--jitter': ('jitterMs', float),
+             '--error-rate': ('errorRate', float), '--throttle': ('throttleRps', float),
+             '--now': ('now', str), '--seed': ('seed', int)}
+    config = {}
+    port = STUB_PORT
+    data_dir = DATA_DIR
+    i = 0
+    while i < len(args):
+        if args[i] == '--port':
+            port = int(args[i + 1])
+            i += 2
+        elif args[i] in flags:
+            key, cast = flags[args[i]]
+            config[key] = cast(args[i + 1])
+            i += 2
+        else:
+            data_dir = args[i]
+            i += 1
+    return port, data_dir, config
+
+
+if __name__ == "__main__":
+    port, data_dir, config = parse_options(sys.argv[1:])
+    stub = UpstreamStub(data_dir)
+    try:
+        stub.configure(config)
+        asyncio.run(stub.serve(port=port))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n👋 Upstream stub stopped")
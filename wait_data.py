@@ -0,0 +1,142 @@
+import json
+import os
+import re
+from datetime import datetime
+
+DATA_DIR = 'data'
+DERIVED_DIR = os.path.join(DATA_DIR, 'derived')
+PARK_NAME = 'Epic Universe'
+UPSTREAM_URL = os.environ.get('THRILL_DATA_URL', 'https://www.thrill-data.com').rstrip('/')   # point at upstream_stub.py offline
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+TIME_PATTERN = re.compile(r'^(\d{1,2}):(\d{2})\s*(AM|PM)$')
+CLOCK_PATTERN = re.compile(r'^(\d{1,2}):(\d{2})$')
+DAY_FILE_PATTERN = re.compile(r'^(today_waits|last_week_waits)_(\d{4}-\d{2}-\d{2})\.json$')
+
+
+def time_to_minutes(time_str):
+    """Convert a slot label like "08:45 AM" to minutes after midnight (None if not a time)"""
+    match = TIME_PATTERN.match(time_str.strip()) if time_str else None
+    if not match:
+        return None
+    hour = int(match.group(1))
+    minute = int(match.group(2))
+    if match.group(3) == 'PM' and hour != 12:
+        hour += 12
+    if match.group(3) == 'AM' and hour == 12:
+        hour = 0
+    return hour * 60 + minute
+
+
+def minutes_to_time(minutes):
+    """Convert minutes after midnight back to the "08:45 AM" slot label format"""
+    hour, minute = divmod(int(minutes), 60)
+    suffix = 'PM' if hour >= 12 else 'AM'
+    hour = hour % 12 or 12
+    return f"{hour:02d}:{minute:02d} {suffix}"
+
+
+def parse_time(value):
+    """Minutes after midnight from "HH:MM" (24h, as the planner sends) or a "08:45 AM" label; ValueError otherwise"""
+    match = CLOCK_PATTERN.match(value.strip()) if value else None
+    if match:
+        return int(match.group(1)) * 60 + int(match.group(2))
+    minutes = time_to_minutes(value)
+    if minutes is None:
+        raise ValueError(f'invalid time: {value}')
+    return minutes
+
+
+def slot_index(minutes):
+    """Index of the 15-minute slot containing the given minute of the day"""
+    return int(minutes) // SLOT_MINUTES
+
+
+def is_ride_name(name):
+    """Filter out the Plotly "Average" row and time labels that leaked into ride names"""
+    return bool(name) and name != 'Average' and time_to_minutes(name) is None
+
+
+def weekday_of(date_str):
+    """Weekday (Monday=0) for a YYYY-MM-DD date string"""
+    return datetime.strptime(date_str, '%Y-%m-%d').weekday()
+
+
+def load_day(path):
+    """Load a day file in the today_waits/last_week_waits JSON format"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def iter_ride_slots(day):
+    """Yield (ride, minute, wait) for every observed slot, skipping nulls and the Average column"""
+    for ride in day.get('rides', []):
+        name = ride.get('name')
+        if not is_ride_name(name):
+            continue
+        for entry in ride.get('wait_times', []):
+            minute = time_to_minutes(entry.get('time'))
+            wait = entry.get('wait')
+            if minute is None or wait is None:
+                continue
+            yield name, minute, wait
+
+
+def list_day_files(data_dir=DATA_DIR):
+    """Return {date: path} for every day file; when a date has both copies, keep the larger (more slots)"""
+    files = {}
+    if not os.path.isdir(data_dir):
+        return files
+    for filename in sorted(os.listdir(data_dir)):
+        match = DAY_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        date = match.group(2)
+        path = os.path.join(data_dir, filename)
+        if date in files and os.path.getsize(files[date]) >= os.path.getsize(path):
+            continue
+        files[date] = path
+    return dict(sorted(files.items()))
+
+
+def latest_today_file(data_dir=DATA_DIR):
+    """Path of the most recent today_waits file, or None"""
+    if not os.path.isdir(data_dir):
+        return None
+    files = sorted(f for f in os.listdir(data_dir)
+                   if f.startswith('today_waits_') and f.endswith('.json'))
+    return os.path.join(data_dir, files[-1]) if files else None
+
+
+def load_history_matrix(data_dir=DATA_DIR, weekday=None, end=None):
+    """Stack the day files into a (rides, days, SLOTS_PER_DAY) float array with NaN for missing slots
+
+    Returns (rides, dates, matrix). Pass weekday (Monday=0) to keep only matching days and end
+    (YYYY-MM-DD) to stop at that date. Archived days whose JSON has been pruned are included.
+    """
+    import numpy as np
+    from park_day import load_season
+
+    days = load_season(data_dir, end=end, weekday=weekday)
+    rides = sorted({ride.name for day in days.values() for ride in day
+                    if is_ride_name(ride.name) and len(ride.observed()[0])})
+    dates = list(days)
+    matrix = np.full((len(rides), len(dates), SLOTS_PER_DAY), np.nan)
+    for d, date in enumerate(dates):
+        matrix[:, d] = days[date].slot_matrix(rides)
+    return rides, dates, matrix
+
+
+def derived_path(data_dir, filename):
+    """Location of a derived artifact (stats, forecasts, rollups) for a data directory"""
+    return os.path.join(data_dir, 'derived', filename)
+
+
+def write_json(path, data):
+    """Write JSON atomically so readers never see a half-written file"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
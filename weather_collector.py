@@ -0,0 +1,178 @@
+import contextlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import pytz
+import requests
+
+from wait_data import (
+    DATA_DIR, SLOT_MINUTES, load_day, minutes_to_time, time_to_minutes, write_json
+)
+
+EASTERN = pytz.timezone('US/Eastern')
+WEATHER_API_URL = os.environ.get('WEATHER_API_URL', 'https://api.openweathermap.org/data/3.0/onecall')
+CACHE_TTL_SECONDS = 10 * 60
+
+# Coordinates for Universal's Epic Universe (same as server.js)
+PARK_LAT = 28.4739
+PARK_LON = -81.4688
+
+
+def weather_dir(data_dir=DATA_DIR):
+    return os.path.join(data_dir, 'weather')
+
+
+class WeatherCache:
+    """TTL cache in front of the One Call API, shared through a file so every process reuses one fetch"""
+
+    def __init__(self, data_dir=DATA_DIR, ttl=CACHE_TTL_SECONDS, fetch=None, clock=time.time):
+        self.path = os.path.join(weather_dir(data_dir), 'onecall_cache.json')
+        self.ttl = ttl
+        self.fetch = fetch or self._fetch_onecall
+        self.clock = clock
+        self.entry = None
+        self.upstream_calls = 0
+
+    @staticmethod
+    def _fetch_onecall():
+        api_key = os.environ.get('WEATHER_API_KEY')
+        if not api_key:
+            raise RuntimeError('WEATHER_API_KEY is not configured')
+        response = requests.get(WEATHER_API_URL, params={
+            'lat': PARK_LAT,
+            'lon': PARK_LON,
+            'exclude': 'minutely,daily,alerts',
+            'units': 'imperial',
+            'appid': api_key
+        }, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def _due(self, entry):
+        """Whether upstream should be called: nothing cached, or the entry expired and no retry is pending"""
+        if entry is None:
+            return True
+        now = self.clock()
+        if now < entry.get('retry_at', 0):
+            return False
+        return entry['fetched_at'] is None or now - entry['fetched_at'] >= self.ttl
+
+    def get(self):
+        """Return (payload, fetched_at), calling upstream at most once per TTL
+
+        If the refresh fails, the last payload is served stale (its fetched_at tells how old it is)
+        and the entry records `retry_at`, so nobody calls upstream again for another TTL. The error
+        only propagates when there is nothing cached at all.
+        """
+        if self._due(self.entry) and os.path.exists(self.path):
+            self.entry = load_day(self.path)
+        if self._due(self.entry):
+            self.upstream_calls += 1
+            try:
+                payload = self.fetch()
+            except Exception as e:
+                self.entry = dict(self.entry or {'fetched_at': None, 'payload': None}, retry_at=self.clock() + self.ttl)
+                write_json(self.path, self.entry)
+                if self.entry['payload'] is None:
+                    raise
+                print(f"❌ Weather refresh failed, serving data from {datetime.fromtimestamp(self.entry['fetched_at'], EASTERN):%H:%M}: {e}")
+                return self.entry['payload'], self.entry['fetched_at']
+            self.entry = {'fetched_at': self.clock(), 'payload': payload}
+            write_json(self.path, self.entry)
+        if self.entry['payload'] is None:
+            raise RuntimeError(f"Weather upstream unavailable, next try at "
+                               f"{datetime.fromtimestamp(self.entry['retry_at'], EASTERN):%H:%M}")
+        return self.entry['payload'], self.entry['fetched_at']
+
+
+def hour_conditions(hour):
+    """The fields we keep from a One Call current/hourly entry"""
+    weather = (hour.get('weather') or [{}])[0]
+    return {
+        'temperature': round(hour['temp']) if 'temp' in hour else None,
+        'feelsLike': round(hour['feels_like']) if 'feels_like' in hour else None,
+        'precipitation': round(hour.get('pop', 0) * 100),
+        'humidity': hour.get('humidity'),
+        'windSpeed': hour.get('wind_speed'),
+        'condition': weather.get('main'),
+        'thunderstorm': weather.get('main') == 'Thunderstorm'
+    }
+
+
+def align_to_slots(payload, fetched_at):
+    """Spread hourly conditions over the 15-minute wait slot grid, keyed by park-local date and slot label"""
+    by_date = {}
+    for hour in payload.get('hourly', []):
+        local = datetime.fromtimestamp(hour['dt'], pytz.utc).astimezone(EASTERN)
+        conditions = hour_conditions(hour)
+        conditions['source'] = 'forecast'
+        for offset in range(0, 60, SLOT_MINUTES):
+            minute = local.hour * 60 + offset
+            by_date.setdefault(local.strftime('%Y-%m-%d'), {})[minutes_to_time(minute)] = conditions
+
+    # The current conditions replace the forecast for the slot we are in right now
+    current = payload.get('current')
+    if current:
+        local = datetime.fromtimestamp(current.get('dt', fetched_at), pytz.utc).astimezone(EASTERN)
+        conditions = hour_conditions(current)
+        conditions['source'] = 'current'
+        minute = (local.hour * 60 + local.minute) // SLOT_MINUTES * SLOT_MINUTES
+        by_date.setdefault(local.strftime('%Y-%m-%d'), {})[minutes_to_time(minute)] = conditions
+    return by_date
+
+
+def load_weather(date, data_dir=DATA_DIR):
+    """Slot-aligned weather for a date: {slot label: conditions} (empty if never collected)"""
+    path = os.path.join(weather_dir(data_dir), f'weather_{date}.json')
+    return load_day(path)['slots'] if os.path.exists(path) else {}
+
+
+def collect_weather(data_dir=DATA_DIR, cache=None):
+    """Snapshot the (cached) conditions into per-day slot files; observed 'current' slots are never overwritten"""
+    cache = cache or WeatherCache(data_dir)
+    payload, fetched_at = cache.get()
+    written = {}
+    for date, slots in align_to_slots(payload, fetched_at).items():
+        existing = load_weather(date, data_dir)
+        for label, conditions in slots.items():
+            if existing.get(label, {}).get('source') != 'current':
+                existing[label] = conditions
+        ordered = dict(sorted(existing.items(), key=lambda item: time_to_minutes(item[0])))
+        write_json(os.path.join(weather_dir(data_dir), f'weather_{date}.json'), {
+            'date': date,
+            'updated': datetime.fromtimestamp(fetched_at, EASTERN).isoformat(timespec='seconds'),
+            'slots': ordered
+        })
+        written[date] = len(slots)
+    return written
+
+
+def join_weather(day, data_dir=DATA_DIR):
+    """Yield (ride, slot label, wait, conditions) rows joining a day file to its weather snapshots"""
+    weather = load_weather(day['date'], data_dir)
+    for ride in day.get('rides', []):
+        for entry in ride.get('wait_times', []):
+            if time_to_minutes(entry.get('time')) is None:
+                continue
+            yield ride['name'], entry['time'], entry.get('wait'), weather.get(entry['time'])
+
+
+if __name__ == "__main__":
+    # Usage: python weather_collector.py   or   python weather_collector.py -   (prints the cached One Call entry as JSON, used by server.js)
+    if len(sys.argv) > 1 and sys.argv[1] == '-':
+        cache = WeatherCache()
+        with contextlib.redirect_stdout(sys.stderr):
+            collect_weather(cache=cache)
+        json.dump(cache.entry, sys.stdout)
+        sys.exit(0)
+
+    try:
+        written = collect_weather()
+    except Exception as e:
+        print(f"❌ Weather collection failed: {e}")
+        sys.exit(1)
+    for date, slots in written.items():
+        print(f"🌦️  {date}: {slots} slots saved to {weather_dir()}/weather_{date}.json")